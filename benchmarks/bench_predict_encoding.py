@@ -0,0 +1,80 @@
+#
+# bench_predict_encoding.py
+#
+# Compares hoopdeck-predict's old pandas request serialization with
+# encoder.py: import (cold start) cost, per-request serialization
+# time, and that both produce the same CSV line for the matchup.
+#
+#   python benchmarks/bench_predict_encoding.py
+#
+# The pandas half is skipped if pandas is not installed.
+#
+
+import os
+import subprocess
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PREDICT_DIR = os.path.join(HERE, "..", "lambdas", "hoopdeck-predict")
+sys.path.insert(0, PREDICT_DIR)
+
+import encoder
+
+STATS_A = {"team_name": "Northwestern", "GP": 32, "MPG": 40.3, "PPG": 72.4, "FGM": 26.1, "FGA": 59.1,
+           "FG%": 0.441, "3PM": 6.7, "3PA": 20.2, "3P%": 0.333, "FTM": 13.6, "FTA": 18.5, "FT%": 0.733,
+           "ORB": 9.7, "DRB": 21.9, "RPG": 31.6, "APG": 14.5, "SPG": 6.9, "BPG": 3.5, "TOV": 9.5, "PF": 17.6}
+STATS_B = {"team_name": "Duke", "GP": 35, "MPG": 40.1, "PPG": 83.3, "FGM": 29.1, "FGA": 59.5,
+           "FG%": 0.489, "3PM": 10.3, "3PA": 27.0, "3P%": 0.381, "FTM": 14.8, "FTA": 18.7, "FT%": 0.788,
+           "ORB": 10.6, "DRB": 26.9, "RPG": 37.5, "APG": 17.1, "SPG": 6.9, "BPG": 3.8, "TOV": 9.3, "PF": 15.9}
+
+
+def import_seconds(statement, cwd, runs=5):
+  # fresh interpreter per run, so nothing is already imported:
+  best = None
+  for _ in range(runs):
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+    seconds = float(out.stdout.strip())
+    best = seconds if best is None else min(best, seconds)
+  return best
+
+
+def pandas_body():
+  # the serialization hoopdeck-predict used before encoder.py
+  import pandas as pd
+  features = [key for key in STATS_A.keys()]
+  dataA = [STATS_A[feature] for feature in features]
+  dataB = [STATS_B[feature] for feature in features]
+  totalData = [0] + dataA + dataB + ["winner"]
+  test = pd.DataFrame([dataA + dataB])
+  return pd.DataFrame([totalData]).to_csv(header=False, index=False).encode("utf-8")
+
+
+def encoder_body():
+  return encoder.encode([encoder.feature_row(STATS_A, STATS_B)], "text/csv")
+
+
+def main():
+  try:
+    import pandas
+    have_pandas = True
+  except ImportError:
+    have_pandas = False
+
+  print("import (best of 5, fresh interpreter):")
+  print(f"  encoder: {import_seconds('import encoder', PREDICT_DIR) * 1000:8.2f} ms")
+  if have_pandas:
+    print(f"  pandas:  {import_seconds('import pandas', PREDICT_DIR) * 1000:8.2f} ms")
+
+  n = 2000
+  print(f"serialize one matchup (mean of {n}):")
+  print(f"  encoder: {timeit.timeit(encoder_body, number=n) / n * 1e6:8.1f} us")
+  if have_pandas:
+    print(f"  pandas:  {timeit.timeit(pandas_body, number=n) / n * 1e6:8.1f} us")
+    same = pandas_body() == encoder_body()
+    print(f"identical CSV: {same}")
+
+
+if __name__ == "__main__":
+  main()
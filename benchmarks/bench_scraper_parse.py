@@ -0,0 +1,132 @@
+#
+# bench_scraper_parse.py
+#
+# Compares the scraper's old BeautifulSoup html.parser path with
+# statsparser.py's streaming lxml parser on saved copies of the
+# RealGM team stats page: parse time, peak memory, and that both
+# return the same rows.
+#
+#   python benchmarks/bench_scraper_parse.py [page.html ...]
+#
+# Save a page with e.g.
+#   curl -A "Mozilla/5.0" -o realgm.html https://basketball.realgm.com/ncaa/team-stats
+# Without arguments a synthetic page of the same shape (364 teams
+# plus navigation, ads and scripts around the table) is generated.
+#
+# Peak memory is the growth of the process' max RSS during one
+# parse, measured in a fresh interpreter per parser (tracemalloc
+# doesn't see libxml2's allocations).
+#
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_DIR = os.path.join(HERE, "..", "lambdas", "hoopdeck-scraper")
+sys.path.insert(0, SCRAPER_DIR)
+
+import statsparser
+
+CHUNK_SIZE = 64 * 1024
+
+
+def synthetic_page(num_teams=364, seed=0):
+  rng = random.Random(seed)
+  nav = "".join(f'<li><a href="/ncaa/team/{i}">Team {i}</a></li>' for i in range(2000))
+  header = "".join(f"<th>{h}</th>" for h in ["#", "Team", "GP", "MPG", "PPG", "FGM", "FGA", "FG%", "3PM",
+                                              "3PA", "3P%", "FTM", "FTA", "FT%", "ORB", "DRB", "RPG",
+                                              "APG", "SPG", "BPG", "TOV", "PF"])
+  rows = []
+  for rank in range(1, num_teams + 1):
+    stats = [str(rng.randint(25, 36)), f"{rng.uniform(39.5, 41):.1f}", f"{rng.uniform(60, 90):.1f}"]
+    for attempts in (rng.uniform(50, 65), rng.uniform(15, 30), rng.uniform(12, 25)):
+      pct = rng.uniform(0.3, 0.8)
+      stats += [f"{attempts * pct:.1f}", f"{attempts:.1f}", f"{pct:.3f}".lstrip("0")]
+    stats += [f"{rng.uniform(0, 40):.1f}" for _ in range(8)]
+    cells = [str(rank), f'<a href="/ncaa/team/{rank}">Team {rank} State</a>'] + stats
+    rows.append('<tr class="row">' + "".join(f'<td data-th="x">{c}</td>' for c in cells) + "</tr>")
+  scripts = "".join(f"<script>var ad{i} = {{slot: {i}, sizes: [[300, 250]]}};</script>" for i in range(300))
+  return ("<!DOCTYPE html><html><head><title>NCAA Team Stats</title>" + scripts + "</head><body>"
+          + f"<nav><ul>{nav}</ul></nav>"
+          + '<table class="tablesaw compact" data-tablesaw-mode="swipe"><thead><tr>' + header + "</tr></thead><tbody>"
+          + "\n".join(rows) + "</tbody></table>"
+          + f"<footer><ul>{nav}</ul></footer>" + scripts + "</body></html>").encode("utf-8")
+
+
+def chunks_of(data):
+  return (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+
+def parse_lxml(data):
+  return list(statsparser.iter_team_rows(chunks_of(data)))
+
+
+def parse_bs4(data):
+  return statsparser.parse_with_bs4(data)
+
+
+PARSERS = {"bs4": parse_bs4, "lxml": parse_lxml}
+
+
+def peak_rss_kb(parser, path):
+  # fresh interpreter: max RSS growth over one parse. VmHWM (Linux)
+  # starts over at exec; ru_maxrss may start at the parent's peak.
+  code = f"""
+import resource, sys
+sys.path.insert(0, {HERE!r})
+import bench_scraper_parse as b
+
+def peak():
+  try:
+    with open("/proc/self/status") as f:
+      return int(next(line for line in f if line.startswith("VmHWM")).split()[1])
+  except OSError:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+data = open({path!r}, "rb").read()
+import bs4, lxml.etree   # imports don't count
+before = peak()
+rows = b.PARSERS["{parser}"](data)
+print(peak() - before)
+"""
+  out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+  return int(out.stdout.strip().splitlines()[-1])
+
+
+def bench(path):
+  with open(path, "rb") as f:
+    data = f.read()
+  print(f"{os.path.basename(path)}: {len(data) / 1024:.0f} KB")
+
+  results = {}
+  for name, parse in PARSERS.items():
+    results[name] = parse(data)
+    runs = 5
+    seconds = min(timeit.repeat(lambda: parse(data), number=1, repeat=runs))
+    print(f"  {name:5} {seconds * 1000:8.1f} ms  peak +{peak_rss_kb(name, path) / 1024:6.1f} MB"
+          f"  {len(results[name])} rows")
+
+  same = json.dumps(results["bs4"]) == json.dumps(results["lxml"])
+  print(f"  same rows: {same}")
+  return same
+
+
+def main():
+  paths = sys.argv[1:]
+  if len(paths) == 0:
+    fixture = os.path.join(tempfile.gettempdir(), "hoopdeck_synthetic_team_stats.html")
+    with open(fixture, "wb") as f:
+      f.write(synthetic_page())
+    paths = [fixture]
+
+  ok = all([bench(path) for path in paths])
+  return 0 if ok else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
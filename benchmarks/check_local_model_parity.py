@@ -0,0 +1,143 @@
+#
+# check_local_model_parity.py
+#
+# Checks that hoopdeck-predict's local mode (localmodel.py) gives
+# the same margins as the SageMaker endpoint it replaces, against
+# recorded endpoint outputs:
+#
+#   python benchmarks/check_local_model_parity.py record \
+#       teams_2025.npz <endpoint> recorded.jsonl [--n 500]
+#
+#     samples matchups from a season snapshot (the scraper's
+#     snapshots/teams_{season}.npz), scores them on the endpoint and
+#     writes one {"statsA", "statsB", "margin"} line per matchup
+#
+#   python benchmarks/check_local_model_parity.py check \
+#       <artifact> recorded.jsonl [--model-type xgboost] [--tol 1e-3]
+#
+#     scores the recorded matchups locally and exits 1 if any margin
+#     differs from the recorded one by more than tol
+#
+# record needs AWS credentials; check runs anywhere with NumPy.
+#
+# No endpoint recording is committed. What the test suite checks is
+# parity with XGBoost itself: tests/fixtures holds a model and
+# XGBoost's predictions for it (benchmarks/record_xgboost_fixture.py),
+# in the same format, so
+#
+#   python benchmarks/check_local_model_parity.py check \
+#       ../../tests/fixtures/xgboost_model.json \
+#       tests/fixtures/xgboost_recorded.jsonl
+#
+# runs the same comparison.
+#
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PREDICT_DIR = os.path.join(HERE, "..", "lambdas", "hoopdeck-predict")
+sys.path.insert(0, PREDICT_DIR)
+
+import localmodel
+
+
+def snapshot_stats(path):
+  # the snapshot's columns => one /stats dictionary per team
+  with np.load(path) as snapshot:
+    names = snapshot["team_name"].tolist()
+    columns = {f: snapshot[f].tolist() for f in localmodel.NUMERIC_FEATURES}
+
+  teams = []
+  for i, name in enumerate(names):
+    stats = {"team_name": name}
+    for f in localmodel.NUMERIC_FEATURES:
+      value = columns[f][i]
+      stats[f] = None if value != value else round(value, 3)   # NaN => None, undo float32
+    teams.append(stats)
+  return teams
+
+
+def record(args):
+  import boto3
+  import encoder
+  import lambda_function
+
+  teams = snapshot_stats(args.snapshot)
+  rng = random.Random(args.seed)
+  matchups = [tuple(rng.sample(teams, 2)) for _ in range(args.n)]
+
+  client = boto3.client("runtime.sagemaker")
+  rows = [encoder.feature_row(a, b) for a, b in matchups]
+  margins = lambda_function.score_rows(client, args.endpoint, args.content_type, rows, args.batch_size)
+
+  with open(args.output, "w") as f:
+    for (statsA, statsB), margin in zip(matchups, margins):
+      f.write(json.dumps({"statsA": statsA, "statsB": statsB, "margin": margin}) + "\n")
+  print(f"recorded {len(margins)} endpoint predictions in {args.output}")
+
+
+def check(args):
+  with open(args.recorded) as f:
+    records = [json.loads(line) for line in f if line.strip()]
+  if len(records) == 0:
+    print("no recorded predictions")
+    return 1
+
+  model = localmodel.load_model(args.artifact, args.model_type)
+  matchups = [(r["statsA"], r["statsB"]) for r in records]
+
+  start = time.perf_counter()
+  local = np.array(localmodel.score_matchups(model, matchups))
+  seconds = time.perf_counter() - start
+
+  recorded = np.array([r["margin"] for r in records], dtype=np.float64)
+  diff = np.abs(local - recorded)
+  worst = int(diff.argmax())
+
+  print(f"{len(records)} matchups scored locally in {seconds * 1000:.1f} ms")
+  print(f"max |local - endpoint| = {diff[worst]:.6f} "
+        f"({matchups[worst][0]['team_name']} vs {matchups[worst][1]['team_name']})")
+  print(f"mean |local - endpoint| = {diff.mean():.6f}")
+
+  if diff[worst] > args.tol:
+    print(f"FAIL: {int((diff > args.tol).sum())} margins differ by more than {args.tol}")
+    return 1
+  print("OK")
+  return 0
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  p = commands.add_parser("record")
+  p.add_argument("snapshot")
+  p.add_argument("endpoint")
+  p.add_argument("output")
+  p.add_argument("--n", type=int, default=500)
+  p.add_argument("--seed", type=int, default=0)
+  p.add_argument("--content-type", default="text/csv")
+  p.add_argument("--batch-size", type=int, default=500)
+
+  p = commands.add_parser("check")
+  p.add_argument("artifact")
+  p.add_argument("recorded")
+  p.add_argument("--model-type", default="xgboost")
+  p.add_argument("--tol", type=float, default=1e-3)
+
+  args = parser.parse_args()
+  if args.command == "record":
+    record(args)
+    return 0
+  return check(args)
+
+
+if __name__ == "__main__":
+  sys.exit(main())
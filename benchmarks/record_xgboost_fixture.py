@@ -0,0 +1,99 @@
+#
+# record_xgboost_fixture.py
+#
+# Writes the parity fixture tests/test_predict_localmodel.py checks
+# localmodel.py against: a small XGBoost model trained on synthetic
+# team stats (some missing, to exercise default directions), and
+# XGBoost's own predictions for held-out matchups, in the
+# {"statsA", "statsB", "margin"} lines check_local_model_parity.py
+# reads:
+#
+#   python benchmarks/record_xgboost_fixture.py [--out tests/fixtures]
+#
+# Needs xgboost. The predictions are XGBoost's (the library the
+# SageMaker XGBoost endpoint runs), not the live endpoint's; use
+# check_local_model_parity.py record / check for those.
+#
+
+import argparse
+import json
+import os
+import random
+import sys
+
+import numpy as np
+import xgboost
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PREDICT_DIR = os.path.join(HERE, "..", "lambdas", "hoopdeck-predict")
+sys.path.insert(0, PREDICT_DIR)
+
+import localmodel
+
+#
+# per-stat (mean, standard deviation), roughly a Division I season:
+#
+STAT_SPREAD = {
+  "GP": (31, 2), "MPG": (40.2, 0.3), "PPG": (72, 6), "FGM": (25.5, 2.5), "FGA": (58, 3.5),
+  "FG%": (0.44, 0.025), "3PM": (7.5, 1.5), "3PA": (22, 3.5), "3P%": (0.34, 0.025),
+  "FTM": (13.5, 2.2), "FTA": (19, 2.8), "FT%": (0.71, 0.04), "ORB": (9.5, 1.6),
+  "DRB": (24, 2), "RPG": (33.5, 2.6), "APG": (13.5, 2), "SPG": (6.5, 1.2),
+  "BPG": (3.3, 1), "TOV": (11.5, 1.6), "PF": (17, 1.7),
+}
+
+
+def random_team(rng, n, missing):
+  stats = {"team_name": f"Team {n}"}
+  for f in localmodel.NUMERIC_FEATURES:
+    mean, sd = STAT_SPREAD[f]
+    stats[f] = None if rng.random() < missing else round(rng.gauss(mean, sd), 3)
+  return stats
+
+
+def margin(statsA, statsB, rng):
+  # a made-up "true" margin the model learns
+  def value(stats, f):
+    return STAT_SPREAD[f][0] if stats[f] is None else stats[f]
+  return (value(statsA, "PPG") - value(statsB, "PPG")
+          + 40 * (value(statsA, "FG%") - value(statsB, "FG%"))
+          - 0.8 * (value(statsA, "TOV") - value(statsB, "TOV"))
+          + rng.gauss(0, 4))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--out", default=os.path.normpath(os.path.join(HERE, "..", "tests", "fixtures")))
+  parser.add_argument("--teams", type=int, default=120)
+  parser.add_argument("--train", type=int, default=3000)
+  parser.add_argument("--test", type=int, default=100)
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  rng = random.Random(args.seed)
+  teams = [random_team(rng, n, missing=0.05) for n in range(args.teams)]
+  pairs = [tuple(rng.sample(teams, 2)) for _ in range(args.train + args.test)]
+  train, test = pairs[:args.train], pairs[args.train:]
+
+  names = [f"A_{f}" for f in localmodel.NUMERIC_FEATURES] + [f"B_{f}" for f in localmodel.NUMERIC_FEATURES]
+  dtrain = xgboost.DMatrix(localmodel.feature_matrix(train), label=[margin(a, b, rng) for a, b in train],
+                           feature_names=names)
+  booster = xgboost.train({"objective": "reg:squarederror", "max_depth": 4, "eta": 0.3, "seed": args.seed},
+                          dtrain, num_boost_round=25)
+
+  os.makedirs(args.out, exist_ok=True)
+  model_path = os.path.join(args.out, "xgboost_model.json")
+  booster.save_model(model_path)
+
+  dtest = xgboost.DMatrix(localmodel.feature_matrix(test), feature_names=names)
+  predictions = booster.predict(dtest).tolist()
+
+  recorded_path = os.path.join(args.out, "xgboost_recorded.jsonl")
+  with open(recorded_path, "w") as f:
+    for (statsA, statsB), prediction in zip(test, predictions):
+      f.write(json.dumps({"statsA": statsA, "statsB": statsB, "margin": prediction}) + "\n")
+
+  print(f"xgboost {xgboost.__version__}: wrote {model_path} and {len(test)} predictions to {recorded_path}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,192 @@
+#
+# On-disk cache of processed (transparent background) team logos
+# for the hoop deck client.
+#
+# Processed images are stored once per distinct content under
+# <cache dir>/blobs/<sha256>.png; index.json maps each logo URL to
+# its blob plus the ETag / Last-Modified the server sent, so a
+# cached logo is revalidated with one conditional GET (usually a
+# 304) at most once per session, and never re-masked. The cache
+# is bounded in bytes; least recently used logos are evicted. A
+# logo that can't be downloaded (and isn't cached) is remembered as
+# missing for the rest of the session rather than asked for again
+# on every chart.
+#
+# Authors:
+#   Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from io import BytesIO
+from PIL import Image
+
+
+class LogoCache:
+
+  def __init__(self, cache_dir, max_bytes, session, process):
+    """
+    Parameters
+    ----------
+    cache_dir: directory for the cache (created if needed)
+    max_bytes: max total size of cached images
+    session: requests session used for downloads
+    process: function turning a downloaded RGBA image into the
+      image to cache (e.g. removing the white background)
+    """
+    self.cache_dir = cache_dir
+    self.blob_dir = os.path.join(cache_dir, "blobs")
+    self.index_path = os.path.join(cache_dir, "index.json")
+    self.max_bytes = max_bytes
+    self.session = session
+    self.process = process
+
+    self._lock = threading.Lock()
+    self._url_locks = {}
+    self._images = {}     # url => Image loaded this session, None if it failed
+
+    os.makedirs(self.blob_dir, exist_ok=True)
+    self._index = self._load_index()
+
+  def get(self, url):
+    """
+    Returns the processed image for a logo URL, or None if it can't
+    be downloaded and isn't cached
+
+    Parameters
+    ----------
+    url: the URL of the logo
+
+    Returns
+    -------
+    Image, or None
+    """
+    # one download per URL even when many threads ask at once
+    # (e.g. the N/A fallback image):
+    with self._lock:
+      url_lock = self._url_locks.setdefault(url, threading.Lock())
+
+    with url_lock:
+      if url in self._images:
+        return self._images[url]
+
+      try:
+        image = self._fetch(url)
+      except Exception as e:
+        # e.g. not an image
+        print(f"Error fetching image: {e}")
+        image = None
+
+      with self._lock:
+        self._images[url] = image
+      return image
+
+  def _fetch(self, url):
+    with self._lock:
+      entry = self._index.get(url)
+
+    cached = None
+    headers = {}
+    if entry is not None:
+      cached = self._read_blob(entry["blob"])
+      if cached is not None:
+        if entry.get("etag"):
+          headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+          headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+      response = self.session.get(url, headers=headers)
+    except Exception as e:
+      # offline: a stale logo beats no logo
+      print(f"Error fetching image: {e}")
+      return cached
+
+    if response.status_code == 304 and cached is not None:
+      self._touch(url)
+      return cached
+
+    if response.status_code != 200:
+      return cached
+
+    image = self.process(Image.open(BytesIO(response.content)).convert("RGBA"))
+    self._store(url, image, response.headers)
+    return image
+
+  def _read_blob(self, blob):
+    try:
+      with Image.open(os.path.join(self.blob_dir, blob + ".png")) as image:
+        image.load()
+        return image.copy()
+    except Exception:
+      return None
+
+  def _store(self, url, image, headers):
+    buffer = BytesIO()
+    image.save(buffer, "PNG")
+    data = buffer.getvalue()
+    blob = hashlib.sha256(data).hexdigest()
+
+    path = os.path.join(self.blob_dir, blob + ".png")
+    if not os.path.exists(path):
+      # a temp file of its own, since other threads may be writing
+      # the same blob:
+      with tempfile.NamedTemporaryFile(dir=self.blob_dir, suffix=".tmp", delete=False) as f:
+        f.write(data)
+      os.replace(f.name, path)
+
+    with self._lock:
+      self._index[url] = {
+        "blob": blob,
+        "size": len(data),
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "last_used": time.time()
+      }
+      self._evict()
+      self._save_index()
+
+  def _touch(self, url):
+    with self._lock:
+      self._index[url]["last_used"] = time.time()
+      self._save_index()
+
+  def _evict(self):
+    # caller holds self._lock; blobs shared by several URLs count once
+    blob_sizes = {entry["blob"]: entry["size"] for entry in self._index.values()}
+    total = sum(blob_sizes.values())
+
+    for url in sorted(self._index, key=lambda u: self._index[u]["last_used"]):
+      if total <= self.max_bytes:
+        break
+      blob = self._index.pop(url)["blob"]
+      if any(entry["blob"] == blob for entry in self._index.values()):
+        continue
+      total -= blob_sizes[blob]
+      try:
+        os.remove(os.path.join(self.blob_dir, blob + ".png"))
+      except OSError:
+        pass
+
+  def _load_index(self):
+    try:
+      with open(self.index_path) as f:
+        return json.load(f)
+    except FileNotFoundError:
+      return {}
+    except Exception as e:
+      logging.error("logo cache index unreadable, starting empty:")
+      logging.error(e)
+      return {}
+
+  def _save_index(self):
+    # caller holds self._lock
+    with open(self.index_path + ".tmp", "w") as f:
+      json.dump(self._index, f)
+    os.replace(self.index_path + ".tmp", self.index_path)
@@ -32,11 +32,79 @@ from io import BytesIO
 from PIL import Image
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
+import bracket
+from logocache import LogoCache
+from requests.adapters import HTTPAdapter
+
+# ------------------------------------------------------------
+# Shared HTTP layer: one keep-alive session for every request
+# (stats, logos, snapshots) and one bounded thread pool for
+# fan-out, both sized by setup_http from [client] max_concurrency
+# in the config file.
+
+session = requests.Session()
+executor = None
+
+def setup_http(max_concurrency):
+  """
+  Sizes the shared session's connection pool and creates the
+  shared thread pool
+
+  Parameters
+  ----------
+  max_concurrency: max # of requests in flight at once
+
+  Returns
+  -------
+  nothing
+  """
+  global executor
+
+  adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+  session.mount("https://", adapter)
+  session.mount("http://", adapter)
+
+  executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+# ------------------------------------------------------------
+# Helper function: remove_white_background
+
+  # Makes the white (or near white) background of a logo
+  # transparent.
+
+  # Parameters
+  # ----------
+  # img : Image
+  #     RGBA image of a logo.
+
+  # Returns
+  # -------
+  #   Image:
+  #   Processed image with a transparent background.
+
+def remove_white_background(img):
+    """Removes the white background of an RGBA image."""
+    # Convert image to numpy array
+    data = np.array(img)
+    red, green, blue, alpha = data[:, :, 0], data[:, :, 1], data[:, :, 2], data[:, :, 3]
+
+    # Create mask where the background is white (or near white)
+    white_mask = (red > 200) & (green > 200) & (blue > 200)
+
+    # Set those pixels to transparent
+    data[white_mask] = [0, 0, 0, 0]
+
+    # Convert back to an image
+    return Image.fromarray(data, "RGBA")
+
 # ------------------------------------------------------------
 # Helper function: get_image_from_url2
 
-  # Fetches an image from the given URL, removes its white background,
-  # and returns a transparent image.
+  # Returns the logo at the given URL with its white background
+  # removed, from the on-disk logo cache (see logocache.py) when
+  # possible: a cached logo is revalidated at most once per
+  # session and never re-processed.
 
   # Parameters
   # ----------
@@ -47,30 +115,13 @@ import numpy as np
   # -------
   #   Image:
   #   Processed image with a transparent background, or None if the request fails.
-    
-def get_image_from_url2(url):
-    """Fetches an image, removes the white background, and returns a transparent image."""
-    try:
-        response = requests.get(url, stream=True)
-        if response.status_code == 200:
-            img = Image.open(BytesIO(response.content)).convert("RGBA")  # Ensure transparency
-
-            # Convert image to numpy array
-            data = np.array(img)
-            red, green, blue, alpha = data[:, :, 0], data[:, :, 1], data[:, :, 2], data[:, :, 3]
-
-            # Create mask where the background is white (or near white)
-            white_mask = (red > 200) & (green > 200) & (blue > 200)
 
-            # Set those pixels to transparent
-            data[white_mask] = [0, 0, 0, 0]
+logo_cache = None
 
-            # Convert back to an image
-            img = Image.fromarray(data, "RGBA")
-            return img
-        else:
-            #print(f"Failed to load image: {url}")
-            return None
+def get_image_from_url2(url):
+    """Fetches an image (via the logo cache) with the white background removed."""
+    try:
+        return logo_cache.get(url)
     except Exception as e:
         print(f"Error fetching image: {e}")
         return None
@@ -104,7 +155,7 @@ def web_service_get(url):
     retries = 0
     
     while True:
-      response = requests.get(url)
+      response = session.get(url)
         
       if response.status_code in [200, 204, 400, 480, 481, 482, 500]:
         #
@@ -136,6 +187,98 @@ def web_service_get(url):
     return None
     
 
+def web_service_post(url, body):
+  """
+  Submits a POST request with a JSON body, retrying like
+  web_service_get (at most 3 tries)
+
+  Parameters
+  ----------
+  url: url for calling the web service
+  body: dictionary sent as the JSON request body
+
+  Returns
+  -------
+  response received from web service
+  """
+
+  try:
+    retries = 0
+
+    while True:
+      response = session.post(url, json=body)
+
+      if response.status_code in [200, 204, 400, 480, 481, 482, 500]:
+        break
+
+      retries = retries + 1
+      if retries < 3:
+        time.sleep(retries)
+        continue
+
+      break
+
+    return response
+
+  except Exception as e:
+    print("**ERROR**")
+    logging.error("web_service_post() failed:")
+    logging.error("url: " + url)
+    logging.error(e)
+    return None
+
+
+############################################################
+#
+# get_snapshot
+#
+# Season snapshots downloaded this session, year => columns
+#
+snapshots = {}
+
+def get_snapshot(baseurl, year):
+  """
+  Downloads the compressed stats snapshot of a whole season (all
+  teams, one array per stat) once per session, so later lookups
+  are local
+
+  Parameters
+  ----------
+  baseurl: baseurl for hoop deck web service
+  year: season, e.g. "2025"
+
+  Returns
+  -------
+  dict of numpy arrays ("team_name", "rank", "PPG", ...), or None
+  if no snapshot is available
+  """
+
+  if year in snapshots:
+    return snapshots[year]
+
+  url = baseurl + '/stats/snapshot/' + year
+  res = web_service_get(url)
+
+  if res is None or res.status_code != 200:
+    return None
+
+  try:
+    download = session.get(res.json()["url"])
+    if download.status_code != 200:
+      return None
+
+    with np.load(BytesIO(download.content)) as npz:
+      columns = {name: npz[name] for name in npz.files}
+
+  except Exception as e:
+    logging.error("get_snapshot() failed:")
+    logging.error(e)
+    return None
+
+  snapshots[year] = columns
+  return columns
+
+
 ############################################################
 #
 # prompt
@@ -161,6 +304,7 @@ def prompt():
       print("   3 => analyze stats")
       print("   4 => predict winner")
       print("   5 => stats legend")
+      print("   6 => simulate bracket")
 
       cmd = input()
 
@@ -206,6 +350,32 @@ def statsKey():
   print("TOV: Turnovers Per Game")
   print("PF: Personal Fouls")
 
+############################################################
+#
+# or_na, format_event_date, format_event_time
+#
+#   Display helpers for /events (v2), which sends ISO dates,
+#   24 hour times and null for missing values.
+#
+def or_na(value):
+  return "N/A" if value is None else value
+
+def format_event_date(date):
+  if date is None:
+    return "N/A"
+  try:
+    return datetime.strptime(date, "%Y-%m-%d").strftime("%B %d, %Y")
+  except ValueError:
+    return "N/A"
+
+def format_event_time(time_of_day):
+  if time_of_day is None:
+    return "N/A"
+  try:
+    return datetime.strptime(time_of_day, "%H:%M").strftime("%-I:%M %p")
+  except ValueError:
+    return "N/A"
+
 ############################################################
 #
 # ticketmaster
@@ -230,7 +400,7 @@ def ticketmaster(baseurl):
 
     # call the web service:
     api = '/events'
-    params = f'/{city}'
+    params = f'/{city}?v=2'   # compact column layout, gzipped
     url = baseurl + api + params
 
     # res = requests.get(url)
@@ -260,15 +430,24 @@ def ticketmaster(baseurl):
 
     body = res.json()
 
-    for name, time, formatted_time, date, formatted_date, minPrice, maxPrice, gameUrl, venue, address in body:
+    columns = body["columns"]
+    for i in range(body["count"]):
+      venue = body["venues"][columns["venue"][i]]
+      teams = [body["teams"][str(team_id)] for team_id in columns["teams"][i]]
+      gameUrl = columns["url"][i]
+      if gameUrl is not None and not gameUrl.startswith("http"):
+        gameUrl = body["url_prefix"] + gameUrl
+
       print(f"""
-📅 {formatted_date}
-🏀 **{name}**
-🕒 Time: {formatted_time} local time
-📍 Venue: {venue}
-📌 Address: {address}
-💰 Price Range: ${minPrice} - ${maxPrice}
-🎟 TICKET HERE: {gameUrl}
+📅 {format_event_date(columns["date"][i])}
+🏀 **{or_na(columns["name"][i])}**""")
+      if len(teams) > 0:
+        print("🆚 Teams: " + " vs. ".join(teams))
+      print(f"""🕒 Time: {format_event_time(columns["time"][i])} local time
+📍 Venue: {or_na(venue["name"])}
+📌 Address: {or_na(venue["address"])}
+💰 Price Range: ${or_na(columns["min_price"][i])} - ${or_na(columns["max_price"][i])}
+🎟 TICKET HERE: {or_na(gameUrl)}
 """)
       
     return
@@ -328,7 +507,7 @@ def stats(baseurl):
       elif res.status_code == 400: #no games found
         print("")
         print(res.json())
-        if res.json() == "No team found...":
+        if res.json().startswith("No team found"):
           print('[cancel] to quit team stats command')
         else:
           print("append _exact for a direct query (ex. Northwestern_exact)")
@@ -392,6 +571,93 @@ def stats(baseurl):
     logging.error(e)
     return
 
+############################################################
+#
+# get_team_logo
+#
+NA_LOGO_URL = "https://cdn3.iconfinder.com/data/icons/meteocons/512/n-a-512.png"
+
+def get_team_logo(team, team_logos):
+  """
+  Fetches a team's logo (or the N/A image if the team has no logo
+  or it fails to load), safe to run on the shared thread pool
+
+  Parameters
+  ----------
+  team: team name
+  team_logos: dict of team name => logo url
+
+  Returns
+  -------
+  (image or None, zoom size for the chart)
+  """
+
+  # Get the image URL for each team's logo (you can modify this to your actual URLs)
+  if team in team_logos:
+    team_logo_url = team_logos[team]
+    size = 0.15
+  else:
+    print(f"Getting {team} image failed.")
+    team_logo_url = NA_LOGO_URL
+    size = 0.025
+
+  logo_image = get_image_from_url2(team_logo_url)
+  if logo_image == None:
+    print(f"Failed to load image for {team}: {team_logo_url}")
+    team_logo_url = NA_LOGO_URL
+    logo_image = get_image_from_url2(team_logo_url)
+    size = 0.025
+
+  return logo_image, size
+
+############################################################
+#
+# march_madness_2024
+#
+#   Teams plotted by the stats graphs (see graph). This is not the
+#   tournament bracket -- simulate uses bracket_2024.
+#
+march_madness_2024 = [
+  "Purdue", "Tennessee", "Creighton", "Kansas", "Gonzaga", "South Carolina", "Texas", "Utah State",
+  "TCU", "Virginia", "Oregon", "McNeese State", "Samford", "Akron", "Saint Peter's", "Montana State",
+  "Alabama", "Arizona", "Baylor", "Clemson", "Dayton", "Grand Canyon", "Michigan State", "Nevada",
+  "North Carolina", "Saint Mary's", "Long Beach State", "Charleston", "Colgate", "New Mexico",
+  "Central Michigan", "Ball State", "Houston", "Auburn", "Duke", "Florida", "Arkansas", "Texas A&M", 
+  "Iowa", "Marquette", "Providence", "USC", "Kentucky", "Memphis", "Indiana", "Illinois", "West Virginia", 
+  "Rutgers", "UConn", "UCLA", "Maryland", "Xavier", "Miami (FL)", "Florida State", "Wisconsin", "Missouri",
+  "Seton Hall", "Louisville", "Georgetown", "Syracuse", "Oklahoma", "Pittsburgh", "Colorado", "Brigham Young",
+  "Northwestern"
+]
+
+############################################################
+#
+# bracket_2024
+#
+#   The 2024 tournament (First Four winners in), by region, each
+#   region's teams by seed (1 through 16). Regions are listed so
+#   that the first two meet in one national semifinal and the last
+#   two in the other; bracket.first_round_order puts the teams in
+#   first round order.
+#
+bracket_2024 = {
+  "East": [
+    "UConn", "Iowa State", "Illinois", "Auburn", "San Diego State", "Brigham Young", "Washington State", "Florida Atlantic",
+    "Northwestern", "Drake", "Duquesne", "UAB", "Yale", "Morehead State", "South Dakota State", "Stetson"
+  ],
+  "West": [
+    "North Carolina", "Arizona", "Baylor", "Alabama", "Saint Mary's", "Clemson", "Dayton", "Mississippi State",
+    "Michigan State", "Nevada", "New Mexico", "Grand Canyon", "Charleston", "Colgate", "Long Beach State", "Wagner"
+  ],
+  "South": [
+    "Houston", "Marquette", "Kentucky", "Duke", "Wisconsin", "Texas Tech", "Florida", "Nebraska",
+    "Texas A&M", "Colorado", "North Carolina State", "James Madison", "Vermont", "Oakland", "Western Kentucky", "Longwood"
+  ],
+  "Midwest": [
+    "Purdue", "Tennessee", "Creighton", "Kansas", "Gonzaga", "South Carolina", "Texas", "Utah State",
+    "TCU", "Colorado State", "Oregon", "McNeese State", "Samford", "Akron", "Saint Peter's", "Grambling"
+  ],
+}
+
 ############################################################
 #
 # graph
@@ -409,6 +675,8 @@ def graph(baseurl, teamImages):
   file path of created graph
   """
 
+  logo_futures = {}
+
   try:
 
     # load images
@@ -482,18 +750,6 @@ def graph(baseurl, teamImages):
     }
 
 
-    march_madness_2024 = [
-      "Purdue", "Tennessee", "Creighton", "Kansas", "Gonzaga", "South Carolina", "Texas", "Utah State",
-      "TCU", "Virginia", "Oregon", "McNeese State", "Samford", "Akron", "Saint Peter's", "Montana State",
-      "Alabama", "Arizona", "Baylor", "Clemson", "Dayton", "Grand Canyon", "Michigan State", "Nevada",
-      "North Carolina", "Saint Mary's", "Long Beach State", "Charleston", "Colgate", "New Mexico",
-      "Central Michigan", "Ball State", "Houston", "Auburn", "Duke", "Florida", "Arkansas", "Texas A&M", 
-      "Iowa", "Marquette", "Providence", "USC", "Kentucky", "Memphis", "Indiana", "Illinois", "West Virginia", 
-      "Rutgers", "UConn", "UCLA", "Maryland", "Xavier", "Miami (FL)", "Florida State", "Wisconsin", "Missouri",
-      "Seton Hall", "Louisville", "Georgetown", "Syracuse", "Oklahoma", "Pittsburgh", "Colorado", "Brigham Young",
-      "Northwestern"
-    ]
-
     valid_stats = ["PPG", "FGM", "FGA", "FG%", "3PM", "3PA", "3P%", "FTM", "FTA", "FT%", "ORB", "DRB", "RPG", "APG", "SPG", "BPG", "TOV", "PF"]
     print("")
     print("Stats: PPG, FGM, FGA, FG%, 3PM, 3PA, 3P%, FTM, FTA, FT%, ORB, DRB, RPG, APG, SPG, BPG, TOV, PF")
@@ -534,20 +790,34 @@ def graph(baseurl, teamImages):
     x = []
     y = []
 
-    plt.clf()
-    fig, ax = plt.subplots()
+    # start every logo download on the shared pool first, so they run
+    # while the stats are fetched below:
     for team_in_group in march_madness_2024:
-      
-      params = f'/{team_in_group}_exact/{year}'
+      logo_futures[team_in_group] = executor.submit(get_team_logo, team_in_group, team_logos_2024)
+
+    # the whole league in one download when a snapshot is available,
+    # otherwise one bulk request for the field:
+    snapshot = get_snapshot(baseurl, year)
+
+    if snapshot is not None:
+      index = {name: i for i, name in enumerate(snapshot["team_name"])}
+      missing = [team for team in march_madness_2024 if team not in index]
+      field_stats = [
+        {"team_name": team,
+         xAxis: float(snapshot[xAxis][index[team]]),
+         yAxis: float(snapshot[yAxis][index[team]])}
+        for team in march_madness_2024 if team in index
+      ]
+    else:
+      params = f'/bulk/{year}?field=march_madness_2024'
       url = baseurl + api + params
 
-      # res = requests.get(url)
       res = web_service_get(url)
 
       if res.status_code == 200:
         pass
-      elif res.status_code == 400: #no games found
-        print(f"{team_in_group} in march_madness_2024 is invalid")
+      elif res.status_code == 400:
+        print("Error message:", res.json())
         return
       else:
         print("**ERROR: failed with status code:", res.status_code)
@@ -556,31 +826,31 @@ def graph(baseurl, teamImages):
           body = res.json()
           print("Error message:", body)
         return
-      
+
       body = res.json()
-      x_value = body[xAxis]
-      y_value = body[yAxis]
+      missing = body["missing"]
+      field_stats = body["teams"]
+
+    if len(missing) > 0:
+      for team_in_group in missing:
+        print(f"{team_in_group} in march_madness_2024 is invalid")
+      return
+
+    plt.clf()
+    fig, ax = plt.subplots()
+    for team_stats in field_stats:
+      team_in_group = team_stats["team_name"]
+      x_value = team_stats[xAxis]
+      y_value = team_stats[yAxis]
       x.append(x_value)
       y.append(y_value)
 
 
-      # Get the image URL for each team's logo (you can modify this to your actual URLs)
-      if team_in_group in team_logos_2024:
-        team_logo_url = team_logos_2024[team_in_group]
-        size = 0.15
+      if team_in_group in logo_futures:
+        logo_image, size = logo_futures[team_in_group].result()
       else:
-        print(f"Getting {team_in_group} image failed.")
-        team_logo_url = "https://cdn3.iconfinder.com/data/icons/meteocons/512/n-a-512.png"
-        size = 0.025
-      
-      logo_image = get_image_from_url2(team_logo_url)
-      if logo_image == None:
-        print(f"Failed to load image for {team_in_group}: {team_logo_url}")
-        team_logo_url = "https://cdn3.iconfinder.com/data/icons/meteocons/512/n-a-512.png"
-        logo_image = get_image_from_url2(team_logo_url)
-        size = 0.025
+        logo_image, size = get_team_logo(team_in_group, team_logos_2024)
 
-      
       if logo_image:
         imagebox = OffsetImage(logo_image, zoom=size)  # Adjust zoom for image size
         #imagebox.set_resample(False)
@@ -625,6 +895,11 @@ def graph(baseurl, teamImages):
     logging.error(e)
     return
 
+  finally:
+    # early return: don't leave logo downloads queued on the pool
+    for future in logo_futures.values():
+      future.cancel()
+
 ############################################################
 #
 # predict
@@ -670,7 +945,7 @@ def predict(baseurl):
       elif res.status_code == 400:
         print("")
         print(res.json())
-        if res.json() == "No team found...":
+        if res.json().startswith("No team found"):
           print('[cancel] to quit team stats command')
         else:
           print("Append _exact for a direct query (ex. Northwestern_exact)")  
@@ -704,7 +979,7 @@ def predict(baseurl):
       elif res.status_code == 400:
         print("")
         print(res.json())
-        if res.json() == "No team found...":
+        if res.json().startswith("No team found"):
           print('[cancel] to quit team stats command')
         else:
           print("Append _exact for a direct query (ex. Northwestern_exact)")  
@@ -752,6 +1027,73 @@ def predict(baseurl):
     logging.error(e)
     return
 
+############################################################
+#
+# simulate
+#
+def simulate(baseurl):
+  """
+  Simulates the bracket_2024 tournament many times with the
+  model's predicted margins and prints how often each team reaches
+  each round
+
+  Parameters
+  ----------
+  baseurl: baseurl for hoop deck web service
+
+  Returns
+  -------
+  nothing
+  """
+
+  try:
+    print("")
+
+    year = "2025"
+    field = bracket.first_round_order(list(bracket_2024.values()))
+
+    # every ordered pair of the field, scored in one request:
+    print(f"Predicting all {len(field) * (len(field) - 1)} matchups of the field...")
+    url = baseurl + '/predict/batch'
+    res = web_service_post(url, {"year": int(year), "field": field})
+
+    if res is None:
+      return
+    if res.status_code == 400:
+      print("Error message:", res.json())
+      return
+    if res.status_code != 200:
+      print("**ERROR: failed with status code:", res.status_code)
+      print("url: " + url)
+      return
+
+    body = res.json()
+    teams = body["teams"]
+    P = bracket.win_probabilities(body["margins"])
+
+    print(f"Simulating {bracket_sims} brackets...")
+    start = time.perf_counter()
+    advance = bracket.simulate(P, bracket_sims)
+    elapsed = time.perf_counter() - start
+    print(f"done in {elapsed:.2f} seconds")
+    print("")
+
+    header = f"{'Team':<20}" + "".join(f"{name:>13}" for name in bracket.ROUND_NAMES)
+    print(header)
+    print("-" * len(header))
+
+    # most likely champions first:
+    for i in np.argsort(-advance[-1], kind="stable"):
+      row = f"{teams[i]:<20}" + "".join(f"{100 * p:>12.1f}%" for p in advance[:, i])
+      print(row)
+
+    return
+
+  except Exception as e:
+    logging.error("**ERROR: simulate() failed:")
+    logging.error(e)
+    return
+
 ############################################################
 #
 # check_url
@@ -828,6 +1170,15 @@ try:
   
   baseurl = check_url(baseurl)
 
+  max_concurrency = configur.getint('client', 'max_concurrency', fallback=8)
+  setup_http(max_concurrency)
+
+  logo_cache_dir = configur.get('client', 'logo_cache_dir', fallback='logo-cache')
+  logo_cache_mb = configur.getint('client', 'logo_cache_mb', fallback=20)
+  logo_cache = LogoCache(logo_cache_dir, logo_cache_mb * 1024 * 1024, session, remove_white_background)
+
+  bracket_sims = configur.getint('client', 'bracket_sims', fallback=100000)
+
   # GET TEAM IMAGES FROM FILE
 
   teamImages = []
@@ -849,6 +1200,8 @@ try:
       predict(baseurl)
     elif cmd == 5:
       statsKey()
+    elif cmd == 6: # print("   6 => simulate bracket")
+      simulate(baseurl)
     else:
       print("** Unknown command, try again...")
     #
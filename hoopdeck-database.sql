@@ -4,6 +4,147 @@ USE hoopdeck;
 
 DROP TABLE IF EXISTS teams;
 
+-- one row per team per season; season is the year the season
+-- ends (2025 = 2024-2025), name_key is the normalized team name
+-- (see teamnames.py). Keep in sync with the scraper's schema.py.
+CREATE TABLE teams
+(
+    id                        INT NOT NULL AUTO_INCREMENT,
+    season                    INT NOT NULL,
+    team_rank                 INT,
+    team_name                 VARCHAR(255) NOT NULL,
+    name_key                  VARCHAR(255) NOT NULL,
+    games_played              INT,
+    minutes_per_game          FLOAT,
+    points_per_game           FLOAT,
+    field_goals_made          FLOAT,
+    field_goals_attempted     FLOAT,
+    field_goal_percentage     FLOAT,
+    three_pointers_made       FLOAT,
+    three_pointers_attempted  FLOAT,
+    three_point_percentage    FLOAT,
+    free_throws_made          FLOAT,
+    free_throws_attempted     FLOAT,
+    free_throw_percentage     FLOAT,
+    offensive_rebounds        FLOAT,
+    defensive_rebounds        FLOAT,
+    rebounds_per_game         FLOAT,
+    assists_per_game          FLOAT,
+    steals_per_game           FLOAT,
+    blocks_per_game           FLOAT,
+    turnovers                 FLOAT,
+    personal_fouls            FLOAT,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_teams_season_name (season, team_name),
+    KEY ix_teams_season_name_key (season, name_key)
+);
+
+DROP TABLE IF EXISTS team_metrics;
+
+-- derived metrics the scraper computes after each load (see its
+-- metrics.py), one row per season, team and metric; served by
+-- /stats/metrics/{year}
+CREATE TABLE team_metrics
+(
+    season                    INT NOT NULL,
+    team_name                 VARCHAR(255) NOT NULL,
+    metric                    VARCHAR(16) NOT NULL,
+    value                     DOUBLE,
+    percentile                DOUBLE,
+    z_score                   DOUBLE,
+    PRIMARY KEY (season, team_name, metric)
+);
+
+DROP TABLE IF EXISTS predictions;
+
+-- margins cached by hoopdeck-predict (see its predictcache.py);
+-- cache_key hashes the season, both teams' stats and the endpoint.
+-- The scraper deletes a team's rows when its stats change.
+CREATE TABLE predictions
+(
+    cache_key                 CHAR(64) NOT NULL,
+    season                    INT NOT NULL,
+    team_a                    VARCHAR(255) NOT NULL,
+    team_b                    VARCHAR(255) NOT NULL,
+    endpoint                  VARCHAR(255) NOT NULL,
+    margin                    DOUBLE NOT NULL,
+    created_at                TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (cache_key),
+    KEY ix_predictions_team_a (season, team_a),
+    KEY ix_predictions_team_b (season, team_b)
+);
+
+DROP TABLE IF EXISTS scrape_state;
+
+-- the scraper's bookkeeping, key => JSON value (see its
+-- scrapestate.py), e.g. "backfill:2019" => {"status": "done", ...}
+CREATE TABLE scrape_state
+(
+    state_key                 VARCHAR(255) NOT NULL,
+    state_value               TEXT NOT NULL,
+    updated_at                TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (state_key)
+);
+
+DROP TABLE IF EXISTS event_cache;
+
+-- /events/{city} results cached by hoopdeck-ticketmaster (see its
+-- eventcache.py); expires_at is a unix timestamp
+CREATE TABLE event_cache
+(
+    cache_key                 CHAR(64) NOT NULL,
+    description               VARCHAR(255) NOT NULL,
+    payload                   MEDIUMTEXT NOT NULL,
+    expires_at                DOUBLE NOT NULL,
+    PRIMARY KEY (cache_key)
+);
+
+DROP TABLE IF EXISTS venues;
+DROP TABLE IF EXISTS venue_events;
+DROP TABLE IF EXISTS event_regions;
+
+-- venue store of hoopdeck-ticketmaster (see its venuestore.py):
+-- venues indexed by geohash cell for radius searches, the /events
+-- game of each stored event, and when each cell was last searched
+CREATE TABLE venues
+(
+    venue_id                  VARCHAR(64) NOT NULL,
+    name                      VARCHAR(255),
+    address                   VARCHAR(255),
+    latitude                  DOUBLE NOT NULL,
+    longitude                 DOUBLE NOT NULL,
+    geohash                   CHAR(9) NOT NULL,
+    cell                      CHAR(4) NOT NULL,
+    PRIMARY KEY (venue_id),
+    KEY ix_venues_cell (cell)
+);
+
+CREATE TABLE venue_events
+(
+    event_id                  VARCHAR(64) NOT NULL,
+    venue_id                  VARCHAR(64) NOT NULL,
+    local_date                DATE,
+    game                      TEXT NOT NULL,
+    fetched_at                DOUBLE NOT NULL,
+    PRIMARY KEY (event_id),
+    KEY ix_venue_events_venue_date (venue_id, local_date)
+);
+
+-- cell is a region geohash of 4 to 6 characters (venuestore.py's
+-- REGION_PRECISIONS)
+CREATE TABLE event_regions
+(
+    cell                      VARCHAR(12) NOT NULL,
+    fetched_at                DOUBLE NOT NULL,
+    PRIMARY KEY (cell)
+);
+
+-- Upgrading an existing database: do NOT run this script (it drops
+-- teams). Invoke hoopdeck-scraper instead -- every run upgrades an
+-- old teams table in place (season 2025, duplicates removed,
+-- indexes added), and the input {"mode": "migrate"} also copies
+-- any per-season teamsYYYY tables into teams.
+
 DROP USER IF EXISTS 'hoopdeck-read-only';
 DROP USER IF EXISTS 'hoopdeck-read-write';
 
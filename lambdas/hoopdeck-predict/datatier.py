@@ -0,0 +1,486 @@
+#
+# datatier.py
+#
+# Executes SQL queries against a MySQL database.
+#
+# Original author:
+#   Prof. Joe Hummel
+#   Northwestern University
+#
+
+import threading
+
+import pymysql
+
+
+#
+# module-level connection pool: a Lambda container lives across
+# many invocations, so connections opened by one warm invocation
+# are kept here and handed to the next one instead of paying a
+# new TCP+TLS+auth handshake every time.
+#
+POOL_MAX_SIZE = 2   # max idle connections kept per database
+
+_pool = {}          # (endpoint, portnum, username, dbname) => [idle connections]
+_checked_out = {}   # id(dbConn) => pool key, for connections in use
+_pool_stats = {"hits": 0, "misses": 0, "reconnects": 0, "discards": 0}
+_pool_lock = threading.Lock()
+
+
+###################################################################
+#
+# get_dbConn:
+#
+# Opens and returns a connection object for interacting with a
+# MySQL database.
+#
+def get_dbConn(endpoint, portnum, username, pwd, dbname):
+  """
+  Opens and returns a connection object for interacting 
+  with a MySQL database
+
+  Parameters
+  ----------
+  endpoint : machine name or IP address of server (string),
+  portnum : server port # (integer),
+  username : user name for login (string),
+  pwd : user password for login (string),
+  dbname : database name (string)
+
+  Returns
+  -------
+  a connection object
+  """
+  try:
+    dbConn = pymysql.connect(host=endpoint,
+                             port=portnum,
+                             user=username,
+                             passwd=pwd,
+                             database=dbname)
+
+    return dbConn
+
+  except Exception as err:
+    print("datatier.get_dbConn() failed:")
+    print(str(err))
+    raise
+
+
+###################################################################
+#
+# acquire_dbConn:
+#
+# Returns a connection from the module-level pool, opening a new
+# one only if no idle connection is available. Pooled connections
+# are health-checked with a ping first; a dead connection is
+# reconnected, or discarded if that fails too. Hand the
+# connection back with release_dbConn when done.
+#
+def acquire_dbConn(endpoint, portnum, username, pwd, dbname):
+  """
+  Returns a pooled (or, on a pool miss, newly opened) connection
+  object for interacting with a MySQL database
+
+  Parameters
+  ----------
+  endpoint : machine name or IP address of server (string),
+  portnum : server port # (integer),
+  username : user name for login (string),
+  pwd : user password for login (string),
+  dbname : database name (string)
+
+  Returns
+  -------
+  a connection object
+  """
+  key = (endpoint, portnum, username, dbname)
+
+  while True:
+    with _pool_lock:
+      idle = _pool.get(key, [])
+      dbConn = idle.pop() if len(idle) > 0 else None
+
+    if dbConn is None:
+      break
+
+    try:
+      dbConn.ping(reconnect=False)
+      _count("hits")
+    except Exception:
+      # server closed it while we were idle, try once to reconnect:
+      try:
+        dbConn.ping(reconnect=True)
+        _count("reconnects")
+      except Exception as err:
+        print("datatier.acquire_dbConn() discarding dead connection:")
+        print(str(err))
+        _count("discards")
+        _close_quietly(dbConn)
+        continue
+
+    with _pool_lock:
+      _checked_out[id(dbConn)] = key
+    return dbConn
+
+  # pool miss, open a new connection:
+  dbConn = get_dbConn(endpoint, portnum, username, pwd, dbname)
+  _count("misses")
+
+  with _pool_lock:
+    _checked_out[id(dbConn)] = key
+  return dbConn
+
+
+###################################################################
+#
+# release_dbConn:
+#
+# Returns a connection obtained from acquire_dbConn to the pool.
+# Any open transaction is rolled back first so the next user
+# does not inherit a stale read snapshot. If the pool for that
+# database is already full, the connection is closed instead.
+#
+def release_dbConn(dbConn):
+  """
+  Returns a connection to the pool (or closes it if the pool is
+  full or the connection did not come from acquire_dbConn)
+
+  Parameters
+  ----------
+  dbConn : the database connection
+
+  Returns
+  -------
+  nothing
+  """
+  with _pool_lock:
+    key = _checked_out.pop(id(dbConn), None)
+
+  if key is None or not dbConn.open:
+    _close_quietly(dbConn)
+    return
+
+  try:
+    dbConn.rollback()
+  except Exception:
+    _count("discards")
+    _close_quietly(dbConn)
+    return
+
+  with _pool_lock:
+    idle = _pool.setdefault(key, [])
+    if len(idle) < POOL_MAX_SIZE:
+      idle.append(dbConn)
+      return
+
+  _close_quietly(dbConn)
+
+
+###################################################################
+#
+# pool_stats:
+#
+# Returns the pool's hit/miss/reconnect/discard counters and the
+# current number of idle and checked-out connections.
+#
+def pool_stats():
+  """
+  Returns a snapshot of the connection pool counters
+
+  Parameters
+  ----------
+  None
+
+  Returns
+  -------
+  dict of counters (hits, misses, reconnects, discards, idle,
+  in_use)
+  """
+  with _pool_lock:
+    stats = dict(_pool_stats)
+    stats["idle"] = sum(len(idle) for idle in _pool.values())
+    stats["in_use"] = len(_checked_out)
+  return stats
+
+
+def _count(counter):
+  with _pool_lock:
+    _pool_stats[counter] += 1
+
+
+def _close_quietly(dbConn):
+  try:
+    dbConn.close()
+  except Exception:
+    pass
+
+
+##################################################################
+#
+# retrieve_one_row:
+#
+# Given a database connection and an SQL Select query,
+# executes this query against the database and returns
+# the first row (tuple) retrieved by the query (the tuple
+# can be empty if the SELECT retrieved no data). The query
+# can be parameterized using %s, in which case pass the
+# values as a list [value1, value2, ...]
+#
+def retrieve_one_row(dbConn, sql, parameters=[]):
+  """
+  Executes an sql SELECT query against the database connection
+  and returns the first row as a tuple
+
+  Parameters
+  __________
+  dbConn : the database connection, 
+  sql : the SQL SELECT query (can be parameterized with %s),
+  parameters: optional list of values if parameterized
+
+  Returns
+  _______
+  First row as a tuple, or () if SELECT retrieves no data
+  """
+
+  dbCursor = dbConn.cursor()
+
+  try:
+    dbCursor.execute(sql, parameters)
+    row = dbCursor.fetchone()
+    if row is None:  # executed successfully, but no data was retrieved
+      return ()
+    else:
+      return row
+
+  except Exception as err:
+    print("datatier.retrieve_one_row() failed:")
+    print(str(err))
+    raise
+
+  finally:
+    dbCursor.close()
+
+
+##################################################################
+#
+# retrieve_all_rows:
+#
+# Given a database connection and an SQL Select query,
+# executes this query against the database and returns
+# a list of rows (tuples) retrieved by the query. If the
+# query retrieves no data, the empty list [] is returned.
+# The query can be parameterized using %s, in which case
+# pass the values as a list [value1, value2, ...]
+#
+def retrieve_all_rows(dbConn, sql, parameters=[]):
+  """
+  Executes an sql SELECT query against the database connection
+  and returns all rows as a list of tuples
+
+  Parameters
+  __________
+  dbConn : the database connection, 
+  sql : the SQL SELECT query (can be parameterized with %s),
+  parameters: optional list of values if parameterized
+
+  Returns
+  _______
+  All rows as a list of tuples, or [] if SELECT retrieves no
+  data
+  """
+
+  dbCursor = dbConn.cursor()
+
+  try:
+    dbCursor.execute(sql, parameters)
+    rows = dbCursor.fetchall()
+    if rows is None:  # executed successfully, but no data was retrieved
+      return []
+    else:
+      return rows
+
+  except Exception as err:
+    print("datatier.retrieve_all_rows() failed:")
+    print(str(err))
+    raise
+
+  finally:
+    dbCursor.close()
+
+
+###############################################################
+#
+# perform_action:
+#
+# Given a database connection and an SQL action query,
+# executes an ACTION query and returns the number of rows
+# modified; a return value of 0 means no rows were
+# modified. Action queries are typically "insert",
+# "update", "delete". The query can be parameterized
+# using %s, in which case pass the values as a list
+# [value1, value2, ...]
+#
+def perform_action(dbConn, sql, parameters=[]):
+  """
+  Executes an sql ACTION query against the database connection
+  and returns number of rows modified
+
+  Parameters
+  __________
+  dbConn : the database connection, 
+  sql : the SQL SELECT query (can be parameterized with %s),
+  parameters: optional list of values if parameterized
+
+  Returns
+  _______
+  number of rows modified (0 is not an error but implies
+  the query made no modifications)
+  """
+
+  dbCursor = dbConn.cursor()
+
+  try:
+    # try to execute, and if successful commit the changes
+    # and return the # of rows modified by the query:
+    dbCursor.execute(sql, parameters)
+    dbConn.commit()
+    return dbCursor.rowcount
+
+  except Exception as err:
+    # failed, rollback any possible changes and log error:
+    dbConn.rollback()
+    print("datatier.perform_action() failed:")
+    print(str(err))
+    raise
+
+  finally:
+    dbCursor.close()
+
+
+###############################################################
+#
+# perform_bulk_action:
+#
+# Given a database connection, an SQL action query and a
+# list of parameter lists (one per row), executes the query
+# for every row using executemany, batch_size rows at a time,
+# and commits once at the end. pymysql rewrites a batch of
+# "insert ... values (%s, ...)" into a single multi-row
+# INSERT, so each batch is one round trip. If any batch
+# fails, the whole load is rolled back. Returns the total
+# number of rows modified.
+#
+def perform_bulk_action(dbConn, sql, rows, batch_size=500):
+  """
+  Executes an sql ACTION query once per row of parameters
+  against the database connection, in batches and within a
+  single transaction, and returns number of rows modified
+
+  Parameters
+  __________
+  dbConn : the database connection, 
+  sql : the SQL ACTION query (parameterized with %s),
+  rows : iterable of parameter lists, one per row,
+  batch_size : optional max # of rows sent per round trip
+
+  Returns
+  _______
+  total number of rows modified (0 is not an error but
+  implies the query made no modifications)
+  """
+
+  if batch_size < 1:
+    raise ValueError("batch_size must be >= 1")
+
+  dbCursor = dbConn.cursor()
+
+  try:
+    # send the rows batch_size at a time, then commit once
+    # so the load is all-or-nothing:
+    modified = 0
+    batch = []
+
+    for row in rows:
+      batch.append(row)
+      if len(batch) == batch_size:
+        dbCursor.executemany(sql, batch)
+        modified += dbCursor.rowcount
+        batch = []
+
+    if len(batch) > 0:
+      dbCursor.executemany(sql, batch)
+      modified += dbCursor.rowcount
+
+    dbConn.commit()
+    return modified
+
+  except Exception as err:
+    # failed, rollback every batch sent so far and log error:
+    dbConn.rollback()
+    print("datatier.perform_bulk_action() failed:")
+    print(str(err))
+    raise
+
+  finally:
+    dbCursor.close()
+
+
+###############################################################
+#
+# perform_transaction:
+#
+# Given a database connection and a list of (SQL action
+# query, list of parameter lists) pairs, executes every
+# query for each of its rows, in order, batch_size rows at a
+# time, and commits once at the end -- so other connections
+# see all of the changes or none of them (e.g. a delete and
+# the re-insert replacing it). If anything fails, the whole
+# transaction is rolled back. Returns the total number of
+# rows modified.
+#
+def perform_transaction(dbConn, actions, batch_size=500):
+  """
+  Executes several sql ACTION queries against the database
+  connection within a single transaction, and returns number
+  of rows modified
+
+  Parameters
+  __________
+  dbConn : the database connection, 
+  actions : list of (sql, rows) pairs; sql is an ACTION query
+    (parameterized with %s) executed once per parameter list
+    in rows,
+  batch_size : optional max # of rows sent per round trip
+
+  Returns
+  _______
+  total number of rows modified (0 is not an error but
+  implies the queries made no modifications)
+  """
+
+  if batch_size < 1:
+    raise ValueError("batch_size must be >= 1")
+
+  dbCursor = dbConn.cursor()
+
+  try:
+    modified = 0
+
+    for sql, rows in actions:
+      rows = list(rows)
+      for start in range(0, len(rows), batch_size):
+        dbCursor.executemany(sql, rows[start:start + batch_size])
+        modified += dbCursor.rowcount
+
+    dbConn.commit()
+    return modified
+
+  except Exception as err:
+    # failed, rollback every query sent so far and log error:
+    dbConn.rollback()
+    print("datatier.perform_transaction() failed:")
+    print(str(err))
+    raise
+
+  finally:
+    dbCursor.close()
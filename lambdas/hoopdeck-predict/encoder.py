@@ -0,0 +1,134 @@
+#
+# encoder.py
+#
+# Builds the feature rows sent to the SageMaker endpoint and
+# serializes them, without pandas (whose import dominated the
+# Lambda's cold start just to write one CSV line).
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import csv
+import io
+import json
+
+
+#
+# per-team features, in the order the model was trained on (the
+# order /stats returns them in):
+#
+TEAM_FEATURES = [
+  "team_name", "GP", "MPG", "PPG", "FGM", "FGA", "FG%", "3PM", "3PA",
+  "3P%", "FTM", "FTA", "FT%", "ORB", "DRB", "RPG", "APG", "SPG",
+  "BPG", "TOV", "PF"
+]
+
+#
+# a model row: row id, team A features, team B features, and the
+# (unknown) label column:
+#
+#   0, Northwestern, 32, 40.0, 72.4, ..., Duke, 33, 40.0, 83.3, ..., winner
+#
+LABEL_PLACEHOLDER = "winner"
+
+
+###################################################################
+#
+# feature_row:
+#
+def feature_row(statsA, statsB, row_id=0):
+  """
+  Returns the model row for one matchup
+
+  Parameters
+  ----------
+  statsA : /stats dictionary of team A (away),
+  statsB : /stats dictionary of team B (home),
+  row_id : value of the leading id column (int); the endpoint
+    scores this column too, so leave it 0 (as single predictions
+    always sent it) or the margin depends on the row's position
+
+  Returns
+  -------
+  list of values in model column order
+  """
+  return ([row_id] +
+          [statsA[feature] for feature in TEAM_FEATURES] +
+          [statsB[feature] for feature in TEAM_FEATURES] +
+          [LABEL_PLACEHOLDER])
+
+
+###################################################################
+#
+# encode_csv:
+#
+# One line per row, no header, minimal quoting -- the same bytes
+# pandas' to_csv(header=False, index=False) produced.
+#
+def encode_csv(rows):
+  """
+  Serializes model rows as text/csv
+
+  Parameters
+  ----------
+  rows : list of model rows
+
+  Returns
+  -------
+  utf-8 encoded bytes
+  """
+  buffer = io.StringIO()
+  writer = csv.writer(buffer, lineterminator="\n")
+  writer.writerows(rows)
+  return buffer.getvalue().encode("utf-8")
+
+
+###################################################################
+#
+# encode_json:
+#
+# SageMaker's JSON request format for tabular models:
+# {"instances": [{"features": [...]}, ...]}
+#
+def encode_json(rows):
+  """
+  Serializes model rows as application/json
+
+  Parameters
+  ----------
+  rows : list of model rows
+
+  Returns
+  -------
+  utf-8 encoded bytes
+  """
+  instances = [{"features": list(row)} for row in rows]
+  return json.dumps({"instances": instances}, separators=(",", ":")).encode("utf-8")
+
+
+ENCODERS = {
+  "text/csv": encode_csv,
+  "application/json": encode_json,
+}
+
+
+###################################################################
+#
+# encode:
+#
+def encode(rows, content_type="text/csv"):
+  """
+  Serializes model rows for invoke_endpoint
+
+  Parameters
+  ----------
+  rows : list of model rows,
+  content_type : "text/csv" or "application/json"
+
+  Returns
+  -------
+  utf-8 encoded bytes
+  """
+  if content_type not in ENCODERS:
+    raise ValueError(f"unsupported content type {content_type}")
+  return ENCODERS[content_type](rows)
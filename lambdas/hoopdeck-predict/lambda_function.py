@@ -1,101 +1,256 @@
 import json
+import base64
 import boto3
 import os
-import pandas as pd
+import urllib.parse
+
+import datatier
+import encoder
+import localmodel
+import predictcache
+import statsaccess
 
 # import uuid
-# import base64
 # import pathlib
-# import urllib.parse
 # import string
 # import random
 
 from configparser import ConfigParser
 
-import requests
+MAX_BATCH_MATCHUPS = 10000   # a 64-team field is 64 * 63 = 4032 ordered pairs
 
-def lambda_handler(event, context):
-    try:
-        params = event["pathParameters"]
-        teamA = str(params["teamA"])
-        teamB = str(params["teamB"])
-        year = params["year"]
-        print("NEW")
 
-        print(f"Hello from Lambda! {teamA} {teamB} {year}")
+###################################################################
+#
+# score_rows:
+#
+# Sends model rows to the SageMaker endpoint chunk_size rows per
+# invoke_endpoint call and returns one predicted margin per row,
+# in order (positive => team A wins).
+#
+def score_rows(client, endpoint, content_type, rows, chunk_size):
+    margins = []
+    calls = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        body = encoder.encode(chunk, content_type)
+
+        response = client.invoke_endpoint(
+            EndpointName=endpoint,
+            ContentType=content_type,
+            Body=body,
+            Accept="application/json"
+        )
+
+        response_body = response['Body'].read().decode('utf-8')  # Read and decode the body to a string
+        prediction = json.loads(response_body)
+
+        scores = [p["score"] for p in prediction["predictions"]]
+        if len(scores) != len(chunk):
+            raise Exception(f"Endpoint returned {len(scores)} predictions for {len(chunk)} rows")
+        margins.extend(scores)
+        calls += 1
+
+    print(f"scored {len(rows)} rows in {calls} endpoint calls")
+    return margins
+
+
+###################################################################
+#
+# get_scorer:
+#
+# Reads the [model] section of the config file and returns
+# (model name, scorer), where scorer maps a list of (team A stats,
+# team B stats) matchups to their margins:
+#
+#   mode = sagemaker  => rows are sent to the [SageMaker] endpoint
+#   mode = local      => the artifact is loaded into this container
+#                        and scored with NumPy (see localmodel.py)
+#
+# The model name is part of every prediction cache key.
+#
+def get_scorer(configur):
+    mode = configur.get('model', 'mode', fallback='sagemaker')
+
+    if mode == 'local':
+        artifact = configur.get('model', 'artifact')
+        model_type = configur.get('model', 'model_type', fallback='xgboost')
+        model = localmodel.load_model(artifact, model_type)
+
+        def score_local(matchups):
+            return localmodel.score_matchups(model, matchups)
+        return f"local:{model_type}:{artifact}", score_local
+
+    if mode != 'sagemaker':
+        raise ValueError(f"unknown model mode {mode}")
+
+    endpoint = configur.get('SageMaker', 'endpoint')
+    content_type = configur.get('SageMaker', 'content_type', fallback='text/csv')
+    chunk_size = configur.getint('SageMaker', 'batch_size', fallback=500)
+    client = boto3.client("runtime.sagemaker")
+
+    def score_endpoint(matchups):
+        rows = [encoder.feature_row(statsA, statsB) for statsA, statsB in matchups]
+        return score_rows(client, endpoint, content_type, rows, chunk_size)
+    return endpoint, score_endpoint
+
+
+###################################################################
+#
+# predict_margins:
+#
+# Returns the predicted margin of each (team A stats, team B stats)
+# matchup, taking what it can from the prediction cache and scoring
+# only the misses.
+#
+def predict_margins(dbConn, model_name, scorer, season, matchups):
+    keys = [predictcache.cache_key(season, statsA, statsB, model_name) for statsA, statsB in matchups]
+    margins = predictcache.lookup_many(dbConn, keys)
+
+    # score each uncached matchup once, even if it was asked for twice:
+    todo = {}
+    for key, matchup in zip(keys, matchups):
+        if key not in margins and key not in todo:
+            todo[key] = matchup
+
+    if len(todo) > 0:
+        scores = scorer(list(todo.values()))
+
+        entries = []
+        for (key, (statsA, statsB)), margin in zip(todo.items(), scores):
+            margins[key] = margin
+            entries.append((key, season, statsA["team_name"], statsB["team_name"], model_name, margin))
+        predictcache.store_many(dbConn, entries)
+
+    print(f"prediction cache: {predictcache.cache_stats()}")
+    return [margins[key] for key in keys]
+
+
+###################################################################
+#
+# predict_batch:
+#
+# Handles POST /predict/batch with a JSON body of either
+#
+#   {"year": 2025, "matchups": [["Duke", "Purdue"], ...]}
+#       => {"season", "results": [{"teamA", "teamB", "margin"}, ...]}
+#
+#   {"year": 2025, "field": ["Purdue", "Tennessee", ...]}
+#       => {"season", "teams", "margins"} where margins[i][j] is the
+#          margin of teams[i] (away) over teams[j] (home), None on the
+#          diagonal -- every ordered pair of the field
+#
+# Every team's stats are loaded once, in one query, and matchups
+# already in the prediction cache are not re-scored.
+#
+def predict_batch(event, dbConn, model_name, scorer):
+    body = event.get("body") or "{}"
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode("utf-8")
+    request = json.loads(body)
+
+    season = int(request["year"])
+
+    if "field" in request:
+        teams = list(dict.fromkeys(str(team) for team in request["field"]))
+        pairs = [(i, j) for i in range(len(teams)) for j in range(len(teams)) if i != j]
+    else:
+        matchups = [(str(a), str(b)) for a, b in request.get("matchups", [])]
+        teams = list(dict.fromkeys(team for matchup in matchups for team in matchup))
+        index = {team: i for i, team in enumerate(teams)}
+        pairs = [(index[a], index[b]) for a, b in matchups]
 
+    if len(pairs) == 0:
+        return {
+            'statusCode': 400,
+            'body': json.dumps("No matchups requested...")
+        }
+    if len(pairs) > MAX_BATCH_MATCHUPS:
+        return {
+            'statusCode': 400,
+            'body': json.dumps(f"At most {MAX_BATCH_MATCHUPS} matchups per request...")
+        }
+
+    found = statsaccess.get_teams_stats(dbConn, season, teams)
+    missing = [team for team in teams if team.lower() not in found]
+    if len(missing) > 0:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({"error": "Unknown teams", "missing": missing})
+        }
+    stats = [found[team.lower()] for team in teams]
+
+    matchups = [(stats[i], stats[j]) for i, j in pairs]
+    margins = predict_margins(dbConn, model_name, scorer, season, matchups)
+
+    if "field" in request:
+        matrix = [[None] * len(teams) for _ in teams]
+        for (i, j), margin in zip(pairs, margins):
+            matrix[i][j] = margin
+        result = {'season': season, 'teams': teams, 'margins': matrix}
+    else:
+        result = {
+            'season': season,
+            'results': [{'teamA': teams[i], 'teamB': teams[j], 'margin': margin}
+                        for (i, j), margin in zip(pairs, margins)]
+        }
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(result)
+    }
+
+
+def lambda_handler(event, context):
+    dbConn = None
+    try:
         config_file = 'hoopdeck-model-config.ini'
         configur = ConfigParser()
         configur.read(config_file)
-        baseurl = configur.get('client', 'webservice')
-        endpoint = configur.get('SageMaker', 'endpoint')
+        rds_endpoint = configur.get('rds', 'endpoint')
+        rds_portnum = int(configur.get('rds', 'port_number'))
+        rds_username = configur.get('rds', 'user_name')
+        rds_pwd = configur.get('rds', 'user_pwd')
+        rds_dbname = configur.get('rds', 'db_name')
   
         print("read config file")
 
+        dbConn = datatier.acquire_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
+        model_name, scorer = get_scorer(configur)
+
+        resource = event.get("resource") or ""
+        if resource.startswith("/predict/batch"):
+            return predict_batch(event, dbConn, model_name, scorer)
+
+        params = event["pathParameters"]
+        teamA = urllib.parse.unquote(str(params["teamA"]))
+        teamB = urllib.parse.unquote(str(params["teamB"]))
+        year = params["year"]
+
+        print(f"Hello from Lambda! {teamA} {teamB} {year}")
+
+        # both teams in one query, straight from the database instead of
+        # two /stats calls back through API Gateway:
+        found = statsaccess.get_teams_stats(dbConn, int(year), [teamA, teamB])
+
         # TEAM A
-        api = '/stats'
-        params = f'/{teamA}_exact/{year}'
-        url = baseurl + api + params
-        res = requests.get(url)
-        if res.status_code != 200:
+        if teamA.lower() not in found:
             raise Exception("Error getting team A stats")
-        bodyA = res.json()
-        # example {"team_name": "Northwestern", "PPG": 72.4, "FGM": 26.1, "FGA": 59.1, "FG%": 0.441, "3PM": 6.7, "3PA": 20.2, "3P%": 0.333, "FTM": 13.6, "FTA": 18.5, "FT%": 0.733, "ORB": 9.7, "DRB": 21.9, "RPG": 31.6, "APG": 14.5, "SPG": 6.9, "BPG": 3.5, "TOV": 9.5, "PF": 17.6}
+        bodyA = found[teamA.lower()]
+        # example {"team_name": "Northwestern", "GP": 32, "MPG": 40.3, "PPG": 72.4, "FGM": 26.1, "FGA": 59.1, "FG%": 0.441, "3PM": 6.7, "3PA": 20.2, "3P%": 0.333, "FTM": 13.6, "FTA": 18.5, "FT%": 0.733, "ORB": 9.7, "DRB": 21.9, "RPG": 31.6, "APG": 14.5, "SPG": 6.9, "BPG": 3.5, "TOV": 9.5, "PF": 17.6}
         print("team stats A recieved")
 
         # TEAM B
-        api = '/stats'
-        params = f'/{teamB}_exact/{year}'
-        url = baseurl + api + params
-        res = requests.get(url)
-        if res.status_code != 200:
+        if teamB.lower() not in found:
             raise Exception("Error getting team B stats")
-        bodyB = res.json()
-        # example {"team_name": "Duke", "PPG": 83.3, "FGM": 29.1, "FGA": 59.5, "FG%": 0.489, "3PM": 10.3, "3PA": 27.0, "3P%": 0.381, "FTM": 14.8, "FTA": 18.7, "FT%": 0.788, "ORB": 10.6, "DRB": 26.9, "RPG": 37.5, "APG": 17.1, "SPG": 6.9, "BPG": 3.8, "TOV": 9.3, "PF": 15.9}
+        bodyB = found[teamB.lower()]
         print("team stats B recieved")
 
-        features = [key for key in bodyA.keys() if key != "team_name"]
-        features = [key for key in bodyA.keys()]
-        dataA = [bodyA[feature] for feature in features]
-        dataB = [bodyB[feature] for feature in features]
-        totalData = [0] + dataA + dataB + ["winner"]
-        
-        
-
-        test = pd.DataFrame([dataA + dataB])
-        print("printing test")
-        print(test)
-        print("done printing test")
-
-        print("formatting features data")
-        client = boto3.client("runtime.sagemaker")
-        body = pd.DataFrame(
-            [totalData,
-            [1, "teamA", 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, "teamB", 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, "winner"]] 
-        ).to_csv(header=False, index=False).encode("utf-8")
-        # body = pd.DataFrame(
-        #     [dataA + dataB] 
-        # ).to_csv(header=False, index=False).encode("utf-8")
-    
         print("getting prediction")
-        response = client.invoke_endpoint(
-            EndpointName=endpoint,
-            ContentType="text/csv",
-            Body=body,
-            Accept="application/json"
-        )
-        print("printing response")
-        print(response)
-
-        response_body = response['Body'].read().decode('utf-8')  # Read and decode the body to a string
-
-        # Now parse the string into a JSON object
-        prediction = json.loads(response_body)
-
-        margin = prediction["predictions"][0]["score"]
+        margin = predict_margins(dbConn, model_name, scorer, int(year), [(bodyA, bodyB)])[0]
 
         # Print the prediction or inspect it
-        print("Prediction result:", prediction)
+        print("Prediction result:", margin)
 
         return {
             'statusCode': 200,
@@ -106,4 +261,7 @@ def lambda_handler(event, context):
         return {
             'statusCode': 500,
             'body': json.dumps(str(err))
-        }
\ No newline at end of file
+        }
+    finally:
+        if dbConn is not None:
+            datatier.release_dbConn(dbConn)
@@ -0,0 +1,310 @@
+#
+# localmodel.py
+#
+# Scores matchups in-process with NumPy instead of calling the
+# SageMaker endpoint, from a model artifact loaded once per
+# container (from S3 or from the deployment bundle). Two artifact
+# formats are understood:
+#
+#   xgboost : the JSON model XGBoost writes with
+#             booster.save_model("model.json"), as a file or as a
+#             .json member of a .tar.gz. The built-in SageMaker
+#             XGBoost container's model.tar.gz holds a binary
+#             "xgboost-model" instead, which is not read: load it
+#             with xgboost, re-save it as JSON and upload that.
+#   linear  : {"weights": [40 floats], "bias": float}
+#
+# Both score the numeric features of a model row: team A's 20 stats
+# then team B's 20 stats, in encoder.TEAM_FEATURES order (the row
+# id, team names and label column are not model inputs). A model
+# trained on other inputs -- e.g. with the team-name columns, which
+# would shift every feature index -- is refused when it is loaded
+# (check_inputs) rather than scored wrongly.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import io
+import json
+import os
+import tarfile
+
+import numpy as np
+
+from encoder import TEAM_FEATURES
+
+
+NUMERIC_FEATURES = TEAM_FEATURES[1:]   # per team, without team_name
+NUM_INPUTS = 2 * len(NUMERIC_FEATURES)
+TEAMS = ("A", "B")
+
+#
+# XGBoost objectives whose prediction is the raw margin (identity
+# link); reg:gamma, reg:tweedie etc. predict exp(margin) and
+# reg:logistic a probability, so they are not scored locally:
+#
+IDENTITY_OBJECTIVES = ("reg:squarederror", "reg:linear", "reg:absoluteerror", "reg:pseudohubererror")
+
+_models = {}   # artifact => loaded model, kept across warm invocations
+
+
+###################################################################
+#
+# feature_matrix:
+#
+def feature_matrix(matchups):
+  """
+  Returns the numeric model inputs of many matchups
+
+  Parameters
+  ----------
+  matchups : list of (team A stats, team B stats) dictionaries
+
+  Returns
+  -------
+  float32 array of shape (# of matchups, 40), NaN for missing stats
+  """
+  X = np.array([[statsA[f] for f in NUMERIC_FEATURES] + [statsB[f] for f in NUMERIC_FEATURES]
+                for statsA, statsB in matchups], dtype=np.float64)
+  # XGBoost compares features in single precision:
+  return X.reshape(len(matchups), NUM_INPUTS).astype(np.float32)
+
+
+###################################################################
+#
+# check_inputs:
+#
+# XGBoost records the inputs a model was trained on in its JSON
+# (learner.feature_names / feature_types, and num_feature). Names
+# may be plain stats ("PPG", team B's column then being "PPG.1" as
+# pandas names repeated columns) or carry the team ("A_PPG",
+# "PPG_B"); a model saved without names is checked by count only.
+#
+def check_inputs(feature_names, num_features, feature_types=()):
+  """
+  Raises ValueError unless a model's inputs are the 40 numeric
+  stats of feature_matrix, in order
+
+  Parameters
+  ----------
+  feature_names : the model's input names ([] if not recorded),
+  num_features : the model's number of inputs,
+  feature_types : the model's input types ([] if not recorded)
+
+  Returns
+  -------
+  nothing
+  """
+  if num_features != NUM_INPUTS:
+    raise ValueError(f"model has {num_features} inputs, local scoring has the {NUM_INPUTS} "
+                     f"numeric stats (was it trained with the team-name columns?)")
+
+  if len(feature_names) not in (0, NUM_INPUTS):
+    raise ValueError(f"model names {len(feature_names)} inputs, expected {NUM_INPUTS}")
+  expected = [(team, f) for team in TEAMS for f in NUMERIC_FEATURES]
+  for i, (name, (team, feature)) in enumerate(zip(feature_names, expected)):
+    if not _names_feature(name, team, feature):
+      raise ValueError(f"model input {i} is {name!r}, expected team {team}'s {feature}")
+
+  for i, feature_type in enumerate(feature_types):
+    if feature_type not in ("float", "q", "int", "i"):
+      raise ValueError(f"model input {i} has type {feature_type!r}, local scoring has numbers only")
+
+
+def _names_feature(name, team, feature):
+  if team == "A" and name == feature:
+    return True
+  if team == "B" and name == f"{feature}.1":
+    return True
+  return name in (f"{team}_{feature}", f"{feature}_{team}")
+
+
+class LinearModel:
+  """
+  margin = X . weights + bias (the spec may name its inputs in
+  "feature_names")
+  """
+
+  def __init__(self, spec):
+    self.weights = np.asarray(spec["weights"], dtype=np.float64)
+    self.bias = float(spec.get("bias", 0.0))
+    if self.weights.ndim != 1:
+      raise ValueError(f"linear model needs {NUM_INPUTS} weights, got {self.weights.shape}")
+    check_inputs(spec.get("feature_names") or [], len(self.weights))
+
+  def predict(self, X):
+    return X.astype(np.float64) @ self.weights + self.bias
+
+
+class TreeEnsemble:
+  """
+  A gradient boosted tree ensemble from XGBoost's JSON model format
+  (identity-link regression objectives: margin = base_score + sum
+  of leaf values).
+
+  All trees are padded into (# of trees, max # of nodes) arrays and
+  walked together, one level per step, so scoring n rows costs
+  max depth NumPy passes over an (n, # of trees) array.
+  """
+
+  def __init__(self, spec):
+    learner = spec["learner"]
+    objective = learner.get("objective", {}).get("name", "reg:squarederror")
+    if objective not in IDENTITY_OBJECTIVES:
+      raise ValueError(f"unsupported XGBoost objective {objective}")
+
+    params = learner["learner_model_param"]
+    check_inputs(learner.get("feature_names") or [], int(params.get("num_feature", NUM_INPUTS)),
+                 learner.get("feature_types") or [])
+
+    base_score = params["base_score"]
+    self.base_score = float(str(base_score).strip("[]"))
+
+    trees = learner["gradient_booster"]["model"]["trees"]
+    if len(trees) == 0:
+      raise ValueError("XGBoost model has no trees")
+
+    num_nodes = max(len(tree["left_children"]) for tree in trees)
+    shape = (len(trees), num_nodes)
+    self.left = np.full(shape, -1, dtype=np.int32)
+    self.right = np.full(shape, -1, dtype=np.int32)
+    self.feature = np.zeros(shape, dtype=np.int32)
+    self.threshold = np.zeros(shape, dtype=np.float32)   # leaf value on leaves
+    self.default_left = np.zeros(shape, dtype=bool)
+
+    for t, tree in enumerate(trees):
+      n = len(tree["left_children"])
+      self.left[t, :n] = tree["left_children"]
+      self.right[t, :n] = tree["right_children"]
+      self.feature[t, :n] = tree["split_indices"]
+      self.threshold[t, :n] = tree["split_conditions"]
+      self.default_left[t, :n] = [bool(d) for d in tree["default_left"]]
+
+    if self.feature.max() >= NUM_INPUTS:
+      raise ValueError(f"XGBoost model uses feature {self.feature.max()}, rows have {NUM_INPUTS}")
+
+    self.is_leaf = self.left == -1
+    self.max_depth = self._depth()
+
+  def _depth(self):
+    # longest root-to-leaf path over all trees:
+    depth = 0
+    for t in range(len(self.left)):
+      level, frontier = 0, [0]
+      while True:
+        frontier = [child for node in frontier if not self.is_leaf[t, node]
+                    for child in (self.left[t, node], self.right[t, node])]
+        if len(frontier) == 0:
+          break
+        level += 1
+        if level > self.left.shape[1]:
+          raise ValueError("XGBoost model tree is not a tree")
+      depth = max(depth, level)
+    return depth
+
+  def predict(self, X):
+    num_rows = X.shape[0]
+    trees = np.arange(self.left.shape[0])[np.newaxis, :]
+    rows = np.arange(num_rows)[:, np.newaxis]
+    node = np.zeros((num_rows, self.left.shape[0]), dtype=np.int32)
+
+    for _ in range(self.max_depth):
+      leaf = self.is_leaf[trees, node]
+      if leaf.all():
+        break
+      value = X[rows, self.feature[trees, node]]
+      go_left = np.where(np.isnan(value), self.default_left[trees, node],
+                         value < self.threshold[trees, node])
+      child = np.where(go_left, self.left[trees, node], self.right[trees, node])
+      node = np.where(leaf, node, child)
+
+    leaves = self.threshold[trees, node].astype(np.float64)
+    return self.base_score + leaves.sum(axis=1)
+
+
+MODEL_TYPES = {
+  "xgboost": TreeEnsemble,
+  "linear": LinearModel,
+}
+
+
+###################################################################
+#
+# load_model:
+#
+# artifact is either s3://bucket/key or a path relative to the
+# deployment bundle; .tar.gz artifacts are searched for their
+# first .json member (a SageMaker training job's binary
+# xgboost-model has to be re-saved as JSON first).
+#
+def load_model(artifact, model_type="xgboost"):
+  """
+  Loads (once per container) and returns a local model
+
+  Parameters
+  ----------
+  artifact : s3://bucket/key or local path of the model file,
+  model_type : "xgboost" or "linear"
+
+  Returns
+  -------
+  model with predict(X) => float64 array of margins
+  """
+  if model_type not in MODEL_TYPES:
+    raise ValueError(f"unsupported local model type {model_type}")
+
+  cache_key = (artifact, model_type)
+  if cache_key not in _models:
+    data = _read_artifact(artifact)
+    if artifact.endswith(".tar.gz") or artifact.endswith(".tgz"):
+      data = _extract_json(data)
+    _models[cache_key] = MODEL_TYPES[model_type](json.loads(data))
+    print(f"loaded {model_type} model from {artifact}")
+
+  return _models[cache_key]
+
+
+###################################################################
+#
+# score_matchups:
+#
+def score_matchups(model, matchups):
+  """
+  Returns one predicted margin per matchup (positive => team A wins)
+
+  Parameters
+  ----------
+  model : from load_model,
+  matchups : list of (team A stats, team B stats) dictionaries
+
+  Returns
+  -------
+  list of floats
+  """
+  if len(matchups) == 0:
+    return []
+  return model.predict(feature_matrix(matchups)).tolist()
+
+
+def _read_artifact(artifact):
+  if artifact.startswith("s3://"):
+    import boto3   # only needed for S3 artifacts
+
+    bucket, _, key = artifact[len("s3://"):].partition("/")
+    response = boto3.client("s3").get_object(Bucket=bucket, Key=key)
+    return response["Body"].read()
+
+  path = artifact
+  if not os.path.isabs(path):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+  with open(path, "rb") as f:
+    return f.read()
+
+
+def _extract_json(data):
+  with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+    for member in archive.getmembers():
+      if member.isfile() and member.name.endswith(".json"):
+        return archive.extractfile(member).read()
+  raise ValueError("no .json model in the artifact archive (a binary xgboost-model "
+                   "must be re-saved with booster.save_model(\"model.json\"))")
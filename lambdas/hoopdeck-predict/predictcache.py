@@ -0,0 +1,191 @@
+#
+# predictcache.py
+#
+# Two-tier cache of predicted margins, so a matchup is only sent to
+# the (paid) SageMaker endpoint once per season, stats and model:
+#
+#   1. an in-container LRU (survives warm invocations)
+#   2. the predictions table in MySQL (shared by all containers)
+#
+# The key hashes the season, both teams' stats rows and the model
+# name (endpoint or local artifact), so new stats or a new model
+# never hit an old entry; the scraper also deletes a team's rows
+# when its stats change, so the table doesn't fill up with
+# unreachable entries.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import hashlib
+import json
+
+from collections import OrderedDict
+
+import datatier
+
+
+LRU_MAX_SIZE = 20000   # margins kept in memory per container
+
+createTableSQL = """
+CREATE TABLE IF NOT EXISTS predictions (
+    cache_key CHAR(64) NOT NULL PRIMARY KEY,
+    season INT NOT NULL,
+    team_a VARCHAR(255) NOT NULL,
+    team_b VARCHAR(255) NOT NULL,
+    endpoint VARCHAR(255) NOT NULL,
+    margin DOUBLE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY ix_predictions_team_a (season, team_a),
+    KEY ix_predictions_team_b (season, team_b)
+)
+"""
+
+_lru = OrderedDict()   # cache_key => margin
+_table_ready = False
+_cache_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+
+###################################################################
+#
+# cache_key:
+#
+def cache_key(season, statsA, statsB, endpoint):
+  """
+  Returns the cache key of one matchup
+
+  Parameters
+  ----------
+  season : year the season ends (int),
+  statsA : /stats dictionary of team A (away),
+  statsB : /stats dictionary of team B (home),
+  endpoint : name of the model (endpoint or local artifact)
+
+  Returns
+  -------
+  64 character hex string
+  """
+  rowA = json.dumps(statsA, sort_keys=True)
+  rowB = json.dumps(statsB, sort_keys=True)
+  text = f"{season}\n{rowA}\n{rowB}\n{endpoint}"
+  return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+###################################################################
+#
+# lookup_many:
+#
+# Returns the cached margins for the given keys: from memory first,
+# then the rest with one SELECT per 500 keys.
+#
+def lookup_many(dbConn, keys):
+  """
+  Looks up cached margins
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  keys : list of cache keys
+
+  Returns
+  -------
+  dict of cache key => margin, for the keys that were cached
+  """
+  found = {}
+  remaining = []
+  for key in dict.fromkeys(keys):
+    if key in _lru:
+      _lru.move_to_end(key)
+      found[key] = _lru[key]
+    else:
+      remaining.append(key)
+  _cache_stats["memory_hits"] += len(found)
+
+  if len(remaining) > 0:
+    _ensure_table(dbConn)
+
+  db_hits = 0
+  for start in range(0, len(remaining), 500):
+    chunk = remaining[start:start + 500]
+    placeholders = ", ".join(["%s"] * len(chunk))
+    sql = f"SELECT cache_key, margin FROM predictions WHERE cache_key IN ({placeholders});"
+    for key, margin in datatier.retrieve_all_rows(dbConn, sql, chunk):
+      found[key] = margin
+      db_hits += 1
+      _remember(key, margin)
+
+  _cache_stats["db_hits"] += db_hits
+  _cache_stats["misses"] += len(remaining) - db_hits
+  return found
+
+
+###################################################################
+#
+# store_many:
+#
+# Saves freshly scored margins in memory and, in one batched
+# transaction, in the predictions table.
+#
+def store_many(dbConn, entries):
+  """
+  Stores scored margins
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  entries : list of (cache key, season, team A, team B, endpoint,
+    margin) tuples
+
+  Returns
+  -------
+  nothing
+  """
+  if len(entries) == 0:
+    return
+
+  for entry in entries:
+    _remember(entry[0], entry[5])
+
+  _ensure_table(dbConn)
+  sql = """
+  INSERT INTO predictions (cache_key, season, team_a, team_b, endpoint, margin)
+  VALUES (%s, %s, %s, %s, %s, %s)
+  ON DUPLICATE KEY UPDATE margin = VALUES(margin)
+  """
+  datatier.perform_bulk_action(dbConn, sql, [list(entry) for entry in entries])
+
+
+###################################################################
+#
+# cache_stats:
+#
+def cache_stats():
+  """
+  Returns the hit/miss counters of this container
+
+  Parameters
+  ----------
+  None
+
+  Returns
+  -------
+  dict with memory_hits, db_hits, misses, hit_rate and lru_size
+  """
+  stats = dict(_cache_stats)
+  lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+  stats["hit_rate"] = 0.0 if lookups == 0 else (lookups - stats["misses"]) / lookups
+  stats["lru_size"] = len(_lru)
+  return stats
+
+
+def _remember(key, margin):
+  _lru[key] = margin
+  _lru.move_to_end(key)
+  while len(_lru) > LRU_MAX_SIZE:
+    _lru.popitem(last=False)
+
+
+def _ensure_table(dbConn):
+  global _table_ready
+  if not _table_ready:
+    datatier.perform_action(dbConn, createTableSQL, [])
+    _table_ready = True
@@ -0,0 +1,216 @@
+#
+# backfill.py
+#
+# Loads past seasons into the teams table. Season pages are fetched
+# and parsed concurrently by a small thread pool (one keep-alive
+# session, a shared rate limit so RealGM sees at most N requests a
+# second), while the handler's thread writes each season as soon as
+# it is parsed -- one bulk upsert per season on the one database
+# connection.
+#
+# Every finished season is checkpointed in scrape_state
+# ("backfill:<season>"), so a long backfill is a series of bounded
+# runs: each run skips finished seasons, stops starting new ones
+# when the Lambda is close to its timeout, and reports what is left.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+import metrics
+import schema
+import scrapestate
+import snapshot
+import statsparser
+import statsrows
+
+
+SEASON_URL = "https://basketball.realgm.com/ncaa/team-stats/{season}/Averages/Team_Totals/0"
+STOP_MARGIN_SECONDS = 60    # don't start a season with less time left than this
+MAX_ATTEMPTS = 3
+
+
+class RateLimiter:
+  """
+  Spaces calls to wait() at least 1 / per_second seconds apart,
+  across all threads
+  """
+
+  def __init__(self, per_second):
+    self.interval = 1.0 / per_second
+    self._lock = threading.Lock()
+    self._next = time.monotonic()
+
+  def wait(self):
+    with self._lock:
+      now = time.monotonic()
+      start = max(now, self._next)
+      self._next = start + self.interval
+    if start > now:
+      time.sleep(start - now)
+
+
+###################################################################
+#
+# fetch_season:
+#
+# Runs on a worker thread: downloads and parses one season's page,
+# retrying 429 / 5xx responses with backoff.
+#
+def fetch_season(session, limiter, url_template, season):
+  """
+  Returns the teams rows of one season
+
+  Parameters
+  ----------
+  session : requests session,
+  limiter : RateLimiter shared by all workers,
+  url_template : page URL with a {season} placeholder,
+  season : year the season ends (int)
+
+  Returns
+  -------
+  (list of insertSQL parameter lists, list of rejected rows). Raises
+  statsrows.BadPageError if the page fails validation.
+  """
+  url = url_template.format(season=season)
+
+  for attempt in range(1, MAX_ATTEMPTS + 1):
+    limiter.wait()
+    with session.get(url, stream=True, timeout=30) as response:
+      retry = response.status_code == 429 or response.status_code >= 500
+      if not retry:
+        response.raise_for_status()
+        cell_rows = list(statsparser.iter_team_rows(response.iter_content(chunk_size=64 * 1024)))
+        table, rejected = statsrows.parse_table(cell_rows)
+        return [schema.to_team_row(season, cells) for cells in statsrows.typed_rows(table)], rejected
+
+    if attempt == MAX_ATTEMPTS:
+      raise Exception(f"{url}: status code {response.status_code} after {MAX_ATTEMPTS} attempts")
+    time.sleep(2 ** attempt)
+
+
+###################################################################
+#
+# run_backfill:
+#
+def run_backfill(dbConn, bucket, seasons, workers=4, per_second=1.0,
+                 batch_size=500, url_template=SEASON_URL, time_left=None, force=False):
+  """
+  Scrapes and loads the given seasons, skipping checkpointed ones
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  bucket : boto3 Bucket resource for season snapshots,
+  seasons : list of seasons (years the seasons end),
+  workers : # of pages fetched / parsed at once,
+  per_second : max page requests per second,
+  batch_size : max # of rows sent per round trip,
+  url_template : page URL with a {season} placeholder,
+  time_left : optional function returning the seconds this run has
+    left (e.g. from the Lambda context),
+  force : re-scrape checkpointed seasons too
+
+  Returns
+  -------
+  dict with "loaded" (season => upsert counts), "failed" (season
+  => error) and "remaining" (seasons not attempted this run)
+  """
+  if time_left is None:
+    time_left = lambda: float("inf")
+
+  scrapestate.ensure_state_table(dbConn)
+  states = scrapestate.get_states(dbConn, [f"backfill:{season}" for season in seasons])
+  todo = [season for season in seasons
+          if force or (states.get(f"backfill:{season}") or {}).get("status") != "done"]
+  print(f"**Backfill: {len(seasons) - len(todo)} of {len(seasons)} seasons already done**")
+
+  session = requests.Session()
+  session.headers["User-Agent"] = "Mozilla/5.0"
+  adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+  session.mount("https://", adapter)
+  limiter = RateLimiter(per_second)
+
+  result = {"loaded": {}, "failed": {}, "remaining": []}
+  queue = list(todo)
+  pending = {}   # future => season
+
+  with ThreadPoolExecutor(max_workers=workers) as executor:
+    while True:
+      # keep at most `workers` seasons in flight, and stop starting
+      # new ones close to the deadline:
+      while len(queue) > 0 and len(pending) < workers and time_left() > STOP_MARGIN_SECONDS:
+        season = queue.pop(0)
+        pending[executor.submit(fetch_season, session, limiter, url_template, season)] = season
+
+      if len(pending) == 0:
+        break
+
+      done, _ = wait(pending, return_when=FIRST_COMPLETED)
+      for future in done:
+        season = pending.pop(future)
+        try:
+          rows, rejected = future.result()
+          statsrows.report(rejected)
+          counts = load_season(dbConn, bucket, season, rows, batch_size)
+          result["loaded"][season] = dict(counts, rejected=len(rejected))
+          scrapestate.set_state(dbConn, f"backfill:{season}",
+                                {"status": "done", "rows": len(rows), "rejected": len(rejected)})
+        except Exception as err:
+          if isinstance(err, statsrows.BadPageError):
+            statsrows.report(err.rejected)
+          print(f"**Backfill of season {season} failed: {err}**")
+          result["failed"][season] = str(err)
+          scrapestate.set_state(dbConn, f"backfill:{season}", {"status": "failed", "error": str(err)})
+
+  session.close()
+  result["remaining"] = queue
+  return result
+
+
+###################################################################
+#
+# load_season:
+#
+# Writes one parsed season the same way a scheduled scrape does:
+# upsert, drop now stale cached predictions, refresh the snapshot
+# and the derived metrics.
+#
+def load_season(dbConn, bucket, season, rows, batch_size=500):
+  """
+  Upserts one season's rows
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  bucket : boto3 Bucket resource for season snapshots,
+  season : year the season ends (int),
+  rows : insertSQL parameter lists for that season,
+  batch_size : max # of rows sent per round trip
+
+  Returns
+  -------
+  dict with # of rows inserted, updated and unchanged
+  """
+  counts = schema.upsert_teams(dbConn, season, rows, batch_size)
+  print(f"**Season {season}: {counts['inserted']} inserted, "
+        f"{counts['updated']} updated, {counts['unchanged']} unchanged**")
+
+  schema.drop_cached_predictions(dbConn, season, counts.pop("updated_teams"))
+
+  changed = counts["inserted"] + counts["updated"] > 0
+  if changed or not snapshot.snapshot_exists(bucket, season):
+    snapshot.publish_snapshot(dbConn, bucket, season)
+  if changed or not metrics.metrics_exist(dbConn, season):
+    metrics.publish_metrics(dbConn, season, batch_size)
+
+  return counts
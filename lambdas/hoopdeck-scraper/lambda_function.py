@@ -1,8 +1,9 @@
 # Authors: Lucas Holliday, Sid Javeri, Helena Yuan
 #
 #
-# Scrapes team statistics from “Real GM” using a BeautifulSoup layer 
-# and stores these statistics in an RDS database from config file. 
+# Scrapes team statistics from “Real GM” with a streaming lxml parser
+# (statsparser.py) and stores these statistics in an RDS database
+# from config file.
 #
 
 import json
@@ -11,19 +12,42 @@ import os
 import uuid
 import base64
 import pathlib
+import backfill
 import datatier
+import schema
+import scrapestate
+import statsparser
+import statsrows
 import urllib.parse
 import string
 
 from configparser import ConfigParser
+from datetime import datetime
 from pypdf import PdfReader
 
 import requests
-from bs4 import BeautifulSoup
 
 
 
+###################################################################
+#
+# current_season:
+#
+# Seasons are named by the year they end in (2025 = 2024-2025).
+# The season tips off in November, so from November on the
+# current season is next year's. Early in November the new
+# season's page may still be empty; the scrape then writes
+# nothing (see lambda_handler), so readers of MAX(season) keep the
+# finished season until the new one has games.
+#
+def current_season(today=None):
+    if today is None:
+        today = datetime.now()
+    return today.year + 1 if today.month >= 11 else today.year
+
+
 def lambda_handler(event, context):
+    dbConn = None
     try:
         print("**STARTING**")
         print("**lambda: hoopdeck_scraper**")
@@ -39,85 +63,155 @@ def lambda_handler(event, context):
         s3 = boto3.resource('s3')
         bucket = s3.Bucket(bucketname)
 
+        rds_endpoint = configur.get('rds', 'endpoint')
+        rds_portnum = int(configur.get('rds', 'port_number'))
+        rds_username = configur.get('rds', 'user_name')
+        rds_pwd = configur.get('rds', 'user_pwd')
+        rds_dbname = configur.get('rds', 'db_name')
+        batch_size = configur.getint('rds', 'batch_size', fallback=500)
+
+        # EventBridge rules can pass {"season": 2025}, {"mode": "migrate"} or
+        # {"mode": "backfill", ...} as constant input; a plain scheduled
+        # event scrapes the current season:
+        if not isinstance(event, dict):
+            event = {}
+        mode = event.get("mode", "scrape")
+        season = int(event.get("season", current_season()))
 
-        ## SCRAPE LOGOS FROM WEBPAGE
+        print("**Opening DB connection**")
+        dbConn = datatier.acquire_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
+        print(f"**DB pool: {datatier.pool_stats()}**")
+
+        schema.ensure_teams_table(dbConn)
+
+        if mode == "migrate":
+            imported = schema.import_legacy_tables(dbConn)
+            return {
+                'statusCode': 200,
+                'body': json.dumps({"imported": imported})
+            }
+
+        # {"mode": "backfill", "from": 2006, "to": 2024} (or "seasons": [...]);
+        # re-invoke with the same input until "remaining" is empty:
+        if mode == "backfill":
+            if "seasons" in event:
+                seasons = [int(s) for s in event["seasons"]]
+            else:
+                seasons = list(range(int(event["from"]), int(event["to"]) + 1))
+
+            time_left = None
+            if context is not None:
+                time_left = lambda: context.get_remaining_time_in_millis() / 1000
+
+            result = backfill.run_backfill(
+                dbConn, bucket, seasons,
+                workers=configur.getint('backfill', 'workers', fallback=4),
+                per_second=configur.getfloat('backfill', 'requests_per_second', fallback=1.0),
+                batch_size=batch_size,
+                url_template=configur.get('backfill', 'season_url', fallback=backfill.SEASON_URL),
+                time_left=time_left,
+                force=bool(event.get("force", False)))
+
+            return {
+                'statusCode': 200,
+                'body': json.dumps(result)
+            }
 
-        print("**Accessing webpage**")
 
-        url = "https://basketball.realgm.com/ncaa/team-stats"
+        ## SCRAPE LOGOS FROM WEBPAGE
 
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, "html.parser")
+        print(f"**Accessing webpage, season {season}**")
 
-        table = soup.find("table", {"class": "tablesaw"})
+        # the season's own page (not the site's "current" one), so the
+        # rows saved are always that season's:
+        url = configur.get('backfill', 'season_url', fallback=backfill.SEASON_URL).format(season=season)
 
-        if not table:
-            raise ValueError("Stats table not found on the page!")
-        print("YES TABLE EXISTS")
+        # validators and table hash from the last run; {"force": true}
+        # ignores them:
+        scrapestate.ensure_state_table(dbConn)
+        state_key = f"page:{season}"
+        last = scrapestate.get_state(dbConn, state_key) or {}
+        if event.get("force"):
+            last = {}
 
-        headers = [th.text.strip() for th in table.find("thead").find_all("th")]
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if last.get("etag"):
+            headers["If-None-Match"] = last["etag"]
+        if last.get("last_modified"):
+            headers["If-Modified-Since"] = last["last_modified"]
+
+        with requests.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                print(f"**Page not modified: skipped download, parse and DB work "
+                      f"for {last.get('rows', 0)} rows**")
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({"season": season, "skipped": "not modified"})
+                }
+            response.raise_for_status()
+
+            # rows are parsed as the page downloads; the download stops
+            # at the end of the table:
+            rows = list(statsparser.iter_team_rows(response.iter_content(chunk_size=64 * 1024)))
+            page_state = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "table_hash": statsparser.table_hash(rows),
+                "rows": len(rows)
+            }
+
+        # no games played yet (a new season's page before tip-off):
+        # nothing to save, and no state, so the next run looks again
+        if len(rows) == 0:
+            print(f"**No teams on the season {season} page yet: nothing saved**")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({"season": season, "skipped": "empty"})
+            }
+
+        # most servers (RealGM included) send no validators for
+        # dynamic pages, so also compare the table itself:
+        if page_state["table_hash"] == last.get("table_hash"):
+            scrapestate.set_state(dbConn, state_key, page_state)
+            print(f"**Table unchanged: skipped diff, upsert and snapshot check "
+                  f"for {len(rows)} rows**")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({"season": season, "skipped": "unchanged"})
+            }
+
+        # the whole table is converted and validated at once; bad rows
+        # are reported and left out, a bad page writes nothing:
+        try:
+            table, rejected = statsrows.parse_table(rows)
+        except statsrows.BadPageError as err:
+            statsrows.report(err.rejected)
+            print(f"**Page rejected: {err}**")
+            return {
+                'statusCode': 500,
+                'body': json.dumps({"season": season, "error": str(err), "rejected": err.rejected})
+            }
+        statsrows.report(rejected)
+
+        # only new or changed rows are written, in one transaction;
+        # stale cached predictions are dropped and the snapshot is
+        # only rebuilt when the season changed:
+        data = [schema.to_team_row(season, cells) for cells in statsrows.typed_rows(table)]
+        counts = backfill.load_season(dbConn, bucket, season, data, batch_size)
+        counts["rejected"] = rejected
+
+        # saved last, so a failed load is retried in full next run:
+        scrapestate.set_state(dbConn, state_key, page_state)
 
-        print("**Opening DB connection**")
-        dbConn = datatier.get_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
-        createTableSQL = """
-        CREATE TABLE IF NOT EXISTS teams (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            team_rank INT,
-            team_name VARCHAR(255),
-            games_played INT,
-            minutes_per_game FLOAT,
-            points_per_game FLOAT,
-            field_goals_made FLOAT,
-            field_goals_attempted FLOAT,
-            field_goal_percentage FLOAT,
-            three_pointers_made FLOAT,
-            three_pointers_attempted FLOAT,
-            three_point_percentage FLOAT,
-            free_throws_made FLOAT,
-            free_throws_attempted FLOAT,
-            free_throw_percentage FLOAT,
-            offensive_rebounds FLOAT,
-            defensive_rebounds FLOAT,
-            rebounds_per_game FLOAT,
-            assists_per_game FLOAT,
-            steals_per_game FLOAT,
-            blocks_per_game FLOAT,
-            turnovers FLOAT,
-            personal_fouls FLOAT
-        )
-        """
-        datatier.perform_action(dbConn, createTableSQL, [])
-
-        insertSQL = """
-        INSERT INTO teams (team_rank, team_name, games_played, minutes_per_game, points_per_game, 
-                           field_goals_made, field_goals_attempted, field_goal_percentage, 
-                           three_pointers_made, three_pointers_attempted, three_point_percentage,
-                           free_throws_made, free_throws_attempted, free_throw_percentage,
-                           offensive_rebounds, defensive_rebounds, rebounds_per_game, 
-                           assists_per_game, steals_per_game, blocks_per_game, turnovers, personal_fouls) 
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-
-        data = []
-        for row in table.find("tbody").find_all("tr"):
-            cells = [td.text.strip() for td in row.find_all("td")]
-            # example cell: ['364', 'Mississippi Valley State', '31', '39.9', '54.1', '19.7', '50.6', '.389', '4.5', '15.3', '.296', '10.3', '15.5', '.660', '6.9', '19.0', '25.9', '8.3', '6.0', '1.9', '15.4', '16.4']
-            # Team #, GP, MPG, PPG, FGM, FGA, FG%, 3PM, 3PA, 3P%, FTM, FTA, FT%, ORB, DRB, RPG, APG, SPG, BPG, TOV, PF
-            data.append(cells)
-
-            if len(cells) != 22:  # Ensure correct number of columns
-                print(f"⚠️ Skipping row due to incorrect column count: {cells}")
-                continue
-
-            datatier.perform_action(dbConn, insertSQL, cells)
-            
         print("✅ Data successfully inserted into RDS!")
         return {
             'statusCode': 200,
-            'body': json.dumps('Data successfully scraped and inserted into RDS!')
+            'body': json.dumps({"season": season, **counts})
         }
     except Exception as err:
         print("**ERROR SCRAPING**")
         print(str(err))
+    finally:
+        if dbConn is not None:
+            datatier.release_dbConn(dbConn)
 
@@ -0,0 +1,195 @@
+#
+# metrics.py
+#
+# League-wide derived metrics, computed by the scraper in one
+# vectorized pass over a season whenever its stats change and
+# stored in team_metrics (one row per season, team and metric), so
+# hoopdeck-stats serves them without recomputing anything:
+#
+#   POSS  possessions per game   FGA - ORB + TOV + 0.475 * FTA
+#   ORTG  offensive efficiency   points per 100 possessions
+#   eFG%  effective FG%          (FGM + 0.5 * 3PM) / FGA
+#   TS%   true shooting %        PPG / (2 * (FGA + 0.44 * FTA))
+#   TOV%  turnover rate          turnovers per 100 possessions
+#
+# plus, for those and every raw stat, the team's league percentile
+# (0-100, share of teams with a lower value, ties counting half)
+# and z-score. Percentiles rank values, not quality: a high TOV
+# percentile means many turnovers.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import numpy as np
+
+import datatier
+
+from schema import STAT_COLUMNS
+
+
+#
+# raw stats under the keys /stats returns, in STAT_COLUMNS order:
+#
+STAT_KEYS = [
+  "GP", "MPG", "PPG", "FGM", "FGA", "FG%", "3PM", "3PA", "3P%",
+  "FTM", "FTA", "FT%", "ORB", "DRB", "RPG", "APG", "SPG", "BPG",
+  "TOV", "PF"
+]
+
+DERIVED_KEYS = ["POSS", "ORTG", "eFG%", "TS%", "TOV%"]
+
+createTableSQL = """
+CREATE TABLE IF NOT EXISTS team_metrics (
+    season INT NOT NULL,
+    team_name VARCHAR(255) NOT NULL,
+    metric VARCHAR(16) NOT NULL,
+    value DOUBLE,
+    percentile DOUBLE,
+    z_score DOUBLE,
+    PRIMARY KEY (season, team_name, metric)
+)
+"""
+
+_table_ready = False
+
+
+###################################################################
+#
+# compute_metrics:
+#
+def compute_metrics(stats):
+  """
+  Computes derived metrics, percentiles and z-scores for a season
+
+  Parameters
+  ----------
+  stats : dict of STAT_KEYS key => float array (one value per team,
+    NaN if missing)
+
+  Returns
+  -------
+  dict of metric key => (values, percentiles, z-scores) arrays, for
+  STAT_KEYS and DERIVED_KEYS
+  """
+  with np.errstate(divide="ignore", invalid="ignore"):
+    poss = stats["FGA"] - stats["ORB"] + stats["TOV"] + 0.475 * stats["FTA"]
+    values = dict(stats)
+    values["POSS"] = poss
+    values["ORTG"] = 100.0 * stats["PPG"] / poss
+    values["eFG%"] = (stats["FGM"] + 0.5 * stats["3PM"]) / stats["FGA"]
+    values["TS%"] = stats["PPG"] / (2.0 * (stats["FGA"] + 0.44 * stats["FTA"]))
+    values["TOV%"] = 100.0 * stats["TOV"] / poss
+
+  metrics = {}
+  for key in STAT_KEYS + DERIVED_KEYS:
+    v = np.where(np.isfinite(values[key]), values[key], np.nan)
+    metrics[key] = (v, _percentiles(v), _z_scores(v))
+  return metrics
+
+
+###################################################################
+#
+# publish_metrics:
+#
+# Recomputes a season's metrics from the teams table and writes
+# them in one batched transaction; teams no longer in the season
+# are removed.
+#
+def publish_metrics(dbConn, season, batch_size=500):
+  """
+  Computes and stores the derived metrics of one season
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int),
+  batch_size : max # of rows sent per round trip
+
+  Returns
+  -------
+  # of team_metrics rows written
+  """
+  _ensure_table(dbConn)
+
+  sql = f"SELECT team_name, {', '.join(STAT_COLUMNS)} FROM teams WHERE season = %s ORDER BY team_name;"
+  rows = datatier.retrieve_all_rows(dbConn, sql, [season])
+  if len(rows) == 0:
+    return 0
+
+  names = [row[0] for row in rows]
+  values = np.array([[np.nan if v is None else v for v in row[1:]] for row in rows],
+                    dtype=np.float64).reshape(len(rows), len(STAT_COLUMNS))
+  metrics = compute_metrics({key: values[:, j] for j, key in enumerate(STAT_KEYS)})
+
+  params = []
+  for key, (v, pct, z) in metrics.items():
+    for name, value, p, score in zip(names, v.tolist(), pct.tolist(), z.tolist()):
+      params.append([season, name, key, _or_none(value), _or_none(p), _or_none(score)])
+
+  sql = """
+  INSERT INTO team_metrics (season, team_name, metric, value, percentile, z_score)
+  VALUES (%s, %s, %s, %s, %s, %s)
+  ON DUPLICATE KEY UPDATE value = VALUES(value), percentile = VALUES(percentile), z_score = VALUES(z_score)
+  """
+  datatier.perform_bulk_action(dbConn, sql, params, batch_size)
+
+  placeholders = ", ".join(["%s"] * len(names))
+  sql = f"DELETE FROM team_metrics WHERE season = %s AND team_name NOT IN ({placeholders});"
+  datatier.perform_action(dbConn, sql, [season] + names)
+
+  print(f"**Published {len(metrics)} metrics for {len(names)} teams**")
+  return len(params)
+
+
+###################################################################
+#
+# metrics_exist:
+#
+def metrics_exist(dbConn, season):
+  """
+  Returns True if the season's metrics have been computed
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int)
+
+  Returns
+  -------
+  True or False
+  """
+  _ensure_table(dbConn)
+  row = datatier.retrieve_one_row(dbConn, "SELECT 1 FROM team_metrics WHERE season = %s LIMIT 1;", [season])
+  return len(row) > 0
+
+
+def _percentiles(v):
+  # share of (non-missing) teams below, ties counting half
+  valid = np.sort(v[~np.isnan(v)])
+  if len(valid) == 0:
+    return np.full(v.shape, np.nan)
+  below = np.searchsorted(valid, v, side="left")
+  at_or_below = np.searchsorted(valid, v, side="right")
+  pct = 100.0 * (below + 0.5 * (at_or_below - below)) / len(valid)
+  return np.where(np.isnan(v), np.nan, pct)
+
+
+def _z_scores(v):
+  if np.isnan(v).all():
+    return np.full(v.shape, np.nan)
+  mean = np.nanmean(v)
+  std = np.nanstd(v)
+  if std == 0:
+    return np.where(np.isnan(v), np.nan, 0.0)
+  return (v - mean) / std
+
+
+def _or_none(x):
+  return None if x != x else x   # NaN => NULL
+
+
+def _ensure_table(dbConn):
+  global _table_ready
+  if not _table_ready:
+    datatier.perform_action(dbConn, createTableSQL, [])
+    _table_ready = True
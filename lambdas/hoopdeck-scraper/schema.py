@@ -0,0 +1,360 @@
+#
+# schema.py
+#
+# Owns the teams table definition used by the scraper, and the
+# in-place upgrade of tables created by older versions of the
+# scraper (no season column, no indexes, duplicate rows, and
+# per-season "teamsYYYY" copies).
+#
+# Keep in sync with hoopdeck-database.sql.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import datatier
+
+from teamnames import normalize_team_name
+
+
+#
+# stat columns in the order they appear on the RealGM page, after
+# the rank and team name:
+#
+# Team #, GP, MPG, PPG, FGM, FGA, FG%, 3PM, 3PA, 3P%, FTM, FTA, FT%, ORB, DRB, RPG, APG, SPG, BPG, TOV, PF
+#
+STAT_COLUMNS = [
+  "games_played", "minutes_per_game", "points_per_game",
+  "field_goals_made", "field_goals_attempted", "field_goal_percentage",
+  "three_pointers_made", "three_pointers_attempted", "three_point_percentage",
+  "free_throws_made", "free_throws_attempted", "free_throw_percentage",
+  "offensive_rebounds", "defensive_rebounds", "rebounds_per_game",
+  "assists_per_game", "steals_per_game", "blocks_per_game",
+  "turnovers", "personal_fouls"
+]
+
+#
+# the stats lambda served the un-suffixed "teams" table as the
+# 2024-2025 season, so that is what its rows become on upgrade:
+#
+LEGACY_SEASON = 2025
+
+TEAM_COLUMNS = ["season", "team_rank", "team_name", "name_key"] + STAT_COLUMNS
+
+createTableSQL = """
+CREATE TABLE IF NOT EXISTS teams (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    season INT NOT NULL,
+    team_rank INT,
+    team_name VARCHAR(255) NOT NULL,
+    name_key VARCHAR(255) NOT NULL,
+    games_played INT,
+    minutes_per_game FLOAT,
+    points_per_game FLOAT,
+    field_goals_made FLOAT,
+    field_goals_attempted FLOAT,
+    field_goal_percentage FLOAT,
+    three_pointers_made FLOAT,
+    three_pointers_attempted FLOAT,
+    three_point_percentage FLOAT,
+    free_throws_made FLOAT,
+    free_throws_attempted FLOAT,
+    free_throw_percentage FLOAT,
+    offensive_rebounds FLOAT,
+    defensive_rebounds FLOAT,
+    rebounds_per_game FLOAT,
+    assists_per_game FLOAT,
+    steals_per_game FLOAT,
+    blocks_per_game FLOAT,
+    turnovers FLOAT,
+    personal_fouls FLOAT,
+    UNIQUE KEY uq_teams_season_name (season, team_name),
+    KEY ix_teams_season_name_key (season, name_key)
+)
+"""
+
+#
+# insert one scraped row; a re-scrape of the same season updates the
+# existing row instead of tripping the unique key:
+#
+insertSQL = (
+  "INSERT INTO teams (" + ", ".join(TEAM_COLUMNS) + ") " +
+  "VALUES (" + ", ".join(["%s"] * len(TEAM_COLUMNS)) + ") " +
+  "ON DUPLICATE KEY UPDATE " +
+  ", ".join(f"{col} = VALUES({col})" for col in TEAM_COLUMNS[1:])
+)
+
+
+###################################################################
+#
+# to_team_row:
+#
+# Turns one typed row of a scraped table (see statsrows.py) into
+# the parameter list for insertSQL.
+#
+def to_team_row(season, cells):
+  """
+  Returns the insertSQL parameters for one scraped table row
+
+  Parameters
+  ----------
+  season : year the season ends, e.g. 2025 for 2024-2025 (int),
+  cells : rank (int), team name and 20 stat values (floats or None)
+
+  Returns
+  -------
+  list of values in TEAM_COLUMNS order
+  """
+  return [season, cells[0], cells[1], normalize_team_name(cells[1])] + list(cells[2:])
+
+
+###################################################################
+#
+# upsert_teams:
+#
+# Diffs scraped rows (from to_team_row) against what is stored for
+# the season and writes only new or changed rows, so a scheduled
+# re-scrape of an unchanged page costs one SELECT and no writes.
+#
+def upsert_teams(dbConn, season, rows, batch_size=500):
+  """
+  Inserts new teams and updates changed teams for one season
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int),
+  rows : insertSQL parameter lists for that season (any iterable,
+    e.g. a generator of rows as they are parsed),
+  batch_size : optional max # of rows sent per round trip
+
+  Returns
+  -------
+  dict with # of rows inserted, updated and unchanged, and the
+  names of the updated teams ("updated_teams")
+  """
+  compared = TEAM_COLUMNS[1:2] + STAT_COLUMNS   # team_rank + stats
+
+  sql = f"SELECT team_name, {', '.join(compared)} FROM teams WHERE season = %s;"
+  stored = {}
+  for row in datatier.retrieve_all_rows(dbConn, sql, [season]):
+    stored[row[0]] = row[1:]
+
+  counts = {"inserted": 0, "updated": 0, "unchanged": 0, "updated_teams": []}
+  changed = []
+
+  for row in rows:
+    team_name = row[2]
+    scraped = [row[1]] + list(row[4:])
+
+    if team_name not in stored:
+      counts["inserted"] += 1
+    elif _same_values(scraped, stored[team_name]):
+      counts["unchanged"] += 1
+      continue
+    else:
+      counts["updated"] += 1
+      counts["updated_teams"].append(team_name)
+
+    changed.append(row)
+
+  if len(changed) > 0:
+    datatier.perform_bulk_action(dbConn, insertSQL, changed, batch_size)
+
+  return counts
+
+
+###################################################################
+#
+# drop_cached_predictions:
+#
+# hoopdeck-predict caches margins in the predictions table, keyed
+# by a hash of both teams' stats; once a team's stats change those
+# rows can never be hit again, so delete them. Does nothing before
+# the predict lambda has created the table.
+#
+def drop_cached_predictions(dbConn, season, team_names):
+  """
+  Deletes cached predictions involving the given teams
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int),
+  team_names : names of the teams whose stats changed
+
+  Returns
+  -------
+  # of predictions deleted
+  """
+  if len(team_names) == 0:
+    return 0
+
+  if len(datatier.retrieve_all_rows(dbConn, "SHOW TABLES LIKE 'predictions';")) == 0:
+    return 0
+
+  placeholders = ", ".join(["%s"] * len(team_names))
+  sql = f"""
+  DELETE FROM predictions
+   WHERE season = %s AND (team_a IN ({placeholders}) OR team_b IN ({placeholders}));
+  """
+  return datatier.perform_action(dbConn, sql, [season] + list(team_names) + list(team_names))
+
+
+def _same_values(scraped, stored):
+  #
+  # stored values come back from FLOAT columns, so compare with a
+  # tolerance that covers single-precision rounding:
+  #
+  for new, old in zip(scraped, stored):
+    if new is None or old is None:
+      if new is None and old is None:
+        continue
+      return False
+    try:
+      new = float(new)
+    except (TypeError, ValueError):
+      return False
+    if abs(new - float(old)) > 1e-6 * max(1.0, abs(new)):
+      return False
+  return True
+
+
+###################################################################
+#
+# ensure_teams_table:
+#
+# Creates the teams table if needed. A teams table created by an
+# older scraper (no season column) is upgraded in place: existing
+# rows are assigned LEGACY_SEASON, duplicate copies from repeated
+# scrapes are removed (the newest copy is kept), name_key is
+# filled in and the indexes are added.
+#
+def ensure_teams_table(dbConn):
+  """
+  Creates or upgrades the teams table
+
+  Parameters
+  ----------
+  dbConn : the database connection
+
+  Returns
+  -------
+  True if an old table was upgraded, False otherwise
+  """
+  datatier.perform_action(dbConn, createTableSQL, [])
+
+  sql = """
+  SELECT COUNT(*) FROM information_schema.columns
+   WHERE table_schema = DATABASE() AND table_name = 'teams' AND column_name = 'season'
+  """
+  row = datatier.retrieve_one_row(dbConn, sql, [])
+  if row[0] > 0:
+    return False
+
+  print(f"**Upgrading legacy teams table, existing rows => season {LEGACY_SEASON}**")
+
+  sql = f"""
+  ALTER TABLE teams
+    ADD COLUMN season INT NOT NULL DEFAULT {LEGACY_SEASON} AFTER id,
+    ADD COLUMN name_key VARCHAR(255) NOT NULL DEFAULT '' AFTER team_name,
+    MODIFY team_name VARCHAR(255) NOT NULL
+  """
+  datatier.perform_action(dbConn, sql, [])
+
+  # append-only scrapes left one copy per run, keep the newest:
+  sql = """
+  DELETE older FROM teams older
+    JOIN teams newer
+      ON older.season = newer.season AND older.team_name = newer.team_name
+     AND older.id < newer.id
+  """
+  removed = datatier.perform_action(dbConn, sql, [])
+  print(f"**Removed {removed} duplicate rows**")
+
+  fill_name_keys(dbConn)
+
+  sql = """
+  ALTER TABLE teams
+    ALTER COLUMN season DROP DEFAULT,
+    ADD UNIQUE KEY uq_teams_season_name (season, team_name),
+    ADD KEY ix_teams_season_name_key (season, name_key)
+  """
+  datatier.perform_action(dbConn, sql, [])
+  return True
+
+
+###################################################################
+#
+# import_legacy_tables:
+#
+# Copies every per-season "teamsYYYY" table into teams with
+# season = YYYY. Rows already present for that season are
+# updated. The old tables are left in place so they can be
+# checked and dropped by hand.
+#
+def import_legacy_tables(dbConn):
+  """
+  Imports teamsYYYY tables into the teams table
+
+  Parameters
+  ----------
+  dbConn : the database connection
+
+  Returns
+  -------
+  dict mapping each imported season to # of rows modified
+  """
+  sql = """
+  SELECT table_name FROM information_schema.tables
+   WHERE table_schema = DATABASE() AND table_name REGEXP '^teams[0-9]{4}$'
+   ORDER BY table_name
+  """
+  rows = datatier.retrieve_all_rows(dbConn, sql, [])
+
+  stat_list = ", ".join(STAT_COLUMNS)
+  updates = ", ".join(f"{col} = VALUES({col})" for col in ["team_rank"] + STAT_COLUMNS)
+
+  imported = {}
+  for (table_name,) in rows:
+    season = int(table_name[len("teams"):])
+
+    # table_name only ever matches teams[0-9]{4}, safe to format in:
+    sql = f"""
+    INSERT INTO teams (season, team_rank, team_name, name_key, {stat_list})
+    SELECT {season}, team_rank, team_name, '', {stat_list}
+      FROM {table_name}
+     WHERE team_name IS NOT NULL
+    ON DUPLICATE KEY UPDATE {updates}
+    """
+    imported[season] = datatier.perform_action(dbConn, sql, [])
+    print(f"**Imported {table_name} as season {season}: {imported[season]} rows**")
+
+  fill_name_keys(dbConn)
+  return imported
+
+
+###################################################################
+#
+# fill_name_keys:
+#
+# Computes name_key for rows that do not have one yet (rows
+# written by SQL rather than by the scraper).
+#
+def fill_name_keys(dbConn):
+  """
+  Fills in missing name_key values
+
+  Parameters
+  ----------
+  dbConn : the database connection
+
+  Returns
+  -------
+  number of rows updated
+  """
+  sql = "SELECT id, team_name FROM teams WHERE name_key = '';"
+  rows = datatier.retrieve_all_rows(dbConn, sql, [])
+
+  sql = "UPDATE teams SET name_key = %s WHERE id = %s;"
+  params = [[normalize_team_name(team_name), id] for (id, team_name) in rows]
+  return datatier.perform_bulk_action(dbConn, sql, params)
@@ -0,0 +1,113 @@
+#
+# scrapestate.py
+#
+# Small key => JSON value table the scraper keeps its bookkeeping
+# in between runs, e.g. backfill checkpoints:
+#
+#   "backfill:2019" => {"status": "done", "rows": 362}
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import json
+
+import datatier
+
+
+createTableSQL = """
+CREATE TABLE IF NOT EXISTS scrape_state (
+    state_key VARCHAR(255) NOT NULL PRIMARY KEY,
+    state_value TEXT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+
+###################################################################
+#
+# ensure_state_table:
+#
+def ensure_state_table(dbConn):
+  """
+  Creates the scrape_state table if needed
+
+  Parameters
+  ----------
+  dbConn : the database connection
+
+  Returns
+  -------
+  nothing
+  """
+  datatier.perform_action(dbConn, createTableSQL, [])
+
+
+###################################################################
+#
+# get_states:
+#
+def get_states(dbConn, keys):
+  """
+  Reads many state entries in one query
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  keys : list of state keys
+
+  Returns
+  -------
+  dict of key => value (decoded JSON), for the keys that exist
+  """
+  if len(keys) == 0:
+    return {}
+
+  placeholders = ", ".join(["%s"] * len(keys))
+  sql = f"SELECT state_key, state_value FROM scrape_state WHERE state_key IN ({placeholders});"
+  rows = datatier.retrieve_all_rows(dbConn, sql, list(keys))
+  return {key: json.loads(value) for key, value in rows}
+
+
+###################################################################
+#
+# get_state:
+#
+def get_state(dbConn, key):
+  """
+  Reads one state entry
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  key : state key
+
+  Returns
+  -------
+  value (decoded JSON), or None if there is no such entry
+  """
+  return get_states(dbConn, [key]).get(key)
+
+
+###################################################################
+#
+# set_state:
+#
+def set_state(dbConn, key, value):
+  """
+  Writes (inserts or replaces) one state entry
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  key : state key,
+  value : JSON serializable value
+
+  Returns
+  -------
+  nothing
+  """
+  sql = """
+  INSERT INTO scrape_state (state_key, state_value) VALUES (%s, %s)
+  ON DUPLICATE KEY UPDATE state_value = VALUES(state_value)
+  """
+  datatier.perform_action(dbConn, sql, [key, json.dumps(value)])
@@ -0,0 +1,127 @@
+#
+# snapshot.py
+#
+# Publishes a whole season of the teams table to S3 as one
+# compressed NumPy .npz file: one array per stat column plus the
+# team names, so a client can download the league once and do its
+# lookups locally. /stats/snapshot/{year} hands out presigned URLs
+# for these objects.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import io
+
+import numpy as np
+
+import datatier
+
+from schema import STAT_COLUMNS
+
+
+SNAPSHOT_KEY = "snapshots/teams_{season}.npz"
+
+#
+# array names in the snapshot, the same keys /stats returns:
+#
+SNAPSHOT_NAMES = [
+  "GP", "MPG", "PPG", "FGM", "FGA", "FG%", "3PM", "3PA", "3P%",
+  "FTM", "FTA", "FT%", "ORB", "DRB", "RPG", "APG", "SPG", "BPG",
+  "TOV", "PF"
+]
+
+
+###################################################################
+#
+# build_snapshot:
+#
+# Reads a season from the teams table and returns the .npz bytes.
+# Arrays are sorted by team name: "team_name" (unicode), "rank"
+# (int32) and one float32 array per name in SNAPSHOT_NAMES.
+#
+def build_snapshot(dbConn, season):
+  """
+  Builds the columnar snapshot of one season
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int)
+
+  Returns
+  -------
+  (npz bytes, # of teams)
+  """
+  sql = f"""
+  SELECT team_name, team_rank, {', '.join(STAT_COLUMNS)}
+    FROM teams WHERE season = %s ORDER BY team_name;
+  """
+  rows = datatier.retrieve_all_rows(dbConn, sql, [season])
+
+  columns = {
+    "season": np.array(season, dtype=np.int32),
+    "team_name": np.array([row[0] for row in rows], dtype=np.str_),
+    "rank": np.array([row[1] if row[1] is not None else -1 for row in rows], dtype=np.int32),
+  }
+
+  # missing stats become NaN:
+  values = np.array([[np.nan if v is None else v for v in row[2:]] for row in rows],
+                    dtype=np.float32).reshape(len(rows), len(STAT_COLUMNS))
+  for j, name in enumerate(SNAPSHOT_NAMES):
+    columns[name] = values[:, j]
+
+  buffer = io.BytesIO()
+  np.savez_compressed(buffer, **columns)
+  return buffer.getvalue(), len(rows)
+
+
+###################################################################
+#
+# publish_snapshot:
+#
+# Builds the season's snapshot and uploads it to the bucket.
+#
+def publish_snapshot(dbConn, bucket, season):
+  """
+  Uploads the columnar snapshot of one season to S3
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  bucket : boto3 Bucket resource,
+  season : year the season ends (int)
+
+  Returns
+  -------
+  S3 key of the snapshot
+  """
+  data, num_teams = build_snapshot(dbConn, season)
+  key = SNAPSHOT_KEY.format(season=season)
+
+  bucket.put_object(Key=key,
+                    Body=data,
+                    ContentType="application/octet-stream")
+
+  print(f"**Published {key}: {num_teams} teams, {len(data)} bytes**")
+  return key
+
+
+###################################################################
+#
+# snapshot_exists:
+#
+def snapshot_exists(bucket, season):
+  """
+  Returns True if the season's snapshot is already in the bucket
+
+  Parameters
+  ----------
+  bucket : boto3 Bucket resource,
+  season : year the season ends (int)
+
+  Returns
+  -------
+  True or False
+  """
+  key = SNAPSHOT_KEY.format(season=season)
+  return any(obj.key == key for obj in bucket.objects.filter(Prefix=key).limit(1))
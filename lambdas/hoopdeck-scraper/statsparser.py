@@ -0,0 +1,146 @@
+#
+# statsparser.py
+#
+# Streams the RealGM team stats page through lxml's incremental
+# HTML parser: the body is fed in as it downloads, only the rows of
+# the first "tablesaw" table are looked at, each <tr> is freed as
+# soon as it has been read, and the download stops at the end of
+# the table. Rows come out as a generator of cell strings;
+# statsrows.py converts and validates them.
+#
+# parse_with_bs4 is the old BeautifulSoup html.parser path, kept
+# as the fallback when lxml isn't in the deployment package (and
+# for benchmarks/bench_scraper_parse.py).
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import hashlib
+import json
+
+try:
+  from lxml import etree
+except ImportError:   # fall back to BeautifulSoup
+  etree = None
+
+
+# an example row:
+# ['364', 'Mississippi Valley State', '31', '39.9', '54.1', '19.7', '50.6', '.389', '4.5', '15.3', '.296', '10.3', '15.5', '.660', '6.9', '19.0', '25.9', '8.3', '6.0', '1.9', '15.4', '16.4']
+# Team #, GP, MPG, PPG, FGM, FGA, FG%, 3PM, 3PA, 3P%, FTM, FTA, FT%, ORB, DRB, RPG, APG, SPG, BPG, TOV, PF
+
+
+###################################################################
+#
+# iter_team_rows:
+#
+# chunks is any iterable of bytes, e.g.
+# response.iter_content(chunk_size=64 * 1024) of a streamed
+# requests.get; stop consuming it and the rest of the page is
+# never downloaded.
+#
+def iter_team_rows(chunks):
+  """
+  Yields the team rows of the stats table as they are parsed
+
+  Parameters
+  ----------
+  chunks : iterable of bytes of the page
+
+  Returns
+  -------
+  generator of lists of cell strings, one per <tr> of the table
+  body. Raises ValueError if there is no stats table.
+  """
+  if etree is None:
+    yield from parse_with_bs4(b"".join(chunks))
+    return
+
+  parser = etree.HTMLPullParser(events=("start", "end"))
+  depth = 0          # > 0 while inside the stats table (nested tables count)
+  in_body = False
+  found = False
+
+  for chunk in chunks:
+    parser.feed(chunk)
+    for event, element in parser.read_events():
+      tag = element.tag
+
+      if depth == 0:
+        if event == "start" and tag == "table" and "tablesaw" in (element.get("class") or "").split():
+          depth = 1
+          found = True
+        continue
+
+      if tag == "table":
+        depth += 1 if event == "start" else -1
+        if depth == 0:
+          # end of the stats table: nothing else on the page matters
+          return
+        continue
+
+      if tag == "tbody" and depth == 1:
+        in_body = event == "start"
+      elif event == "end" and tag == "tr" and in_body and depth == 1:
+        yield ["".join(td.itertext()).strip() for td in element if td.tag == "td"]
+        # free the row and anything parsed before it:
+        element.clear()
+        while element.getprevious() is not None:
+          del element.getparent()[0]
+
+  parser.close()
+  if not found:
+    raise ValueError("Stats table not found on the page!")
+
+
+###################################################################
+#
+# table_hash:
+#
+# Fingerprint of a parsed table, to tell whether the stats changed
+# since the last scrape; ads and other page noise don't affect it.
+#
+def table_hash(rows):
+  """
+  Returns the hash of the parsed table rows
+
+  Parameters
+  ----------
+  rows : list of lists of cell strings
+
+  Returns
+  -------
+  64 character hex string
+  """
+  text = json.dumps(rows, separators=(",", ":"))
+  return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+###################################################################
+#
+# parse_with_bs4:
+#
+def parse_with_bs4(html):
+  """
+  Returns the team rows of the stats table, parsed with
+  BeautifulSoup's html.parser
+
+  Parameters
+  ----------
+  html : the whole page (bytes or str)
+
+  Returns
+  -------
+  list of lists of cell strings. Raises ValueError if there is no
+  stats table.
+  """
+  from bs4 import BeautifulSoup
+
+  soup = BeautifulSoup(html, "html.parser")
+  table = soup.find("table", {"class": "tablesaw"})
+  if not table:
+    raise ValueError("Stats table not found on the page!")
+
+  rows = []
+  for tr in table.find("tbody").find_all("tr"):
+    rows.append([td.text.strip() for td in tr.find_all("td")])
+  return rows
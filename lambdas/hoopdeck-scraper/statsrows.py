@@ -0,0 +1,206 @@
+#
+# statsrows.py
+#
+# Turns the raw cell strings of a scraped stats table into typed
+# rows in one pass: the whole table becomes a NumPy structured array
+# (one vectorized string => float conversion for all 20 stat
+# columns), every column is validated with array masks, and rows
+# that fail are set aside with the reasons instead of reaching
+# MySQL. A page with too many bad rows is rejected as a whole.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import numpy as np
+
+from schema import STAT_COLUMNS
+
+
+NUM_CELLS = 2 + len(STAT_COLUMNS)   # rank, team name, 20 stats
+MAX_REJECTED_FRACTION = 0.1         # more bad rows than this => bad page
+
+TABLE_DTYPE = np.dtype([("team_rank", np.int32), ("team_name", object)] +
+                       [(column, np.float64) for column in STAT_COLUMNS])
+
+MISSING = ("", "-", "—")   # blank stats, stored as NULL
+
+PERCENTAGES = ["field_goal_percentage", "three_point_percentage", "free_throw_percentage"]
+MADE_ATTEMPTED = [
+  ("field_goals_made", "field_goals_attempted"),
+  ("three_pointers_made", "three_pointers_attempted"),
+  ("free_throws_made", "free_throws_attempted"),
+]
+
+
+class BadPageError(ValueError):
+  """
+  Raised when so many rows fail validation that the page itself is
+  probably broken (layout change, error page, partial download)
+  """
+
+  def __init__(self, message, rejected):
+    super().__init__(message)
+    self.rejected = rejected
+
+
+###################################################################
+#
+# parse_table:
+#
+def parse_table(cell_rows):
+  """
+  Converts and validates a scraped table
+
+  Parameters
+  ----------
+  cell_rows : list of rows, each a list of cell strings (rank, team
+    name, 20 stats)
+
+  Returns
+  -------
+  (structured array of TABLE_DTYPE with the valid rows, list of
+  rejected rows as {"row", "team", "reasons"} dictionaries).
+  Raises BadPageError if more than MAX_REJECTED_FRACTION of the
+  rows are rejected.
+  """
+  reasons = [[] for _ in cell_rows]
+
+  for i, cells in enumerate(cell_rows):
+    if len(cells) != NUM_CELLS:
+      reasons[i].append(f"expected {NUM_CELLS} cells, got {len(cells)}")
+
+  shaped = [i for i, cells in enumerate(cell_rows) if len(cells) == NUM_CELLS]
+  text = np.array([cell_rows[i] for i in shaped], dtype=np.str_).reshape(len(shaped), NUM_CELLS)
+
+  table = np.zeros(len(shaped), dtype=TABLE_DTYPE)
+  table["team_name"] = np.char.strip(text[:, 1]).astype(object)
+
+  ranks, bad_rank = _to_numbers(text[:, :1], allow_missing=False)
+  table["team_rank"] = np.where(bad_rank[:, 0], 0, ranks[:, 0]).astype(np.int32)
+  stats, bad_stats = _to_numbers(text[:, 2:], allow_missing=True)
+  for j, column in enumerate(STAT_COLUMNS):
+    table[column] = stats[:, j]
+
+  checks = _checks(table)
+  for j, column in enumerate(STAT_COLUMNS):
+    checks.append((bad_stats[:, j], f"{column} is not a number"))
+  checks.append((bad_rank[:, 0], "rank is not a number"))
+
+  for mask, reason in checks:
+    for k in np.flatnonzero(mask):
+      reasons[shaped[k]].append(reason)
+
+  rejected = [
+    {"row": i, "team": cell_rows[i][1] if len(cell_rows[i]) > 1 else None, "reasons": reasons[i]}
+    for i in range(len(cell_rows)) if len(reasons[i]) > 0
+  ]
+
+  if len(cell_rows) == 0 or len(rejected) > MAX_REJECTED_FRACTION * len(cell_rows):
+    raise BadPageError(f"{len(rejected)} of {len(cell_rows)} rows failed validation", rejected)
+
+  valid = np.array([len(reasons[i]) == 0 for i in shaped], dtype=bool)
+  return table[valid], rejected
+
+
+###################################################################
+#
+# typed_rows:
+#
+def typed_rows(table):
+  """
+  Returns the rows of a parsed table as Python values, ready for
+  schema.to_team_row
+
+  Parameters
+  ----------
+  table : structured array from parse_table
+
+  Returns
+  -------
+  list of [rank (int), team name (str), 20 floats] lists, missing
+  stats as None
+  """
+  values = np.column_stack([table[column] for column in STAT_COLUMNS]).reshape(len(table), len(STAT_COLUMNS))
+  stats = values.astype(object)
+  stats[np.isnan(values)] = None
+
+  rows = []
+  for rank, name, values in zip(table["team_rank"].tolist(), table["team_name"], stats.tolist()):
+    rows.append([rank, name] + values)
+  return rows
+
+
+###################################################################
+#
+# report:
+#
+def report(rejected, limit=10):
+  """
+  Prints the rejected rows (the first few in full)
+
+  Parameters
+  ----------
+  rejected : list from parse_table or BadPageError.rejected,
+  limit : max # of rows printed in full
+
+  Returns
+  -------
+  nothing
+  """
+  if len(rejected) == 0:
+    return
+  print(f"⚠️ {len(rejected)} rows rejected:")
+  for entry in rejected[:limit]:
+    print(f"   row {entry['row']} ({entry['team']}): {'; '.join(entry['reasons'])}")
+  if len(rejected) > limit:
+    print(f"   ... and {len(rejected) - limit} more")
+
+
+def _to_numbers(text, allow_missing):
+  #
+  # one vectorized conversion for the whole block; only if some cell
+  # isn't a number, find which ones cell by cell:
+  #
+  missing = np.isin(np.char.strip(text), MISSING)
+  cleaned = np.where(missing, "nan", text)
+  try:
+    values = cleaned.astype(np.float64)
+    bad = np.zeros(text.shape, dtype=bool)
+  except ValueError:
+    values = np.full(text.shape, np.nan)
+    bad = np.zeros(text.shape, dtype=bool)
+    for index, cell in np.ndenumerate(cleaned):
+      try:
+        values[index] = float(cell)
+      except ValueError:
+        bad[index] = True
+  if not allow_missing:
+    bad |= missing
+  return values, bad
+
+
+def _checks(table):
+  # (mask of failing rows, reason); NaN (missing) stats pass, since
+  # comparisons with NaN are False
+  checks = [
+    (table["team_rank"] < 0, "rank is negative"),
+    (np.char.str_len(table["team_name"].astype(np.str_)) == 0, "team name is blank"),
+    (~(table["games_played"] > 0), "GP must be > 0"),
+    (table["minutes_per_game"] > 60, "MPG over 60"),
+  ]
+
+  for column in PERCENTAGES:
+    checks.append(((table[column] < 0) | (table[column] > 1), f"{column} outside 0..1"))
+
+  for column in STAT_COLUMNS:
+    if column not in PERCENTAGES:
+      checks.append((table[column] < 0, f"{column} is negative"))
+
+  for made, attempted in MADE_ATTEMPTED:
+    checks.append((table[made] > table[attempted] + 0.05, f"{made} > {attempted}"))
+
+  names, counts = np.unique(table["team_name"].astype(np.str_), return_counts=True)
+  duplicates = np.isin(table["team_name"].astype(np.str_), names[counts > 1])
+  checks.append((duplicates, "team listed twice"))
+
+  return checks
@@ -0,0 +1,73 @@
+#
+# teamnames.py
+#
+# Team name normalization shared by the lambdas. The normalized
+# form is stored in teams.name_key (indexed) so lookups do not
+# depend on case, punctuation or spacing.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import re
+import unicodedata
+
+
+#
+# common names people type => the RealGM team name(s) they mean.
+# Keys are normalized; a value is a tuple because the site has
+# used more than one spelling for some schools over the years,
+# and the first one present in the loaded season wins.
+#
+ALIASES = {
+  "byu": ("Brigham Young",),
+  "connecticut": ("UConn",),
+  "miami": ("Miami (FL)",),
+  "miami florida": ("Miami (FL)",),
+  "unc": ("North Carolina",),
+  "nc state": ("North Carolina State", "NC State"),
+  "pitt": ("Pittsburgh",),
+  "ole miss": ("Mississippi",),
+  "smc": ("Saint Mary's",),
+  "st marys": ("Saint Mary's",),
+  "st peters": ("Saint Peter's",),
+  "st johns": ("St. John's", "St. John's (NY)"),
+  "southern california": ("USC",),
+  "texas christian": ("TCU",),
+  "tamu": ("Texas A&M",),
+  "louisiana state": ("LSU",),
+  "virginia commonwealth": ("VCU",),
+  "southern methodist": ("SMU",),
+  "central florida": ("UCF",),
+  "nevada las vegas": ("UNLV",),
+  "uva": ("Virginia",),
+  "zags": ("Gonzaga",),
+}
+
+_DROP = re.compile(r"['’.&]")
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+
+###################################################################
+#
+# normalize_team_name:
+#
+# "Saint Mary's" => "saint marys", "Miami (FL)" => "miami fl",
+# "Texas A&M" => "texas am"
+#
+def normalize_team_name(name):
+  """
+  Returns the normalized lookup key for a team name
+
+  Parameters
+  ----------
+  name : team name as scraped or typed by a user (string)
+
+  Returns
+  -------
+  lower-case key with accents and punctuation removed and
+  words separated by single spaces
+  """
+  name = unicodedata.normalize("NFKD", name)
+  name = name.encode("ascii", "ignore").decode("ascii").lower()
+  name = _DROP.sub("", name)
+  return _SEPARATORS.sub(" ", name).strip()
@@ -0,0 +1,23 @@
+#
+# fields.py
+#
+# Named lists of teams that /stats/bulk can be asked for by name
+# (?field=march_madness_2024) instead of listing every team.
+# Names must match the teams table exactly.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+FIELDS = {
+  "march_madness_2024": [
+    "Purdue", "Tennessee", "Creighton", "Kansas", "Gonzaga", "South Carolina", "Texas", "Utah State",
+    "TCU", "Virginia", "Oregon", "McNeese State", "Samford", "Akron", "Saint Peter's", "Montana State",
+    "Alabama", "Arizona", "Baylor", "Clemson", "Dayton", "Grand Canyon", "Michigan State", "Nevada",
+    "North Carolina", "Saint Mary's", "Long Beach State", "Charleston", "Colgate", "New Mexico",
+    "Central Michigan", "Ball State", "Houston", "Auburn", "Duke", "Florida", "Arkansas", "Texas A&M",
+    "Iowa", "Marquette", "Providence", "USC", "Kentucky", "Memphis", "Indiana", "Illinois", "West Virginia",
+    "Rutgers", "UConn", "UCLA", "Maryland", "Xavier", "Miami (FL)", "Florida State", "Wisconsin", "Missouri",
+    "Seton Hall", "Louisville", "Georgetown", "Syracuse", "Oklahoma", "Pittsburgh", "Colorado", "Brigham Young",
+    "Northwestern"
+  ],
+}
@@ -5,21 +5,196 @@ import uuid
 import base64
 import pathlib
 import datatier
+import statsaccess
 import urllib.parse
 import string
-import random
 
 from configparser import ConfigParser
+from fields import FIELDS
+from resolver import get_resolver
+
+
+MAX_BULK_TEAMS = 400   # a full season is ~364 teams
+
+SNAPSHOT_KEY = "snapshots/teams_{season}.npz"   # as written by hoopdeck-scraper
+SNAPSHOT_URL_EXPIRES = 900                      # seconds
+
+
+#
+# requested_teams:
+#
+# Teams for /stats/bulk and /stats/metrics are given as exact names,
+# either as a query parameter (?teams=Duke,Purdue), as a named list
+# from fields.py (?field=march_madness_2024), or in a POST body
+# ({"teams": [...], "field": "..."}). Returns (teams, None), or
+# (None, error response).
+#
+def requested_teams(event):
+    query = event.get("queryStringParameters") or {}
+    field = query.get("field")
+    teams = [team.strip() for team in query.get("teams", "").split(",")]
+
+    body = event.get("body")
+    if body:
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body).decode("utf-8")
+        request = json.loads(body)
+        field = request.get("field", field)
+        teams = teams + [str(team).strip() for team in request.get("teams", [])]
+
+    if field is not None:
+        if field not in FIELDS:
+            return None, {
+                'statusCode': 400,
+                'body': json.dumps(f"Unknown field {field}...")
+            }
+        teams = FIELDS[field] + teams
+
+    # drop blanks and repeats, keep the caller's order:
+    teams = list(dict.fromkeys(team for team in teams if team != ""))
+
+    if len(teams) > MAX_BULK_TEAMS:
+        return None, {
+            'statusCode': 400,
+            'body': json.dumps(f"At most {MAX_BULK_TEAMS} teams per request...")
+        }
+    return teams, None
+
+
+#
+# bulk_stats:
+#
+# Handles /stats/bulk/{year}: the stats of all requested teams,
+# fetched with one IN (...) query on the (season, team_name) key.
+#
+def bulk_stats(dbConn, season, event):
+    teams, error = requested_teams(event)
+    if error is not None:
+        return error
+    if len(teams) == 0:
+        return {
+            'statusCode': 400,
+            'body': json.dumps("No teams requested...")
+        }
+
+    found = statsaccess.get_teams_stats(dbConn, season, teams)
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'season': season,
+            'teams': [found[team.lower()] for team in teams if team.lower() in found],
+            'missing': [team for team in teams if team.lower() not in found]
+        })
+    }
+
+
+#
+# metrics:
+#
+# Handles /stats/metrics/{year}: the derived metrics the scraper
+# precomputes (possessions, ORTG, eFG%, TS%, TOV% and every raw
+# stat, each with its league percentile and z-score) for the
+# requested teams, or for the whole league if none are requested.
+#
+def metrics(dbConn, season, event):
+    teams, error = requested_teams(event)
+    if error is not None:
+        return error
+
+    if len(teams) == 0:
+        found = statsaccess.get_teams_metrics(dbConn, season)
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'season': season, 'teams': found, 'missing': []})
+        }
+
+    found = statsaccess.get_teams_metrics(dbConn, season, teams)
+    by_key = {name.lower(): name for name in found}
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'season': season,
+            'teams': {by_key[team.lower()]: found[by_key[team.lower()]] for team in teams if team.lower() in by_key},
+            'missing': [team for team in teams if team.lower() not in by_key]
+        })
+    }
+
+
+#
+# snapshot_url:
+#
+# Handles /stats/snapshot/{year}: returns a presigned URL for the
+# season's .npz snapshot that the scraper publishes to S3 (arrays
+# "team_name", "rank" and one per stat key, sorted by team name).
+#
+def snapshot_url(configur, season):
+    s3_profile = 's3readonly'
+    boto3.setup_default_session(profile_name=s3_profile)
+    bucketname = configur.get('s3', 'bucket_name')
+    s3 = boto3.client('s3')
+
+    key = SNAPSHOT_KEY.format(season=season)
+    listing = s3.list_objects_v2(Bucket=bucketname, Prefix=key, MaxKeys=1)
+    if not any(obj["Key"] == key for obj in listing.get("Contents", [])):
+        return {
+            'statusCode': 400,
+            'body': json.dumps("No snapshot for that season...")
+        }
+
+    url = s3.generate_presigned_url('get_object',
+                                    Params={'Bucket': bucketname, 'Key': key},
+                                    ExpiresIn=SNAPSHOT_URL_EXPIRES)
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'season': season,
+            'url': url,
+            'expires_in': SNAPSHOT_URL_EXPIRES
+        })
+    }
+
+
+#
+# did_you_mean: "A", "A or B", "A, B, or C"
+#
+def did_you_mean(names):
+    if len(names) == 1:
+        return names[0]
+    if len(names) == 2:
+        return f"{names[0]} or {names[1]}"
+    return ", ".join(names[:-1]) + f", or {names[-1]}"
+
 
 def lambda_handler(event, context):
+    dbConn = None
     try: 
         print("**STARTING**")
         print("**lambda: hoopdeck_stats**")
 
         params = event["pathParameters"]
-        team = str(params["team"])
         year = str(params["year"])
-        decoded_team = urllib.parse.unquote(team)
+
+        try:
+            season = int(year)
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'body': json.dumps("Invalid year...")
+            }
+
+        # /stats/bulk/{year} returns many teams at once,
+        # /stats/metrics/{year} their derived metrics, and
+        # /stats/snapshot/{year} a download link for the whole season
+        # (all also accepted as team "bulk"/"metrics"/"snapshot" on the
+        # /stats/{team}/{year} resource):
+        resource = event.get("resource") or ""
+        is_bulk = resource.startswith("/stats/bulk") or params.get("team") == "bulk"
+        is_metrics = resource.startswith("/stats/metrics") or params.get("team") == "metrics"
+        is_snapshot = resource.startswith("/stats/snapshot") or params.get("team") == "snapshot"
+
+        decoded_team = "" if is_bulk or is_metrics or is_snapshot else urllib.parse.unquote(str(params["team"]))
 
         bypass = False
         if decoded_team.endswith("_exact"):
@@ -38,8 +213,12 @@ def lambda_handler(event, context):
         rds_pwd = configur.get('rds', 'user_pwd')
         rds_dbname = configur.get('rds', 'db_name')
 
+        if is_snapshot:
+            return snapshot_url(configur, season)
+
         print("**Opening DB connection**")
-        dbConn = datatier.get_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
+        dbConn = datatier.acquire_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
+        print(f"**DB pool: {datatier.pool_stats()}**")
 
         ############
         # sql = "SELECT team_name FROM teams"
@@ -53,79 +232,47 @@ def lambda_handler(event, context):
         # }
         ############
 
-        if year == "2025":
-            table = "teams"
-        else:
-            table = "teams" + year
+        if is_bulk:
+            return bulk_stats(dbConn, season, event)
+        if is_metrics:
+            return metrics(dbConn, season, event)
 
+        # the exact lookup is served by the unique (season, team_name)
+        # key; a search is first resolved to one team name in memory
+        if not bypass:
+            resolver = get_resolver(dbConn, season)
+            matches = resolver.matches(decoded_team)
 
-        if bypass:
-            sql = "SELECT * FROM teams WHERE team_name = %s;"
-            row = datatier.retrieve_one_row(dbConn, sql, [decoded_team])
-            if row is None:
-                return {
-                'statusCode': 400,
-                'body': json.dumps("No team found...")
-            }
-        else:    
-            sql = "SELECT * FROM teams WHERE team_name LIKE %s;"
-            row = datatier.retrieve_all_rows(dbConn, sql, [f"%{decoded_team}%"])
-            if len(row) > 1:
-                if len(row) == 2:
-                    team1 = row[0][2]
-                    team2 = row[1][2]
-                    message = f"Multiple teams match your search. Did you mean {team1} or {team2}?"
-                elif len(row) == 3:
-                    team1 = row[0][2]
-                    team2 = row[1][2]
-                    team3 = row[2][2]
-                    message = f"Multiple teams match your search. Did you mean {team1}, {team2}, or {team3}?"
+            if len(matches) > 1:
+                if len(matches) <= 3:
+                    message = f"Multiple teams match your search. Did you mean {did_you_mean(matches)}?"
                 else:
-                    #random 3 teams?
-                    random_indices = random.sample(range(len(row)), 3)
-                    rand1, rand2, rand3 = random_indices
-                    team1 = row[rand1][2]
-                    team2 = row[rand2][2]
-                    team3 = row[rand3][2]
-                    num = len(row) - 3
+                    team1, team2, team3 = matches[:3]
+                    num = len(matches) - 3
                     message = f"Multiple teams match your search. Did you mean {team1}, {team2}, {team3}, or one of {num} other teams?"
                 return {
                     'statusCode': 400,
                     'body': json.dumps(message)
                 }
-            elif len(row) == 1:
-                row = row[0]
-            else:
+            elif len(matches) == 0:
+                suggestions = resolver.suggest(decoded_team)
+                if len(suggestions) > 0:
+                    message = f"No team found... Did you mean {did_you_mean(suggestions)}?"
+                else:
+                    message = "No team found..."
                 return {
                     'statusCode': 400,
-                    'body': json.dumps("No team found...")
+                    'body': json.dumps(message)
                 }
 
-        # example cell: ['364', 'Mississippi Valley State', '31', '39.9', '54.1', '19.7', '50.6', '.389', '4.5', '15.3', '.296', '10.3', '15.5', '.660', '6.9', '19.0', '25.9', '8.3', '6.0', '1.9', '15.4', '16.4']
-        # Team #, GP, MPG, PPG, FGM, FGA, FG%, 3PM, 3PA, 3P%, FTM, FTA, FT%, ORB, DRB, RPG, APG, SPG, BPG, TOV, PF
-        team_stats = {
-            'team_name': row[2],
-            'GP': row[3],      # Games Played
-            'MPG': row[4],     # Minutes Per Game'
-            'PPG': row[5],    # Points Per Game
-            'FGM': row[6],    # Field Goals Made
-            'FGA': row[7],    # Field Goals Attempted
-            'FG%': row[8],    # Field Goal Percentage
-            '3PM': row[9],    # Three-Point Field Goals Made
-            '3PA': row[10],   # Three-Point Field Goals Attempted
-            '3P%': row[11],   # Three-Point Percentage
-            'FTM': row[12],   # Free Throws Made
-            'FTA': row[13],   # Free Throws Attempted
-            'FT%': row[14],   # Free Throw Percentage
-            'ORB': row[15],   # Offensive Rebounds
-            'DRB': row[16],   # Defensive Rebounds
-            'RPG': row[17],   # Rebounds Per Game
-            'APG': row[18],   # Assists Per Game
-            'SPG': row[19],   # Steals Per Game
-            'BPG': row[20],   # Blocks Per Game
-            'TOV': row[21],   # Turnovers Per Game
-            'PF': row[22]     # Personal Fouls
-        }
+            decoded_team = matches[0]
+
+        team_stats = statsaccess.get_team_stats(dbConn, season, decoded_team)
+        if team_stats is None:
+            return {
+                'statusCode': 400,
+                'body': json.dumps("No team found...")
+            }
 
         return {
             'statusCode': 200,
@@ -137,4 +284,6 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps(str(err))
         }
-
+    finally:
+        if dbConn is not None:
+            datatier.release_dbConn(dbConn)
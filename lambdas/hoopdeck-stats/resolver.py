@@ -0,0 +1,216 @@
+#
+# resolver.py
+#
+# In-memory team name resolver for the /stats search path. All team
+# names of a season are loaded once per Lambda container and
+# indexed by normalized name, alias, word prefix and trigram, so
+# resolving what the user typed never touches MySQL and never
+# needs a leading-wildcard LIKE.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import bisect
+import time
+
+import datatier
+
+from teamnames import ALIASES, normalize_team_name
+
+
+RESOLVER_TTL_SECONDS = 3600   # reload names at most once an hour
+EMPTY_TTL_SECONDS = 60        # ... but soon if the season had none yet
+MIN_FUZZY_SIMILARITY = 0.4    # below this a name is not suggested
+
+_resolvers = {}   # season => (load time, TeamResolver)
+
+
+###################################################################
+#
+# get_resolver:
+#
+# Returns the resolver for a season, loading the season's team
+# names from the database on first use (or once the cached copy is
+# older than RESOLVER_TTL_SECONDS). A season with no teams yet, e.g.
+# a new season before the scraper has loaded it, is only cached for
+# EMPTY_TTL_SECONDS, so its teams show up soon after they're loaded.
+#
+def get_resolver(dbConn, season):
+  """
+  Returns the (cached) TeamResolver for a season
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int)
+
+  Returns
+  -------
+  a TeamResolver
+  """
+  cached = _resolvers.get(season)
+  if cached is not None:
+    ttl = RESOLVER_TTL_SECONDS if len(cached[1].names) > 0 else EMPTY_TTL_SECONDS
+    if time.time() - cached[0] < ttl:
+      return cached[1]
+
+  sql = "SELECT team_name FROM teams WHERE season = %s;"
+  rows = datatier.retrieve_all_rows(dbConn, sql, [season])
+  resolver = TeamResolver([row[0] for row in rows])
+
+  _resolvers[season] = (time.time(), resolver)
+  print(f"**Loaded {len(resolver.names)} team names for season {season}**")
+  return resolver
+
+
+def _trigrams(text):
+  return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+###################################################################
+#
+# TeamResolver
+#
+# Resolves free-text team names against a fixed list of names:
+#
+#   matches(query) -- names the query identifies, best first
+#   suggest(query, n) -- closest names when nothing matches
+#
+class TeamResolver:
+
+  def __init__(self, names, aliases=ALIASES):
+    self.names = sorted(set(names))
+    self.keys = [normalize_team_name(name) for name in self.names]
+
+    self._by_key = {}
+    for i, key in enumerate(self.keys):
+      self._by_key.setdefault(key, []).append(i)
+
+    # an alias only counts if the name it points at exists:
+    self._aliases = {}
+    for alias, targets in aliases.items():
+      for target in targets:
+        ids = self._by_key.get(normalize_team_name(target))
+        if ids is not None:
+          self._aliases[alias] = ids
+          break
+
+    # sorted (word suffix, id) pairs: "north carolina state" is
+    # filed under itself, "carolina state" and "state", so a
+    # bisect finds every name with a word starting with the query:
+    self._word_starts = []
+    for i, key in enumerate(self.keys):
+      words = key.split(" ")
+      for w in range(len(words)):
+        self._word_starts.append((" ".join(words[w:]), i))
+    self._word_starts.sort()
+
+    # trigram => ids; padded so word starts and ends count too:
+    self._padded = [_trigrams(f" {key} ") for key in self.keys]
+    self._postings = {}
+    for i, grams in enumerate(self._padded):
+      for gram in grams:
+        self._postings.setdefault(gram, []).append(i)
+
+  def matches(self, query):
+    """
+    Returns the names the query identifies, best match first. An
+    exact (normalized) name or a known alias gives one name;
+    otherwise every name containing the query is returned.
+
+    Parameters
+    ----------
+    query : team name as typed by a user (string)
+
+    Returns
+    -------
+    list of team names, [] if none
+    """
+    key = normalize_team_name(query)
+    if key == "":
+      return []
+
+    ids = self._by_key.get(key) or self._aliases.get(key)
+    if ids is not None:
+      return [self.names[i] for i in ids]
+
+    if len(key) < 3:
+      ids = self._word_prefix_ids(key)
+    else:
+      ids = self._substring_ids(key)
+
+    return self._ranked(key, ids)
+
+  def suggest(self, query, n=3):
+    """
+    Returns up to n names most similar to the query (trigram
+    similarity), for typos that match nothing
+
+    Parameters
+    ----------
+    query : team name as typed by a user (string),
+    n : max # of suggestions (int)
+
+    Returns
+    -------
+    list of team names, most similar first
+    """
+    key = normalize_team_name(query)
+    if key == "":
+      return []
+
+    grams = _trigrams(f" {key} ")
+    shared = {}
+    for gram in grams:
+      for i in self._postings.get(gram, []):
+        shared[i] = shared.get(i, 0) + 1
+
+    scored = []
+    for i, count in shared.items():
+      similarity = 2.0 * count / (len(grams) + len(self._padded[i]))
+      if similarity >= MIN_FUZZY_SIMILARITY:
+        scored.append((-similarity, self.names[i]))
+
+    scored.sort()
+    return [name for (_, name) in scored[:n]]
+
+  def _word_prefix_ids(self, key):
+    start = bisect.bisect_left(self._word_starts, (key, -1))
+    ids = set()
+    for suffix, i in self._word_starts[start:]:
+      if not suffix.startswith(key):
+        break
+      ids.add(i)
+    return ids
+
+  def _substring_ids(self, key):
+    # a name contains the query only if it has every trigram of
+    # the query, so intersect the (short) posting lists and then
+    # confirm with a real substring test:
+    grams = sorted(_trigrams(key), key=lambda gram: len(self._postings.get(gram, [])))
+    ids = None
+    for gram in grams:
+      postings = self._postings.get(gram)
+      if postings is None:
+        return set()
+      ids = set(postings) if ids is None else ids.intersection(postings)
+      if len(ids) == 0:
+        return ids
+    return {i for i in ids if key in self.keys[i]}
+
+  def _ranked(self, key, ids):
+    # name starts with the query, then a word starts with it, then
+    # closest overall (trigram similarity), shortest, alphabetical:
+    grams = _trigrams(f" {key} ")
+
+    def rank(i):
+      name_key = self.keys[i]
+      shared = len(grams & self._padded[i])
+      similarity = 2.0 * shared / (len(grams) + len(self._padded[i]))
+      return (not name_key.startswith(key),
+              f" {key}" not in f" {name_key}",
+              -similarity,
+              len(name_key),
+              self.names[i])
+
+    return [self.names[i] for i in sorted(ids, key=rank)]
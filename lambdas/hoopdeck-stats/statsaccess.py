@@ -0,0 +1,166 @@
+#
+# statsaccess.py
+#
+# Reads team season stats from the teams table and maps them to the
+# JSON dictionaries /stats returns. Shared by hoopdeck-stats and
+# hoopdeck-predict (which used to fetch stats through API Gateway);
+# keep the copies in both lambdas identical.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import datatier
+
+
+#
+# columns selected for a team, in the order row_to_stats reads them:
+#
+STATS_COLUMNS = """team_name, games_played, minutes_per_game, points_per_game,
+    field_goals_made, field_goals_attempted, field_goal_percentage,
+    three_pointers_made, three_pointers_attempted, three_point_percentage,
+    free_throws_made, free_throws_attempted, free_throw_percentage,
+    offensive_rebounds, defensive_rebounds, rebounds_per_game,
+    assists_per_game, steals_per_game, blocks_per_game,
+    turnovers, personal_fouls"""
+
+
+###################################################################
+#
+# row_to_stats:
+#
+# One row selected with STATS_COLUMNS => the JSON dictionary
+# returned to clients.
+#
+def row_to_stats(row):
+  """
+  Maps a teams row to the /stats dictionary
+
+  Parameters
+  ----------
+  row : tuple selected with STATS_COLUMNS
+
+  Returns
+  -------
+  dict of team_name and stat abbreviations
+  """
+  # Team #, GP, MPG, PPG, FGM, FGA, FG%, 3PM, 3PA, 3P%, FTM, FTA, FT%, ORB, DRB, RPG, APG, SPG, BPG, TOV, PF
+  return {
+    'team_name': row[0],
+    'GP': row[1],      # Games Played
+    'MPG': row[2],     # Minutes Per Game'
+    'PPG': row[3],    # Points Per Game
+    'FGM': row[4],    # Field Goals Made
+    'FGA': row[5],    # Field Goals Attempted
+    'FG%': row[6],    # Field Goal Percentage
+    '3PM': row[7],    # Three-Point Field Goals Made
+    '3PA': row[8],   # Three-Point Field Goals Attempted
+    '3P%': row[9],   # Three-Point Percentage
+    'FTM': row[10],   # Free Throws Made
+    'FTA': row[11],   # Free Throws Attempted
+    'FT%': row[12],   # Free Throw Percentage
+    'ORB': row[13],   # Offensive Rebounds
+    'DRB': row[14],   # Defensive Rebounds
+    'RPG': row[15],   # Rebounds Per Game
+    'APG': row[16],   # Assists Per Game
+    'SPG': row[17],   # Steals Per Game
+    'BPG': row[18],   # Blocks Per Game
+    'TOV': row[19],   # Turnovers Per Game
+    'PF': row[20]     # Personal Fouls
+  }
+
+
+###################################################################
+#
+# get_team_stats:
+#
+# Looks up one team by exact name through the unique
+# (season, team_name) key.
+#
+def get_team_stats(dbConn, season, team_name):
+  """
+  Returns the stats of one team
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int),
+  team_name : exact team name (string)
+
+  Returns
+  -------
+  /stats dictionary, or None if there is no such team
+  """
+  sql = f"SELECT {STATS_COLUMNS} FROM teams WHERE season = %s AND team_name = %s;"
+  row = datatier.retrieve_one_row(dbConn, sql, [season, team_name])
+  if len(row) == 0:
+    return None
+  return row_to_stats(row)
+
+
+###################################################################
+#
+# get_teams_stats:
+#
+# Looks up many teams by exact name with a single IN (...) query.
+# MySQL compares names case-insensitively, so the result is keyed
+# by the lower-cased name.
+#
+def get_teams_stats(dbConn, season, team_names):
+  """
+  Returns the stats of many teams
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int),
+  team_names : exact team names (list of strings)
+
+  Returns
+  -------
+  dict of lower-cased team name => /stats dictionary, for the
+  teams that were found
+  """
+  if len(team_names) == 0:
+    return {}
+
+  placeholders = ", ".join(["%s"] * len(team_names))
+  sql = f"SELECT {STATS_COLUMNS} FROM teams WHERE season = %s AND team_name IN ({placeholders});"
+  rows = datatier.retrieve_all_rows(dbConn, sql, [season] + list(team_names))
+  return {row[0].lower(): row_to_stats(row) for row in rows}
+
+
+###################################################################
+#
+# get_teams_metrics:
+#
+# Reads the derived metrics the scraper precomputes (team_metrics,
+# see the scraper's metrics.py) for some or all teams of a season.
+#
+def get_teams_metrics(dbConn, season, team_names=None):
+  """
+  Returns the derived metrics of many teams
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  season : year the season ends (int),
+  team_names : exact team names (list of strings), or None for
+    every team of the season
+
+  Returns
+  -------
+  dict of team name (as stored) => {metric => {"value",
+  "percentile", "z"}}, for the teams that were found
+  """
+  sql = "SELECT team_name, metric, value, percentile, z_score FROM team_metrics WHERE season = %s"
+  params = [season]
+  if team_names is not None:
+    if len(team_names) == 0:
+      return {}
+    sql += f" AND team_name IN ({', '.join(['%s'] * len(team_names))})"
+    params += list(team_names)
+
+  metrics = {}
+  for team_name, metric, value, percentile, z_score in datatier.retrieve_all_rows(dbConn, sql + ";", params):
+    metrics.setdefault(team_name, {})[metric] = {"value": value, "percentile": percentile, "z": z_score}
+  return metrics
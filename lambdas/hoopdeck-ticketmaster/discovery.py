@@ -0,0 +1,209 @@
+#
+# discovery.py
+#
+# Ticketmaster Discovery API access for hoopdeck-ticketmaster: all
+# pages of an event search (the first page says how many there
+# are, the rest are fetched concurrently on a small pool, backing
+# off on 429; searches over the API's result limit are split by
+# date), and a compiled extractor that pulls fixed paths out of
+# each event in one pass.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+
+EVENTS_URL = "https://app.ticketmaster.com/discovery/v2/events.json"
+PAGE_SIZE = 200         # the API's maximum
+MAX_RESULTS = 1000      # the API refuses page * size >= 1000 ("deep paging")
+MAX_WORKERS = 4         # pages in flight at once; the API allows 5 calls a second
+MAX_ATTEMPTS = 4
+MIN_WINDOW_SECONDS = 3600   # date windows are split no finer than this
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+  """
+  Ticketmaster answered with an error status; never cached
+  """
+
+  def __init__(self, status_code):
+    super().__init__(f"Ticketmaster returned status code {status_code}")
+    self.status_code = status_code
+
+
+###################################################################
+#
+# compile_extractor:
+#
+# paths are dotted keys with list indexes as numbers, e.g.
+# "_embedded.venues.0.address.line1"; they are split once, and the
+# returned function walks all of them per event with a single
+# except per path instead of a try block per field.
+#
+def compile_extractor(paths, default="N/A"):
+  """
+  Returns a function extracting the given paths from a JSON object
+
+  Parameters
+  ----------
+  paths : list of dotted paths,
+  default : value for a path that isn't there
+
+  Returns
+  -------
+  function(obj) => list of values, one per path
+  """
+  compiled = [tuple(int(step) if step.isdigit() else step for step in path.split("."))
+              for path in paths]
+
+  def extract(obj):
+    values = []
+    for steps in compiled:
+      value = obj
+      try:
+        for step in steps:
+          value = value[step]
+      except (KeyError, IndexError, TypeError):
+        value = default
+      values.append(value)
+    return values
+
+  return extract
+
+
+###################################################################
+#
+# fetch_all_events:
+#
+# The API serves at most MAX_RESULTS events per search. A search
+# with more (page.totalElements) is split into two half-length date
+# windows, recursively, until every window fits; only a window that
+# can't be split further (MIN_WINDOW_SECONDS) is truncated, and
+# then the result says so.
+#
+def fetch_all_events(apikey, query_params):
+  """
+  Returns every event of a Discovery API search, in API order
+
+  Parameters
+  ----------
+  apikey : Ticketmaster API key,
+  query_params : search parameters (city, keyword, sort, dates...),
+    without apikey, size or page
+
+  Returns
+  -------
+  (list of event dictionaries, True if complete or False if some
+  events were left out). Raises UpstreamError if a page can't be
+  fetched.
+  """
+  session = _get_session()
+  params = dict(query_params, apikey=apikey, size=str(PAGE_SIZE))
+
+  events, complete = _fetch_window(session, params)
+
+  # sub-windows share their boundary second:
+  seen = set()
+  unique = []
+  for event in events:
+    event_id = event.get("id")
+    if event_id is None or event_id not in seen:
+      seen.add(event_id)
+      unique.append(event)
+
+  print(f"fetched {len(unique)} events" + ("" if complete else " (incomplete)"))
+  return unique, complete
+
+
+def _fetch_window(session, params):
+  first = _get_page(session, params, 0)
+  events = _events_of(first)
+
+  page = first.get("page", {})
+  total = page.get("totalElements", len(events))
+  if total > MAX_RESULTS:
+    halves = _split_window(params)
+    if halves is not None:
+      print(f"{total} events between {params['startDateTime']} and {params['endDateTime']}, "
+            f"splitting the window")
+      events = []
+      complete = True
+      for half in halves:
+        half_events, half_complete = _fetch_window(session, half)
+        events.extend(half_events)
+        complete = complete and half_complete
+      return events, complete
+    print(f"**WARNING: {total} events match, only the first {MAX_RESULTS} can be fetched**")
+
+  last_page = min(page.get("totalPages", 1), MAX_RESULTS // PAGE_SIZE) - 1
+  if last_page >= 1:
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, last_page)) as executor:
+      pages = executor.map(lambda number: _get_page(session, params, number), range(1, last_page + 1))
+      for page_body in pages:
+        events.extend(_events_of(page_body))
+
+  return events, total <= MAX_RESULTS
+
+
+def _split_window(params):
+  # two halves of the search's date window, or None if it has none
+  # or it is already as short as allowed
+  try:
+    start = datetime.strptime(params["startDateTime"], DATE_FORMAT)
+    end = datetime.strptime(params["endDateTime"], DATE_FORMAT)
+  except (KeyError, ValueError):
+    return None
+  if (end - start).total_seconds() < 2 * MIN_WINDOW_SECONDS:
+    return None
+
+  middle = start + (end - start) / 2
+  return [dict(params, endDateTime=middle.strftime(DATE_FORMAT)),
+          dict(params, startDateTime=middle.strftime(DATE_FORMAT))]
+
+
+def _get_page(session, params, number):
+  for attempt in range(1, MAX_ATTEMPTS + 1):
+    response = session.get(EVENTS_URL, params=dict(params, page=str(number)), timeout=15)
+    if response.status_code == 200:
+      return response.json()
+    if response.status_code != 429 or attempt == MAX_ATTEMPTS:
+      raise UpstreamError(response.status_code)
+
+    # rate limited: honor Retry-After if given, else back off
+    # exponentially
+    try:
+      delay = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+      delay = 0.5 * 2 ** (attempt - 1)
+    time.sleep(min(delay, 8.0))
+
+
+def _events_of(page):
+  try:
+    return list(page["_embedded"]["events"])
+  except (KeyError, TypeError):
+    return []
+
+
+def _get_session():
+  # one keep-alive session per container, sized for the page pool
+  global _session
+  with _session_lock:
+    if _session is None:
+      _session = requests.Session()
+      adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS)
+      _session.mount("https://", adapter)
+    return _session
@@ -0,0 +1,253 @@
+#
+# eventcache.py
+#
+# Cache of /events/{city} results, so popular cities don't spend
+# the Ticketmaster rate limit on every request:
+#
+#   1. in-container entries with a short TTL (warm invocations)
+#   2. optionally, the event_cache table in MySQL with a longer TTL,
+#      shared by all containers
+#
+# and single-flight fetching: concurrent misses for the same key
+# make one upstream call -- threads in a container wait on a
+# per-key lock, containers on a MySQL named lock (GET_LOCK), and
+# everyone else then reads the freshly stored entry.
+#
+# Keys are the normalized city plus the (day granularity) date
+# window, so "Chicago", " chicago " and "CHICAGO" share an entry.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+
+from contextlib import contextmanager
+
+import datatier
+
+
+MEMORY_TTL_SECONDS = 300
+TABLE_TTL_SECONDS = 1800
+LOCK_TIMEOUT_SECONDS = 10   # wait this long for another container's fetch
+CACHE_VERSION = 3           # bump when cached results change format or content
+
+createTableSQL = """
+CREATE TABLE IF NOT EXISTS event_cache (
+    cache_key CHAR(64) NOT NULL PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    payload MEDIUMTEXT NOT NULL,
+    expires_at DOUBLE NOT NULL
+)
+"""
+
+_entries = {}       # cache key => (expires at, value)
+_key_locks = {}     # cache key => [lock, # of users], for in-container single-flight
+_lock = threading.Lock()
+_table_ready = False
+_cache_stats = {"memory_hits": 0, "table_hits": 0, "fetches": 0, "coalesced": 0}
+
+
+###################################################################
+#
+# normalize_city:
+#
+def normalize_city(city):
+  """
+  Returns the cache form of a city name: accents removed, lower
+  case, single spaces
+
+  Parameters
+  ----------
+  city : city name as requested
+
+  Returns
+  -------
+  normalized string
+  """
+  text = unicodedata.normalize("NFKD", city)
+  text = "".join(c for c in text if not unicodedata.combining(c))
+  return re.sub(r"\s+", " ", text).strip().lower()
+
+
+###################################################################
+#
+# cache_key:
+#
+def cache_key(city, start, end):
+  """
+  Returns (cache key, readable description) of a city and date
+  window
+
+  Parameters
+  ----------
+  city : city name as requested,
+  start : start of the window (datetime),
+  end : end of the window (datetime)
+
+  Returns
+  -------
+  (64 character hex string, string)
+  """
+  description = f"v{CACHE_VERSION}|{normalize_city(city)}|{start:%Y-%m-%d}|{end:%Y-%m-%d}"
+  return hashlib.sha256(description.encode("utf-8")).hexdigest(), description[:255]
+
+
+###################################################################
+#
+# get_or_fetch:
+#
+def get_or_fetch(key, description, fetch, dbConn=None):
+  """
+  Returns the cached value for key, calling fetch() (once, however
+  many callers are waiting) on a miss
+
+  Parameters
+  ----------
+  key, description : from cache_key,
+  fetch : function returning the JSON serializable value, or
+    raising (errors are not cached),
+  dbConn : optional database connection for the shared tier
+
+  Returns
+  -------
+  the value
+  """
+  value = _from_memory(key)
+  if value is not None:
+    _count("memory_hits")
+    return value
+
+  with _single_flight(key):
+    # another thread may have fetched it while we waited:
+    value = _from_memory(key)
+    if value is not None:
+      _count("coalesced")
+      return value
+
+    if dbConn is None:
+      return _fetch_and_remember(key, fetch)
+
+    _ensure_table(dbConn)
+    value = _from_table(dbConn, key)
+    if value is not None:
+      _count("table_hits")
+      _remember(key, value)
+      return value
+
+    lock_name = f"hoopdeck-events-{key[:40]}"
+    row = datatier.retrieve_one_row(dbConn, "SELECT GET_LOCK(%s, %s);", [lock_name, LOCK_TIMEOUT_SECONDS])
+    locked = len(row) > 0 and row[0] == 1
+    try:
+      if locked:
+        # another container may have fetched it while we waited:
+        value = _from_table(dbConn, key)
+        if value is not None:
+          _count("coalesced")
+          _remember(key, value)
+          return value
+
+      value = _fetch_and_remember(key, fetch)
+      sql = """
+      INSERT INTO event_cache (cache_key, description, payload, expires_at) VALUES (%s, %s, %s, %s)
+      ON DUPLICATE KEY UPDATE payload = VALUES(payload), expires_at = VALUES(expires_at)
+      """
+      datatier.perform_action(dbConn, sql, [key, description, json.dumps(value), time.time() + TABLE_TTL_SECONDS])
+      return value
+    finally:
+      if locked:
+        datatier.retrieve_one_row(dbConn, "SELECT RELEASE_LOCK(%s);", [lock_name])
+
+
+###################################################################
+#
+# cache_stats:
+#
+def cache_stats():
+  """
+  Returns the hit/fetch counters of this container
+
+  Parameters
+  ----------
+  None
+
+  Returns
+  -------
+  dict with memory_hits, table_hits, fetches, coalesced and entries
+  """
+  with _lock:
+    stats = dict(_cache_stats)
+    stats["entries"] = len(_entries)
+  return stats
+
+
+def _from_memory(key):
+  with _lock:
+    entry = _entries.get(key)
+    if entry is None:
+      return None
+    if entry[0] < time.monotonic():
+      del _entries[key]
+      return None
+    return entry[1]
+
+
+def _remember(key, value):
+  now = time.monotonic()
+  with _lock:
+    _entries[key] = (now + MEMORY_TTL_SECONDS, value)
+    # drop expired entries so a long-lived container doesn't grow:
+    for stale in [k for k, (expires, _) in _entries.items() if expires < now]:
+      del _entries[stale]
+
+
+@contextmanager
+def _single_flight(key):
+  # holds key's lock; the lock only exists while someone is using or
+  # waiting for it, so a warm container doesn't keep one per key
+  # it has ever served
+  with _lock:
+    entry = _key_locks.setdefault(key, [threading.Lock(), 0])
+    entry[1] += 1
+  try:
+    with entry[0]:
+      yield
+  finally:
+    with _lock:
+      entry[1] -= 1
+      if entry[1] == 0:
+        del _key_locks[key]
+
+
+def _fetch_and_remember(key, fetch):
+  _count("fetches")
+  value = fetch()
+  _remember(key, value)
+  return value
+
+
+def _from_table(dbConn, key):
+  # end the previous read's transaction, so rows committed by other
+  # containers since then are visible:
+  dbConn.commit()
+  sql = "SELECT payload FROM event_cache WHERE cache_key = %s AND expires_at > %s;"
+  row = datatier.retrieve_one_row(dbConn, sql, [key, time.time()])
+  if len(row) == 0:
+    return None
+  return json.loads(row[0])
+
+
+def _count(counter):
+  with _lock:
+    _cache_stats[counter] += 1
+
+
+def _ensure_table(dbConn):
+  global _table_ready
+  if not _table_ready:
+    datatier.perform_action(dbConn, createTableSQL, [])
+    _table_ready = True
@@ -0,0 +1,167 @@
+#
+# eventschema.py
+#
+# The compact /events response (?v=2). Instead of one 10-element
+# list per game (the v1 format, without teams), with the date and
+# time twice, "N/A" strings and full URLs, games are sent column by
+# column:
+#
+#   {
+#     "version": 2,
+#     "count": 3,
+#     "url_prefix": "https://www.ticketmaster.com/",
+#     "venues": [{"name": ..., "address": ...}, ...],
+#     "teams": {"17": "Duke", ...},
+#     "columns": {
+#       "name": [...],
+#       "date": ["2025-11-04", ...],        ISO date
+#       "time": ["19:00", ...],             24 hour local time
+#       "min_price": [...], "max_price": [...],
+#       "url": [...],                       relative to url_prefix when possible
+#       "venue": [0, 0, 1],                 index into venues
+#       "teams": [[17, 42], [], ...]        keys of teams
+#     }
+#   }
+#
+# Missing values are null. ?fields=name,date,... returns only those
+# columns (and only the lookup tables they use). Formatting dates
+# and times for display is left to the client.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import base64
+import gzip
+import json
+
+
+SCHEMA_VERSION = 2
+FIELDS = ["name", "date", "time", "min_price", "max_price", "url", "venue", "teams"]
+URL_PREFIX = "https://www.ticketmaster.com/"
+MIN_GZIP_BYTES = 1024   # smaller bodies aren't worth compressing
+
+
+###################################################################
+#
+# parse_fields:
+#
+def parse_fields(text):
+  """
+  Returns the columns requested by a ?fields= parameter
+
+  Parameters
+  ----------
+  text : comma separated field names, or None for all of them
+
+  Returns
+  -------
+  (list of fields in FIELDS order, None), or (None, error message)
+  """
+  if text is None or text.strip() == "":
+    return FIELDS, None
+
+  requested = {field.strip() for field in text.split(",") if field.strip() != ""}
+  unknown = sorted(requested - set(FIELDS))
+  if len(unknown) > 0:
+    return None, f"unknown fields {unknown}; valid fields are {FIELDS}"
+  return [field for field in FIELDS if field in requested], None
+
+
+###################################################################
+#
+# encode_games:
+#
+def encode_games(games, fields=FIELDS):
+  """
+  Converts games to the compact column layout
+
+  Parameters
+  ----------
+  games : list of games as built by the handler (name, time,
+    formatted time, date, formatted date, min price, max price, url,
+    venue, address, teams),
+  fields : columns to include, from parse_fields
+
+  Returns
+  -------
+  dict, ready for json.dumps
+  """
+  columns = {field: [] for field in fields}
+  venues = {}   # (name, address) => index
+  teams = {}    # id => name
+
+  for name, time, _, date, _, minPrice, maxPrice, gameUrl, venue, address, game_teams in games:
+    time = _or_none(time)
+    values = {
+      "name": _or_none(name),
+      "date": _or_none(date),
+      "time": time[:5] if time is not None else None,   # "19:00:00" => "19:00"
+      "min_price": _or_none(minPrice),
+      "max_price": _or_none(maxPrice),
+      "url": _relative_url(gameUrl),
+    }
+    for field in fields:
+      if field == "venue":
+        place = (_or_none(venue), _or_none(address))
+        columns["venue"].append(venues.setdefault(place, len(venues)))
+      elif field == "teams":
+        columns["teams"].append([team["id"] for team in game_teams])
+        for team in game_teams:
+          teams[str(team["id"])] = team["name"]
+      else:
+        columns[field].append(values[field])
+
+  result = {"version": SCHEMA_VERSION, "count": len(games)}
+  if "url" in fields:
+    result["url_prefix"] = URL_PREFIX
+  if "venue" in fields:
+    result["venues"] = [{"name": name, "address": address} for (name, address) in venues]
+  if "teams" in fields:
+    result["teams"] = teams
+  result["columns"] = columns
+  return result
+
+
+###################################################################
+#
+# response_body:
+#
+# Serializes a response body, gzipped (and base64 encoded, as API
+# Gateway expects binary bodies) if the caller accepts gzip and the
+# body is big enough to benefit.
+#
+def response_body(obj, accept_encoding=None):
+  """
+  Returns the body, extra headers and isBase64Encoded flag of a
+  JSON response
+
+  Parameters
+  ----------
+  obj : JSON serializable value,
+  accept_encoding : the request's Accept-Encoding header, if any
+
+  Returns
+  -------
+  (body string, dict of headers, True or False)
+  """
+  text = json.dumps(obj, separators=(",", ":"))
+  headers = {"Content-Type": "application/json"}
+
+  accepted = [coding.split(";")[0].strip().lower() for coding in (accept_encoding or "").split(",")]
+  if "gzip" not in accepted or len(text) < MIN_GZIP_BYTES:
+    return text, headers, False
+
+  compressed = gzip.compress(text.encode("utf-8"), compresslevel=6)
+  headers["Content-Encoding"] = "gzip"
+  return base64.b64encode(compressed).decode("ascii"), headers, True
+
+
+def _or_none(value):
+  return None if value == "N/A" else value
+
+
+def _relative_url(url):
+  url = _or_none(url)
+  if url is not None and url.startswith(URL_PREFIX):
+    return url[len(URL_PREFIX):]
+  return url
@@ -7,14 +7,164 @@
 #
 
 import json
-import requests
+import math
 from datetime import datetime, timedelta
 import urllib.parse
 
+import datatier
+import discovery
+import eventcache
+import eventschema
+import teammatch
+import venuestore
+
+from configparser import ConfigParser
+
 # Replace with your actual API key
 TICKETMASTER_API_KEY = "API_KEY"
 
+
+#
+# paths of the /events fields, in the order of the tuples returned:
+#
+EVENT_FIELDS = discovery.compile_extractor([
+    "name",
+    "url",
+    "dates.start.localDate",
+    "dates.start.localTime",
+    "priceRanges.0.min",
+    "priceRanges.0.max",
+    "_embedded.venues.0.name",
+    "_embedded.venues.0.address.line1",
+])
+
+
+###################################################################
+#
+# search_params:
+#
+# Discovery API parameters shared by city and radius searches:
+# basketball games in a date window, soonest first.
+#
+def search_params(start, end):
+    return {
+        "keyword": "Basketball",
+        "classificationName": "Sports",  # Ensure it's in the sports category
+        "sort": "date,asc",
+        "startDateTime": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "endDateTime": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+###################################################################
+#
+# to_game:
+#
+# Reduces a Discovery event to the ten fields /events returns,
+# followed by whether Ticketmaster classifies it as college (teams
+# are only matched in college games).
+#
+def to_game(event):
+    name, gameUrl, date, time, minPrice, maxPrice, venue, address = EVENT_FIELDS(event)
+
+    try:
+        if date == "N/A":
+            dateObject = datetime.max
+            formatted_date = "N/A"
+        else:
+            dateObject = datetime.strptime(date, "%Y-%m-%d")
+            formatted_date = dateObject.strftime("%B %d, %Y")
+    except ValueError:
+        dateObject = datetime.max
+        formatted_date = "N/A"
+
+    try:
+        if time == "N/A":
+            formatted_time = "N/A"
+        else:
+            formatted_time = datetime.strptime(time, "%H:%M:%S").strftime("%-I:%M %p")
+    except ValueError:
+        formatted_time = "N/A"
+
+    return (name, time, formatted_time, date, formatted_date, minPrice, maxPrice, gameUrl, venue, address,
+            teammatch.is_college_event(event))
+
+
+###################################################################
+#
+# fetch_games:
+#
+# All basketball games in a city and date window (every page of
+# the Discovery API search). With a database connection, their
+# venues and games are added to the venue store too.
+#
+def fetch_games(city, start, end, dbConn=None):
+    print("building request " + str(city))
+    radius = 100
+
+    query_params = dict(search_params(start, end),
+                        city=city,
+                        #postalCode=postal,
+                        radius=str(radius))  # Search within 100 miles
+
+    events, complete = discovery.fetch_all_events(TICKETMASTER_API_KEY, query_params)
+    if not complete:
+        print(f"**WARNING: games for {city} are incomplete**")
+    games_list = [to_game(game) for game in events]
+
+    if dbConn is not None:
+        venuestore.store_events(dbConn, events, games_list)
+
+    return games_list
+
+
+###################################################################
+#
+# fetch_region:
+#
+# All basketball games within a radius of a point, as (Discovery
+# events, games, True if the search was complete).
+#
+def fetch_region(lat, lon, miles, start, end):
+    print(f"building request {lat},{lon} within {miles} miles")
+
+    query_params = dict(search_params(start, end),
+                        geoPoint=venuestore.geohash(lat, lon),
+                        radius=str(miles),
+                        unit="miles")
+
+    events, complete = discovery.fetch_all_events(TICKETMASTER_API_KEY, query_params)
+    if not complete:
+        print(f"**WARNING: games within {miles} miles of {lat},{lon} are incomplete**")
+    return events, [to_game(game) for game in events], complete
+
+
+###################################################################
+#
+# nearby:
+#
+# Reads ?lat=&lon=&miles= (radius search). Returns (None, None)
+# when lat / lon aren't given, ((lat, lon, miles), None), or (None,
+# error message).
+#
+def nearby(query):
+    if "lat" not in query and "lon" not in query:
+        return None, None
+    try:
+        lat = float(query["lat"])
+        lon = float(query["lon"])
+        miles = float(query.get("miles", 25))
+    except (KeyError, ValueError):
+        return None, "lat and lon must both be given, as numbers (and miles too, if given)"
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None, "lat must be in -90..90 and lon in -180..180"
+    if not (0 < miles <= venuestore.MAX_MILES):
+        return None, f"miles must be in 0..{venuestore.MAX_MILES}"
+    return (lat, lon, miles), None
+
+
 def lambda_handler(event, context):
+    dbConn = None
     try:
         # Define the Ticketmaster API URL (Example: fetching events)
         params = event["pathParameters"]
@@ -22,102 +172,103 @@ def lambda_handler(event, context):
         decoded_postal = urllib.parse.unquote(postal)
 
         print("postal: " + postal)
+
+        # ?v=2 selects the compact column layout (see eventschema.py),
+        # with ?fields= to pick columns; without it games are lists:
+        query = event.get("queryStringParameters") or {}
+        version = str(query.get("v", "1"))
+        if version not in ("1", str(eventschema.SCHEMA_VERSION)):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({"error": f"unknown response version {version}"})
+            }
+        fields, error = eventschema.parse_fields(query.get("fields"))
+        if error is not None:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({"error": error})
+            }
+        point, error = nearby(query)
+        if error is not None:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({"error": error})
+            }
         #postal = "97205"
 
         current_date = datetime.now()
         three_weeks_later = current_date + timedelta(weeks=3)
-        start_date = current_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-        end_date = three_weeks_later.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        print("building request " + str(postal))
-        size = 200
-        radius = 100
-
-        url = "https://app.ticketmaster.com/discovery/v2/events.json"
-        query_params = {
-            "apikey": TICKETMASTER_API_KEY,
-            "city": decoded_postal,
-            #"postalCode": postal,
-            "radius": str(radius),  # Search within 100 miles
-            "size": str(size),  # Fetch up to 10 events
-            "keyword": "Basketball",
-            "classificationName": "Sports",  # Ensure it's in the sports category
-            "sort": "date,asc",
-            "startDateTime": start_date,
-            "endDateTime": end_date,
-        }
 
-        response = requests.get(url, params=query_params)
+        # the shared cache tier is used when the config file has an
+        # [rds] section:
+        configur = ConfigParser()
+        configur.read('hoopdeck-config.ini')
+        if configur.has_section('rds'):
+            dbConn = datatier.acquire_dbConn(configur.get('rds', 'endpoint'),
+                                             int(configur.get('rds', 'port_number')),
+                                             configur.get('rds', 'user_name'),
+                                             configur.get('rds', 'user_pwd'),
+                                             configur.get('rds', 'db_name'))
 
-        if response.status_code != 200:
+        try:
+            if point is not None:
+                # games within miles of lat, lon; from the venue store
+                # when there is a database, else straight from upstream:
+                lat, lon, miles = point
+                if dbConn is not None:
+                    games_list = venuestore.nearby_games(
+                        dbConn, lat, lon, miles, current_date, three_weeks_later,
+                        lambda lat, lon, reach: fetch_region(lat, lon, reach, current_date, three_weeks_later))
+                else:
+                    _, games_list, _ = fetch_region(lat, lon, math.ceil(miles), current_date, three_weeks_later)
+            else:
+                key, description = eventcache.cache_key(decoded_postal, current_date, three_weeks_later)
+                games_list = eventcache.get_or_fetch(
+                    key, description,
+                    lambda: fetch_games(decoded_postal, current_date, three_weeks_later, dbConn),
+                    dbConn)
+        except discovery.UpstreamError as err:
             return {
-                'statusCode': response.status_code,
+                'statusCode': err.status_code,
                 'body': json.dumps({"error": "Failed to fetch events from Ticketmaster API"})
             }
-        
-        body = response.json()
+        print(f"event cache: {eventcache.cache_stats()}")
 
-        try:
-            events = body["_embedded"]["events"]
-        except:
+        if len(games_list) == 0:
             return {
                 'statusCode': 204,
                 'body': "no games"
             }
 
-        games_list = []
-
-        for game in events:
-            name = gameUrl = date = time = minPrice = maxPrice = venue = address = "N/A" 
-            try: name = game["name"]
-            except (KeyError, IndexError, TypeError): pass
-
-            try: gameUrl = game["url"]
-            except (KeyError, IndexError, TypeError): pass
-            
-            try: date = game["dates"]["start"]["localDate"]
-            except (KeyError, IndexError, TypeError): pass
-
-            try: time = game["dates"]["start"]["localTime"]
-            except (KeyError, IndexError, TypeError): pass
-
-            try: minPrice = game["priceRanges"][0]["min"]
-            except (KeyError, IndexError, TypeError): pass
-
-            try: maxPrice = game["priceRanges"][0]["max"]
-            except (KeyError, IndexError, TypeError): pass
-
-            try: venue = game["_embedded"]["venues"][0]["name"]
-            except (KeyError, IndexError, TypeError): pass
-
-            try: address = game["_embedded"]["venues"][0]["address"]["line1"]
-            except (KeyError, IndexError, TypeError): pass
+        if version == "1":
+            # v1 rows are the original ten fields, for older clients:
+            print("returning response")
+            return {
+                'statusCode': 200,
+                'body': json.dumps([list(game[:10]) for game in games_list])
+            }
 
-            try:
-                if date == "N/A":
-                    dateObject = datetime.max
-                    formatted_date = "N/A"
-                else:
-                    dateObject = datetime.strptime(date, "%Y-%m-%d")
-                    formatted_date = dateObject.strftime("%B %d, %Y")
-            except ValueError:
-                dateObject = datetime.max
-                formatted_date = "N/A"
-
-            try:
-                if time == "N/A":
-                    formatted_time = "N/A"
-                else:
-                    formatted_time = datetime.strptime(time, "%H:%M:%S").strftime("%-I:%M %p")
-            except ValueError:
-                formatted_time = "N/A"
+        # v2 games also get the teams playing, as {"id", "name"} of
+        # the latest season's teams rows ([] without a database, for
+        # games not classified as college, or if no team is
+        # recognized):
+        matcher = teammatch.get_matcher(dbConn) if dbConn is not None else None
+        games_with_teams = []
+        for game in games_list:
+            college = len(game) > 10 and game[10]
+            teams = matcher.find(game[0]) if matcher is not None and college else []
+            games_with_teams.append(list(game[:10]) + [[{"id": team_id, "name": team_name} for team_id, team_name in teams]])
 
-            games_list.append((name, time, formatted_time, date, formatted_date, minPrice, maxPrice, gameUrl, venue, address))
+        headers = {name.lower(): value for name, value in (event.get("headers") or {}).items()}
+        body, response_headers, is_base64 = eventschema.response_body(
+            eventschema.encode_games(games_with_teams, fields), headers.get("accept-encoding"))
 
-        print("returning response")
+        print(f"returning response (v{version}, {len(body)} bytes)")
         return {
             'statusCode': 200,
-            'body': json.dumps(games_list)
+            'headers': response_headers,
+            'isBase64Encoded': is_base64,
+            'body': body
         }
 
     except Exception as e:
@@ -125,4 +276,6 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({"error": str(e)})
         }
-
+    finally:
+        if dbConn is not None:
+            datatier.release_dbConn(dbConn)
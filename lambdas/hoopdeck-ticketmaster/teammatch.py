@@ -0,0 +1,198 @@
+#
+# teammatch.py
+#
+# Finds the teams named in a Ticketmaster event title ("Duke Blue
+# Devils vs. North Carolina Tar Heels") in one pass over the title:
+# every team name and alias of the latest season is compiled once
+# per Lambda container into an Aho-Corasick automaton over
+# normalized text, so matching costs the same however many teams
+# there are.
+#
+# Names only match whole words, and when matches overlap the longest
+# wins ("north carolina state" over "north carolina", "texas am"
+# over "texas"). Mascots and other words are ignored. Only events
+# Ticketmaster classifies as college are matched (is_college_event).
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import time
+
+import datatier
+
+from teamnames import ALIASES, normalize_team_name
+
+
+MATCHER_TTL_SECONDS = 3600   # reload names at most once an hour
+
+#
+# a Discovery genre / subGenre naming one of these is college
+# basketball; anything else (NBA, G League, WNBA, ...) is never
+# matched, since pro titles name cities that are also schools
+# ("Miami Heat", "Houston Rockets"):
+#
+COLLEGE_WORDS = ("college", "ncaa")
+
+_matcher = None   # (load time, TeamMatcher)
+
+
+###################################################################
+#
+# is_college_event:
+#
+def is_college_event(event):
+  """
+  Returns True if a Discovery event is classified as college sports
+
+  Parameters
+  ----------
+  event : Discovery event dictionary
+
+  Returns
+  -------
+  True or False (False if the event has no classification)
+  """
+  for classification in event.get("classifications") or []:
+    for level in ("genre", "subGenre"):
+      name = ((classification or {}).get(level) or {}).get("name") or ""
+      if any(word in name.lower() for word in COLLEGE_WORDS):
+        return True
+  return False
+
+
+###################################################################
+#
+# get_matcher:
+#
+# Returns the matcher for the latest season in the teams table,
+# building it on first use (or once the cached copy is older than
+# MATCHER_TTL_SECONDS).
+#
+def get_matcher(dbConn):
+  """
+  Returns the (cached) TeamMatcher
+
+  Parameters
+  ----------
+  dbConn : the database connection
+
+  Returns
+  -------
+  a TeamMatcher
+  """
+  global _matcher
+  if _matcher is not None and time.time() - _matcher[0] < MATCHER_TTL_SECONDS:
+    return _matcher[1]
+
+  sql = "SELECT id, team_name FROM teams WHERE season = (SELECT MAX(season) FROM teams);"
+  rows = datatier.retrieve_all_rows(dbConn, sql, [])
+  matcher = TeamMatcher([(row[0], row[1]) for row in rows])
+
+  _matcher = (time.time(), matcher)
+  print(f"**Compiled {matcher.num_patterns} team names and aliases for {len(rows)} teams**")
+  return matcher
+
+
+###################################################################
+#
+# TeamMatcher
+#
+# Aho-Corasick automaton over " <normalized name> " patterns (the
+# spaces make names match whole words only):
+#
+#   find(text) -- [(team id, team name)] in order of appearance
+#
+class TeamMatcher:
+
+  def __init__(self, teams, aliases=ALIASES):
+    self.teams = list(teams)
+
+    patterns = {}   # normalized name => team index
+    by_key = {}
+    for i, (_, name) in enumerate(self.teams):
+      key = normalize_team_name(name)
+      if key != "":
+        patterns.setdefault(key, i)
+        by_key.setdefault(key, i)
+
+    # an alias only counts if the name it points at exists, and
+    # never shadows a real team name:
+    for alias, targets in aliases.items():
+      for target in targets:
+        i = by_key.get(normalize_team_name(target))
+        if i is not None:
+          patterns.setdefault(alias, i)
+          break
+
+    self.num_patterns = len(patterns)
+
+    # trie: per state, character => next state; per state, the
+    # (pattern length, team index) pairs ending there:
+    self._goto = [{}]
+    self._outputs = [[]]
+    for key, i in patterns.items():
+      pattern = f" {key} "
+      state = 0
+      for c in pattern:
+        next_state = self._goto[state].get(c)
+        if next_state is None:
+          next_state = len(self._goto)
+          self._goto[state][c] = next_state
+          self._goto.append({})
+          self._outputs.append([])
+        state = next_state
+      self._outputs[state].append((len(pattern), i))
+
+    # failure links, breadth first; a state also reports the
+    # outputs of its failure state (the patterns that are suffixes
+    # of its own):
+    self._fail = [0] * len(self._goto)
+    queue = list(self._goto[0].values())
+    for state in queue:
+      for c, next_state in self._goto[state].items():
+        queue.append(next_state)
+        fallback = self._fail[state]
+        while fallback != 0 and c not in self._goto[fallback]:
+          fallback = self._fail[fallback]
+        target = self._goto[fallback].get(c, 0)
+        self._fail[next_state] = target if target != next_state else 0
+        self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+  def find(self, text):
+    """
+    Returns the teams named in a text, in order of appearance
+
+    Parameters
+    ----------
+    text : event title or any other free text (string)
+
+    Returns
+    -------
+    list of distinct (team id, team name) tuples, [] if none
+    """
+    padded = f" {normalize_team_name(text)} "
+
+    found = []   # (start, end, team index); end exclusive
+    state = 0
+    for position, c in enumerate(padded):
+      while state != 0 and c not in self._goto[state]:
+        state = self._fail[state]
+      state = self._goto[state].get(c, 0)
+      for length, i in self._outputs[state]:
+        # the padding spaces are shared by neighbouring names, so
+        # a match spans only the name itself:
+        found.append((position - length + 2, position, i))
+
+    # longest first, then leftmost; keep those not overlapping a
+    # kept one:
+    found.sort(key=lambda match: (match[0] - match[1], match[0]))
+    kept = []
+    for start, end, i in found:
+      if all(end <= s or start >= e for s, e, _ in kept):
+        kept.append((start, end, i))
+
+    teams = []
+    for _, _, i in sorted(kept):
+      if self.teams[i] not in teams:
+        teams.append(self.teams[i])
+    return teams
@@ -0,0 +1,425 @@
+#
+# venuestore.py
+#
+# Local store of Ticketmaster venues and their games, so "games
+# within N miles of a point" is answered from MySQL instead of a
+# Discovery API search per request:
+#
+#   venues          one row per venue, with its location and geohash;
+#                   indexed by the geohash's first CELL_PRECISION
+#                   characters (a ~39 x 20 km cell at the equator)
+#   venue_events    the /events game of each stored event
+#   event_regions   when each cell was last searched upstream
+#
+# A radius query covers its circle with region cells -- geohash
+# cells intersecting the circle, as small as REGION_PRECISIONS
+# allows within MAX_REGION_CELLS -- reads the venues of those cells
+# through the index, and keeps the games within the radius. Only
+# cells not searched within REGION_TTL_SECONDS (a cell is fresh if
+# it or a larger cell containing it was searched) go upstream: one
+# search just covering the stale cells, and they are marked fresh
+# only if that search came back complete. City searches add their
+# venues and games too.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import json
+import math
+import time
+
+import datatier
+import discovery
+
+
+CELL_PRECISION = 4               # venues.cell, the index radius reads use
+REGION_PRECISIONS = (6, 5, 4)   # region cell sizes, smallest first
+MAX_REGION_CELLS = 512          # per query, so smaller cells are for smaller circles
+REGION_TTL_SECONDS = 1800
+MAX_MILES = 150
+EARTH_RADIUS_MILES = 3958.8
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+createTableSQL = [
+  """
+  CREATE TABLE IF NOT EXISTS venues (
+      venue_id VARCHAR(64) NOT NULL PRIMARY KEY,
+      name VARCHAR(255),
+      address VARCHAR(255),
+      latitude DOUBLE NOT NULL,
+      longitude DOUBLE NOT NULL,
+      geohash CHAR(9) NOT NULL,
+      cell CHAR(4) NOT NULL,
+      KEY ix_venues_cell (cell)
+  )
+  """,
+  """
+  CREATE TABLE IF NOT EXISTS venue_events (
+      event_id VARCHAR(64) NOT NULL PRIMARY KEY,
+      venue_id VARCHAR(64) NOT NULL,
+      local_date DATE,
+      game TEXT NOT NULL,
+      fetched_at DOUBLE NOT NULL,
+      KEY ix_venue_events_venue_date (venue_id, local_date)
+  )
+  """,
+  """
+  CREATE TABLE IF NOT EXISTS event_regions (
+      cell VARCHAR(12) NOT NULL PRIMARY KEY,
+      fetched_at DOUBLE NOT NULL
+  )
+  """,
+]
+
+#
+# the event and venue ids and venue location of a Discovery event:
+#
+EVENT_PLACE = discovery.compile_extractor([
+  "id",
+  "_embedded.venues.0.id",
+  "_embedded.venues.0.location.latitude",
+  "_embedded.venues.0.location.longitude",
+], default=None)
+
+_table_ready = False
+
+
+###################################################################
+#
+# geohash:
+#
+def geohash(lat, lon, precision=9):
+  """
+  Returns the geohash of a point
+
+  Parameters
+  ----------
+  lat, lon : degrees,
+  precision : # of characters
+
+  Returns
+  -------
+  geohash string
+  """
+  i, j = _cell_indexes(lat, lon, precision)
+  return _cell_code(i, j, precision)
+
+
+###################################################################
+#
+# covering_cells:
+#
+def covering_cells(lat, lon, miles, precision=None):
+  """
+  Returns the geohash cells intersecting a circle
+
+  Parameters
+  ----------
+  lat, lon : center in degrees,
+  miles : radius,
+  precision : cell geohash length; by default the first of
+    REGION_PRECISIONS whose cells over the circle's bounding box
+    number at most MAX_REGION_CELLS
+
+  Returns
+  -------
+  list of geohash strings
+  """
+  # the circle's bounding box (longitudes are not wrapped at 180):
+  dlat = math.degrees(miles / EARTH_RADIUS_MILES)
+  dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+
+  if precision is None:
+    for precision in REGION_PRECISIONS:
+      i0, j0 = _cell_indexes(lat - dlat, lon - dlon, precision)
+      i1, j1 = _cell_indexes(lat + dlat, lon + dlon, precision)
+      if (i1 - i0 + 1) * (j1 - j0 + 1) <= MAX_REGION_CELLS:
+        break
+
+  i0, j0 = _cell_indexes(lat - dlat, lon - dlon, precision)
+  i1, j1 = _cell_indexes(lat + dlat, lon + dlon, precision)
+
+  cells = []
+  for i in range(i0, i1 + 1):
+    for j in range(j0, j1 + 1):
+      # the cell's point nearest the center:
+      south, north, west, east = _cell_bounds(i, j, precision)
+      nearest_lat = min(max(lat, south), north)
+      nearest_lon = min(max(lon, west), east)
+      if distance_miles(lat, lon, nearest_lat, nearest_lon) <= miles:
+        cells.append(_cell_code(i, j, precision))
+  return cells
+
+
+###################################################################
+#
+# cells_extent:
+#
+def cells_extent(cells):
+  """
+  Returns the smallest search circle, centered on the cells'
+  bounding box, that covers a set of cells
+
+  Parameters
+  ----------
+  cells : list of geohash strings
+
+  Returns
+  -------
+  (lat, lon, radius in miles)
+  """
+  bounds = [_cell_bounds(*_decode(cell)) for cell in cells]
+  south = min(b[0] for b in bounds)
+  north = max(b[1] for b in bounds)
+  west = min(b[2] for b in bounds)
+  east = max(b[3] for b in bounds)
+  lat, lon = (south + north) / 2, (west + east) / 2
+
+  reach = max(distance_miles(lat, lon, corner_lat, corner_lon)
+              for (s, n, w, e) in bounds for corner_lat in (s, n) for corner_lon in (w, e))
+  return lat, lon, reach
+
+
+###################################################################
+#
+# distance_miles:
+#
+def distance_miles(lat1, lon1, lat2, lon2):
+  """
+  Returns the great circle distance between two points
+
+  Parameters
+  ----------
+  lat1, lon1, lat2, lon2 : degrees
+
+  Returns
+  -------
+  miles (float)
+  """
+  phi1, phi2 = math.radians(lat1), math.radians(lat2)
+  a = (math.sin((phi2 - phi1) / 2) ** 2 +
+       math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+  return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+###################################################################
+#
+# store_events:
+#
+def store_events(dbConn, events, games):
+  """
+  Upserts the venues and games of Discovery events, in one
+  transaction; events whose venue has no location are skipped
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  events : Discovery event dictionaries,
+  games : the /events game built from each event (same order)
+
+  Returns
+  -------
+  # of events stored
+  """
+  _ensure_table(dbConn)
+
+  venue_rows, event_rows = _store_rows(events, games)
+  datatier.perform_transaction(dbConn, [(UPSERT_VENUES, venue_rows), (UPSERT_EVENTS, event_rows)])
+  return len(event_rows)
+
+
+###################################################################
+#
+# nearby_games:
+#
+def nearby_games(dbConn, lat, lon, miles, start, end, fetch_region):
+  """
+  Returns the stored games within a radius, refreshing the stale
+  parts of the region from upstream first
+
+  Parameters
+  ----------
+  dbConn : the database connection,
+  lat, lon : center in degrees,
+  miles : radius (at most MAX_MILES),
+  start, end : date window (datetimes),
+  fetch_region : function(lat, lon, miles) returning (events,
+    games, complete) of an upstream radius search
+
+  Returns
+  -------
+  list of games, by date and time
+  """
+  _ensure_table(dbConn)
+  window = [f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"]
+
+  cells = covering_cells(lat, lon, miles)
+  stale = _stale_cells(dbConn, cells)
+
+  if len(stale) > 0:
+    stale_lat, stale_lon, reach = cells_extent(stale)
+    print(f"**{len(stale)} of {len(cells)} cells stale, searching {math.ceil(reach)} miles "
+          f"around {stale_lat:.4f},{stale_lon:.4f} upstream**")
+    events, games, complete = fetch_region(stale_lat, stale_lon, math.ceil(reach))
+    venue_rows, event_rows = _store_rows(events, games)
+
+    actions = []
+    if complete:
+      # forget the stale cells' stored games in the window, so
+      # cancelled ones go, and mark the cells fresh:
+      venue_ids = _venues_in(dbConn, stale)
+      if len(venue_ids) > 0:
+        placeholders = ", ".join(["%s"] * len(venue_ids))
+        sql = f"DELETE FROM venue_events WHERE venue_id IN ({placeholders}) AND local_date BETWEEN %s AND %s;"
+        actions.append((sql, [venue_ids + window]))
+    actions.append((UPSERT_VENUES, venue_rows))
+    actions.append((UPSERT_EVENTS, event_rows))
+    if complete:
+      now = time.time()
+      actions.append((UPSERT_REGIONS, [[cell, now] for cell in stale]))
+    else:
+      print(f"**Upstream search incomplete: {len(stale)} cells stay stale**")
+
+    # one transaction, so readers never see the region emptied:
+    datatier.perform_transaction(dbConn, actions)
+
+  index_cells = sorted({cell[:CELL_PRECISION] for cell in cells})
+  placeholders = ", ".join(["%s"] * len(index_cells))
+  sql = f"""
+  SELECT venues.latitude, venues.longitude, venue_events.game
+  FROM venues JOIN venue_events ON venue_events.venue_id = venues.venue_id
+  WHERE venues.cell IN ({placeholders}) AND venue_events.local_date BETWEEN %s AND %s;
+  """
+  rows = datatier.retrieve_all_rows(dbConn, sql, index_cells + window)
+
+  games = [json.loads(game) for (venue_lat, venue_lon, game) in rows
+           if distance_miles(lat, lon, venue_lat, venue_lon) <= miles]
+  games.sort(key=lambda game: (game[3], game[1]))
+  return games
+
+
+UPSERT_VENUES = """
+INSERT INTO venues (venue_id, name, address, latitude, longitude, geohash, cell)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE name = VALUES(name), address = VALUES(address), latitude = VALUES(latitude),
+    longitude = VALUES(longitude), geohash = VALUES(geohash), cell = VALUES(cell)
+"""
+
+UPSERT_EVENTS = """
+INSERT INTO venue_events (event_id, venue_id, local_date, game, fetched_at) VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE venue_id = VALUES(venue_id), local_date = VALUES(local_date),
+    game = VALUES(game), fetched_at = VALUES(fetched_at)
+"""
+
+UPSERT_REGIONS = """
+INSERT INTO event_regions (cell, fetched_at) VALUES (%s, %s)
+ON DUPLICATE KEY UPDATE fetched_at = VALUES(fetched_at)
+"""
+
+
+def _store_rows(events, games):
+  # (venues rows, venue_events rows) of events with a located venue
+  venue_rows = {}
+  event_rows = []
+  now = time.time()
+  for event, game in zip(events, games):
+    event_id, venue_id, lat, lon = EVENT_PLACE(event)
+    try:
+      lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+      continue
+    if event_id is None or venue_id is None:
+      continue
+
+    code = geohash(lat, lon)
+    # game = (name, time, formatted time, date, formatted date,
+    #         min price, max price, url, venue, address, college)
+    venue_rows[venue_id] = [venue_id, game[8], game[9], lat, lon, code, code[:CELL_PRECISION]]
+    local_date = game[3] if game[3] != "N/A" else None
+    event_rows.append([event_id, venue_id, local_date, json.dumps(game), now])
+  return list(venue_rows.values()), event_rows
+
+
+def _stale_cells(dbConn, cells):
+  # a cell is fresh if it, or a larger cell containing it, was
+  # searched within REGION_TTL_SECONDS
+  prefixes = sorted({cell[:n] for cell in cells for n in range(min(REGION_PRECISIONS), len(cell) + 1)})
+  placeholders = ", ".join(["%s"] * len(prefixes))
+  sql = f"SELECT cell FROM event_regions WHERE cell IN ({placeholders}) AND fetched_at > %s;"
+  rows = datatier.retrieve_all_rows(dbConn, sql, prefixes + [time.time() - REGION_TTL_SECONDS])
+
+  fresh = {row[0] for row in rows}
+  return [cell for cell in cells
+          if not any(cell[:n] in fresh for n in range(min(REGION_PRECISIONS), len(cell) + 1))]
+
+
+def _venues_in(dbConn, cells):
+  # ids of the stored venues inside any of the cells
+  index_cells = sorted({cell[:CELL_PRECISION] for cell in cells})
+  placeholders = ", ".join(["%s"] * len(index_cells))
+  sql = f"SELECT venue_id, geohash FROM venues WHERE cell IN ({placeholders});"
+  rows = datatier.retrieve_all_rows(dbConn, sql, index_cells)
+
+  wanted = set(cells)
+  lengths = {len(cell) for cell in cells}
+  return [venue_id for venue_id, code in rows if any(code[:n] in wanted for n in lengths)]
+
+
+def _bits(precision):
+  # (latitude bits, longitude bits); longitude gets the odd one
+  bits = 5 * precision
+  return bits // 2, (bits + 1) // 2
+
+
+def _cell_indexes(lat, lon, precision):
+  # (longitude index, latitude index) of the cell containing a point
+  lat_bits, lon_bits = _bits(precision)
+  i = int((lon + 180.0) / 360.0 * 2 ** lon_bits)
+  j = int((lat + 90.0) / 180.0 * 2 ** lat_bits)
+  return min(max(i, 0), 2 ** lon_bits - 1), min(max(j, 0), 2 ** lat_bits - 1)
+
+
+def _cell_bounds(i, j, precision):
+  # (south, north, west, east) of a cell, in degrees
+  lat_bits, lon_bits = _bits(precision)
+  height = 180.0 / 2 ** lat_bits
+  width = 360.0 / 2 ** lon_bits
+  return j * height - 90.0, (j + 1) * height - 90.0, i * width - 180.0, (i + 1) * width - 180.0
+
+
+def _decode(code):
+  # (longitude index, latitude index, precision) of a geohash
+  value = 0
+  for c in code:
+    value = (value << 5) | BASE32.index(c)
+  i = j = 0
+  for k in range(5 * len(code)):
+    bit = (value >> (5 * len(code) - 1 - k)) & 1
+    if k % 2 == 0:
+      i = (i << 1) | bit
+    else:
+      j = (j << 1) | bit
+  return i, j, len(code)
+
+
+def _cell_code(i, j, precision):
+  # interleave the index bits, longitude first, 5 bits per character
+  lat_bits, lon_bits = _bits(precision)
+  value = 0
+  for k in range(5 * precision):
+    if k % 2 == 0:
+      lon_bits -= 1
+      value = (value << 1) | ((i >> lon_bits) & 1)
+    else:
+      lat_bits -= 1
+      value = (value << 1) | ((j >> lat_bits) & 1)
+  return "".join(BASE32[(value >> 5 * (precision - 1 - c)) & 31] for c in range(precision))
+
+
+def _ensure_table(dbConn):
+  global _table_ready
+  if not _table_ready:
+    for sql in createTableSQL:
+      datatier.perform_action(dbConn, sql, [])
+    _table_ready = True
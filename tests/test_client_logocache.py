@@ -0,0 +1,97 @@
+#
+# test_client_logocache.py
+#
+# The client's logo cache: a logo is downloaded once per session,
+# a failed download is not retried within the session, and
+# concurrent downloads of the same logo don't trip over each other's
+# temp files.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import os
+import pathlib
+import sys
+import threading
+
+from io import BytesIO
+
+import requests
+
+from PIL import Image
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "client"))
+
+from logocache import LogoCache
+
+
+def png():
+  buffer = BytesIO()
+  Image.new("RGBA", (4, 4), (200, 30, 30, 255)).save(buffer, "PNG")
+  return buffer.getvalue()
+
+
+class Response:
+
+  def __init__(self, status_code, content=b""):
+    self.status_code = status_code
+    self.content = content
+    self.headers = {}
+
+
+class FakeSession:
+
+  def __init__(self, responses):
+    self.responses = responses   # url => Response or exception
+    self.calls = []
+    self._lock = threading.Lock()
+
+  def get(self, url, headers=None):
+    with self._lock:
+      self.calls.append(url)
+    response = self.responses[url]
+    if isinstance(response, Exception):
+      raise response
+    return response
+
+
+def test_failed_downloads_are_not_retried(tmp_path):
+  session = FakeSession({
+    "missing": Response(404),
+    "slow": requests.Timeout("timed out"),
+    "broken": Response(200, b"not a png"),
+    "logo": Response(200, png()),
+  })
+  cache = LogoCache(str(tmp_path), 1 << 20, session, lambda image: image)
+
+  for _ in range(3):
+    assert cache.get("missing") is None
+    assert cache.get("slow") is None
+    assert cache.get("broken") is None
+    assert cache.get("logo") is not None
+
+  assert sorted(session.calls) == ["broken", "logo", "missing", "slow"]
+
+
+def test_concurrent_stores_of_one_blob(tmp_path):
+  # many URLs, one image: every thread writes the same blob
+  urls = [f"logo {n}" for n in range(16)]
+  session = FakeSession({url: Response(200, png()) for url in urls})
+  cache = LogoCache(str(tmp_path), 1 << 20, session, lambda image: image)
+
+  barrier = threading.Barrier(len(urls))
+  results = {}
+
+  def fetch(url):
+    barrier.wait()
+    results[url] = cache.get(url)
+
+  threads = [threading.Thread(target=fetch, args=(url,)) for url in urls]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert all(results[url] is not None for url in urls)
+  assert [name for name in os.listdir(tmp_path / "blobs") if not name.endswith(".png")] == []
+  assert len(os.listdir(tmp_path / "blobs")) == 1
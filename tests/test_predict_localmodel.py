@@ -0,0 +1,134 @@
+#
+# test_predict_localmodel.py
+#
+# Local scoring in hoopdeck-predict: margins match XGBoost's own
+# predictions for a recorded model (tests/fixtures, written by
+# benchmarks/record_xgboost_fixture.py), and a model is only loaded
+# if its inputs are the 40 numeric stats feature_matrix builds, so
+# a model trained with other columns fails instead of predicting.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import io
+import json
+import pathlib
+import sys
+import tarfile
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "lambdas" / "hoopdeck-predict"))
+
+import localmodel
+
+from encoder import TEAM_FEATURES
+
+
+FIXTURES = pathlib.Path(__file__).resolve().parent / "fixtures"
+
+
+def xgboost_model(feature_names=None, num_feature=localmodel.NUM_INPUTS, feature_types=None):
+  # one stump: team A's PPG (input 2) < 70 => -3, else +5
+  return {"learner": {
+    "objective": {"name": "reg:squarederror"},
+    "learner_model_param": {"base_score": "5E-1", "num_feature": str(num_feature)},
+    "feature_names": feature_names or [],
+    "feature_types": feature_types or [],
+    "gradient_booster": {"model": {"trees": [{
+      "left_children": [1, -1, -1],
+      "right_children": [2, -1, -1],
+      "split_indices": [2, 0, 0],
+      "split_conditions": [70.0, -3.0, 5.0],
+      "default_left": [1, 0, 0],
+    }]}},
+  }}
+
+
+def stats(ppg):
+  team = {f: 1.0 for f in localmodel.NUMERIC_FEATURES}
+  team["team_name"] = "Team"
+  team["PPG"] = ppg
+  return team
+
+
+def test_matches_recorded_xgboost_predictions():
+  with open(FIXTURES / "xgboost_recorded.jsonl") as f:
+    records = [json.loads(line) for line in f if line.strip()]
+  model = localmodel.load_model(str(FIXTURES / "xgboost_model.json"))
+
+  local = localmodel.score_matchups(model, [(r["statsA"], r["statsB"]) for r in records])
+  assert local == pytest.approx([r["margin"] for r in records], abs=1e-4)
+
+
+@pytest.mark.parametrize("names", [
+  [],
+  localmodel.NUMERIC_FEATURES + [f"{f}.1" for f in localmodel.NUMERIC_FEATURES],
+  [f"{team}_{f}" for team in "AB" for f in localmodel.NUMERIC_FEATURES],
+])
+def test_numeric_models_load_and_score(names):
+  model = localmodel.TreeEnsemble(xgboost_model(names, feature_types=["float"] * localmodel.NUM_INPUTS))
+  assert localmodel.score_matchups(model, [(stats(60), stats(80)), (stats(80), stats(60))]) == [-2.5, 5.5]
+
+
+def test_team_name_columns_are_refused():
+  # trained on the full encoder rows: names shift every index by one
+  names = TEAM_FEATURES + [f"{f}.1" for f in TEAM_FEATURES]
+  with pytest.raises(ValueError, match="42 inputs"):
+    localmodel.TreeEnsemble(xgboost_model(names, num_feature=len(names)))
+
+
+def test_reordered_inputs_are_refused():
+  names = [f"{team}_{f}" for team in "BA" for f in localmodel.NUMERIC_FEATURES]
+  with pytest.raises(ValueError, match="input 0"):
+    localmodel.TreeEnsemble(xgboost_model(names))
+
+
+def test_categorical_inputs_are_refused():
+  types = ["float"] * (localmodel.NUM_INPUTS - 1) + ["c"]
+  with pytest.raises(ValueError, match="input 39"):
+    localmodel.TreeEnsemble(xgboost_model(feature_types=types))
+
+
+def test_linear_model_checks_its_inputs(tmp_path):
+  path = tmp_path / "linear.json"
+  path.write_text(json.dumps({"weights": [0.0] * 42, "bias": 1.0}))
+  with pytest.raises(ValueError, match="42 inputs"):
+    localmodel.load_model(str(path), "linear")
+
+
+@pytest.mark.parametrize("objective", ["reg:gamma", "reg:tweedie", "reg:logistic", "binary:logistic", "count:poisson"])
+def test_non_identity_objectives_are_refused(objective):
+  spec = xgboost_model()
+  spec["learner"]["objective"] = {"name": objective}
+  with pytest.raises(ValueError, match="objective"):
+    localmodel.TreeEnsemble(spec)
+
+
+@pytest.mark.parametrize("objective", localmodel.IDENTITY_OBJECTIVES)
+def test_identity_objectives_load(objective):
+  spec = xgboost_model()
+  spec["learner"]["objective"] = {"name": objective}
+  assert localmodel.TreeEnsemble(spec).predict(localmodel.feature_matrix([(stats(60), stats(80))])).tolist() == [-2.5]
+
+
+def model_archive(path, name, data):
+  with tarfile.open(path, "w:gz") as archive:
+    member = tarfile.TarInfo(name)
+    member.size = len(data)
+    archive.addfile(member, io.BytesIO(data))
+
+
+def test_json_in_tar_gz_loads(tmp_path):
+  path = tmp_path / "model.tar.gz"
+  model_archive(path, "model.json", json.dumps(xgboost_model()).encode("utf-8"))
+  model = localmodel.load_model(str(path))
+  assert localmodel.score_matchups(model, [(stats(80), stats(60))]) == [5.5]
+
+
+def test_binary_sagemaker_model_is_refused(tmp_path):
+  # what the built-in SageMaker XGBoost container writes
+  path = tmp_path / "sagemaker.tar.gz"
+  model_archive(path, "xgboost-model", b"binf\x00\x00\x00?")
+  with pytest.raises(ValueError, match="re-saved"):
+    localmodel.load_model(str(path))
@@ -0,0 +1,62 @@
+#
+# test_predict_scoring.py
+#
+# Endpoint scoring in hoopdeck-predict: every row of a batch is sent
+# exactly as a single /predict row would be, so a matchup's margin
+# doesn't depend on where it sits in the batch.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import importlib.util
+import io
+import json
+import pathlib
+import sys
+
+from configparser import ConfigParser
+
+PREDICT_DIR = pathlib.Path(__file__).resolve().parents[1] / "lambdas" / "hoopdeck-predict"
+sys.path.insert(0, str(PREDICT_DIR))
+
+import encoder
+
+# every lambda has a lambda_function module; load this one under its
+# own name so it doesn't shadow the others' in sys.modules:
+_spec = importlib.util.spec_from_file_location("predict_lambda_function", PREDICT_DIR / "lambda_function.py")
+lambda_function = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(lambda_function)
+
+
+class FakeEndpoint:
+
+  def __init__(self):
+    self.bodies = []
+
+  def invoke_endpoint(self, EndpointName, ContentType, Body, Accept):
+    self.bodies.append(Body)
+    lines = Body.decode("utf-8").splitlines()
+    return {"Body": io.BytesIO(json.dumps({"predictions": [{"score": 1.0} for _ in lines]}).encode("utf-8"))}
+
+
+def team(name):
+  stats = {f: 1.0 for f in encoder.TEAM_FEATURES}
+  stats["team_name"] = name
+  return stats
+
+
+def test_batch_rows_match_single_rows(monkeypatch):
+  endpoint = FakeEndpoint()
+  monkeypatch.setattr(lambda_function.boto3, "client", lambda service: endpoint)
+
+  configur = ConfigParser()
+  configur.read_dict({"SageMaker": {"endpoint": "hoopdeck", "batch_size": "2"}})
+  _, score = lambda_function.get_scorer(configur)
+
+  matchups = [(team("Duke"), team("Purdue")), (team("Iowa"), team("Duke")), (team("Duke"), team("Purdue"))]
+  assert score(matchups) == [1.0, 1.0, 1.0]
+
+  lines = [line for body in endpoint.bodies for line in body.decode("utf-8").splitlines()]
+  single = encoder.encode([encoder.feature_row(*matchups[0])], "text/csv").decode("utf-8").strip()
+  assert lines[0] == lines[2] == single
+  assert all(line.startswith("0,") for line in lines)
@@ -0,0 +1,57 @@
+#
+# test_stats_resolver.py
+#
+# The /stats team name resolver cache: a season's names are loaded
+# once an hour, except that a season with no teams yet is reloaded
+# within a minute.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import pathlib
+import sys
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "lambdas" / "hoopdeck-stats"))
+
+import datatier
+import resolver
+
+
+@pytest.fixture
+def season_rows(monkeypatch):
+  rows = []
+  loads = []
+
+  def retrieve_all_rows(dbConn, sql, parameters=[]):
+    loads.append(parameters)
+    return [(name,) for name in rows]
+
+  now = [1000.0]
+  monkeypatch.setattr(datatier, "retrieve_all_rows", retrieve_all_rows)
+  monkeypatch.setattr(resolver.time, "time", lambda: now[0])
+  monkeypatch.setattr(resolver, "_resolvers", {})
+  return rows, loads, now
+
+
+def test_empty_season_is_reloaded_soon(season_rows):
+  rows, loads, now = season_rows
+  assert resolver.get_resolver(None, 2027).matches("Duke") == []
+
+  # the scraper loads the season:
+  rows.extend(["Duke", "Purdue"])
+  now[0] += resolver.EMPTY_TTL_SECONDS - 1
+  assert resolver.get_resolver(None, 2027).matches("Duke") == []
+  now[0] += 2
+  assert resolver.get_resolver(None, 2027).matches("Duke") == ["Duke"]
+  assert len(loads) == 2
+
+
+def test_loaded_season_is_kept_for_the_ttl(season_rows):
+  rows, loads, now = season_rows
+  rows.append("Duke")
+  resolver.get_resolver(None, 2026)
+  now[0] += resolver.RESOLVER_TTL_SECONDS - 1
+  resolver.get_resolver(None, 2026)
+  assert len(loads) == 1
@@ -0,0 +1,84 @@
+#
+# test_ticketmaster_discovery.py
+#
+# Discovery API paging in hoopdeck-ticketmaster: searches over the
+# API's result limit are split by date until every event is
+# fetched, and truncation is reported when they can't be.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import pathlib
+import sys
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "lambdas" / "hoopdeck-ticketmaster"))
+
+import discovery
+
+
+START = datetime(2026, 11, 1)
+
+
+class FakeResponse:
+
+  def __init__(self, body):
+    self.status_code = 200
+    self.headers = {}
+    self._body = body
+
+  def json(self):
+    return self._body
+
+
+class FakeSession:
+  """
+  Serves num_events events, one every `spacing`, with the API's
+  paging and deep paging limit
+  """
+
+  def __init__(self, num_events, spacing):
+    self.times = [START + k * spacing for k in range(num_events)]
+    self.requests = 0
+
+  def get(self, url, params, timeout):
+    self.requests += 1
+    start = datetime.strptime(params["startDateTime"], discovery.DATE_FORMAT)
+    end = datetime.strptime(params["endDateTime"], discovery.DATE_FORMAT)
+    size, number = int(params["size"]), int(params["page"])
+    assert (number + 1) * size <= discovery.MAX_RESULTS
+
+    matching = [k for k, t in enumerate(self.times) if start <= t <= end]
+    events = [{"id": f"e{k}"} for k in matching[number * size:(number + 1) * size]]
+    page = {"totalElements": len(matching), "totalPages": -(-len(matching) // size), "number": number}
+    return FakeResponse({"_embedded": {"events": events}, "page": page})
+
+
+def fetch(monkeypatch, session, days=21):
+  monkeypatch.setattr(discovery, "_session", session)
+  params = {"startDateTime": START.strftime(discovery.DATE_FORMAT),
+            "endDateTime": (START + timedelta(days=days)).strftime(discovery.DATE_FORMAT)}
+  return discovery.fetch_all_events("key", params)
+
+
+def test_small_search_is_one_window(monkeypatch):
+  session = FakeSession(450, timedelta(minutes=60))
+  events, complete = fetch(monkeypatch, session)
+  assert complete
+  assert len(events) == 450
+  assert session.requests == 3
+
+
+def test_large_search_is_split_until_complete(monkeypatch):
+  session = FakeSession(2500, timedelta(minutes=12))
+  events, complete = fetch(monkeypatch, session)
+  assert complete
+  assert [event["id"] for event in events] == [f"e{k}" for k in range(2500)]
+
+
+def test_unsplittable_search_reports_truncation(monkeypatch):
+  session = FakeSession(1500, timedelta(seconds=1))
+  events, complete = fetch(monkeypatch, session)
+  assert not complete
+  assert len(events) == discovery.MAX_RESULTS
@@ -0,0 +1,71 @@
+#
+# test_ticketmaster_eventcache.py
+#
+# In-container single-flight of the /events cache: concurrent misses
+# for one key make one fetch, and no per-key lock outlives the
+# fetch it guarded.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import pathlib
+import sys
+import threading
+import time
+
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "lambdas" / "hoopdeck-ticketmaster"))
+
+import eventcache
+
+
+START = datetime(2026, 11, 1)
+END = datetime(2026, 11, 22)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+  monkeypatch.setattr(eventcache, "_entries", {})
+  monkeypatch.setattr(eventcache, "_key_locks", {})
+
+
+def test_concurrent_misses_fetch_once():
+  fetches = []
+
+  def fetch():
+    fetches.append(1)
+    time.sleep(0.05)
+    return ["game"]
+
+  key, description = eventcache.cache_key("Chicago", START, END)
+  results = []
+  threads = [threading.Thread(target=lambda: results.append(eventcache.get_or_fetch(key, description, fetch)))
+             for _ in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert results == [["game"]] * 8
+  assert len(fetches) == 1
+  assert eventcache._key_locks == {}
+
+
+def test_locks_are_dropped_after_each_fetch():
+  for n in range(50):
+    key, description = eventcache.cache_key(f"City {n}", START, END)
+    eventcache.get_or_fetch(key, description, lambda: [])
+  assert eventcache._key_locks == {}
+
+
+def test_lock_is_dropped_when_fetch_fails():
+  def fetch():
+    raise RuntimeError("upstream down")
+
+  key, description = eventcache.cache_key("Chicago", START, END)
+  with pytest.raises(RuntimeError):
+    eventcache.get_or_fetch(key, description, fetch)
+  assert eventcache._key_locks == {}
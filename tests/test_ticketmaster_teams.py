@@ -0,0 +1,114 @@
+#
+# test_ticketmaster_teams.py
+#
+# Team matching in hoopdeck-ticketmaster: college titles resolve to
+# teams, pro (NBA / G League) titles never do, and v1 /events rows
+# keep their original ten fields.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import json
+import pathlib
+import sys
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "lambdas" / "hoopdeck-ticketmaster"))
+
+import datatier
+import discovery
+import eventcache
+import lambda_function
+import teammatch
+import venuestore
+
+
+TEAMS = [
+  (1, "Duke"), (2, "North Carolina"), (3, "North Carolina State"), (4, "Miami (FL)"),
+  (5, "Oklahoma"), (6, "Houston"), (7, "Indiana"), (8, "Memphis"), (9, "Texas"), (10, "Texas A&M"),
+  (11, "Boston College"), (12, "Santa Cruz"), (13, "Iowa"),
+]
+
+
+def discovery_event(name, genre, sub_genre):
+  return {
+    "id": name,
+    "name": name,
+    "dates": {"start": {"localDate": "2026-11-01", "localTime": "19:00:00"}},
+    "classifications": [{"segment": {"name": "Sports"}, "genre": {"name": genre}, "subGenre": {"name": sub_genre}}],
+  }
+
+
+COLLEGE = [
+  ("Duke Blue Devils vs. North Carolina Tar Heels", ["Duke", "North Carolina"]),
+  ("Texas A&M Aggies vs Texas Longhorns", ["Texas A&M", "Texas"]),
+  ("NC State Wolfpack at Miami Hurricanes", ["North Carolina State", "Miami (FL)"]),
+]
+
+PRO = [
+  ("Miami Heat vs. Boston Celtics", "NBA"),
+  ("Oklahoma City Thunder vs Houston Rockets", "NBA"),
+  ("Indiana Pacers v Memphis Grizzlies", "NBA"),
+  ("Santa Cruz Warriors vs. Iowa Wolves", "NBA G League"),
+  ("Memphis Hustle vs Oklahoma City Blue", "G League"),
+]
+
+
+@pytest.mark.parametrize("title, expected", COLLEGE)
+def test_college_titles_resolve(title, expected):
+  matcher = teammatch.TeamMatcher(TEAMS)
+  assert teammatch.is_college_event(discovery_event(title, "Basketball", "College"))
+  assert [name for _, name in matcher.find(title)] == expected
+
+
+@pytest.mark.parametrize("title, league", PRO)
+def test_pro_titles_are_not_college(title, league):
+  assert not teammatch.is_college_event(discovery_event(title, "Basketball", league))
+
+
+def test_unclassified_events_are_not_college():
+  assert not teammatch.is_college_event({"name": "Duke vs North Carolina"})
+
+
+@pytest.fixture
+def handler(monkeypatch):
+  events = [discovery_event(title, "Basketball", "NCAA Men's") for title, _ in COLLEGE]
+  events += [discovery_event(title, "Basketball", league) for title, league in PRO]
+
+  monkeypatch.setattr(discovery, "fetch_all_events", lambda apikey, params: (events, True))
+  monkeypatch.setattr(datatier, "acquire_dbConn", lambda *args: object())
+  monkeypatch.setattr(datatier, "release_dbConn", lambda dbConn: None)
+  monkeypatch.setattr(datatier, "retrieve_all_rows", lambda dbConn, sql, parameters=[]: TEAMS)
+  monkeypatch.setattr(venuestore, "store_events", lambda dbConn, events, games: len(events))
+  monkeypatch.setattr(eventcache, "get_or_fetch", lambda key, description, fetch, dbConn=None: fetch())
+  monkeypatch.setattr(teammatch, "_matcher", None)
+
+  # the database tier is only used when the config has [rds]:
+  monkeypatch.setattr(lambda_function.ConfigParser, "has_section", lambda self, section: section == "rds")
+  monkeypatch.setattr(lambda_function.ConfigParser, "get", lambda self, section, option: "1")
+
+  def call(query):
+    return lambda_function.lambda_handler({"pathParameters": {"city": "Durham"}, "queryStringParameters": query}, None)
+  return call
+
+
+def test_v2_teams_only_for_college_games(handler):
+  response = handler({"v": "2", "fields": "name,teams"})
+  assert response["statusCode"] == 200
+  body = json.loads(response["body"])
+
+  teams = {name: [body["teams"][str(team_id)] for team_id in ids]
+           for name, ids in zip(body["columns"]["name"], body["columns"]["teams"])}
+  for title, expected in COLLEGE:
+    assert teams[title] == expected
+  for title, _ in PRO:
+    assert teams[title] == []
+
+
+def test_v1_rows_keep_ten_fields(handler):
+  response = handler({})
+  assert response["statusCode"] == 200
+  rows = json.loads(response["body"])
+  assert len(rows) == len(COLLEGE) + len(PRO)
+  assert all(len(row) == 10 for row in rows)
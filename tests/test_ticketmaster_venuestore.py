@@ -0,0 +1,175 @@
+#
+# test_ticketmaster_venuestore.py
+#
+# The venue store of hoopdeck-ticketmaster: radius queries go
+# upstream only for stale cells, search just those cells' extent,
+# and leave cells stale when the upstream search was incomplete.
+# The database is an in-memory fake answering the store's queries.
+#
+# Authors: Lucas Holliday, Sid Javeri, Helena Yuan
+#
+
+import math
+import pathlib
+import random
+import sys
+
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "lambdas" / "hoopdeck-ticketmaster"))
+
+import datatier
+import venuestore
+
+
+START = datetime(2026, 11, 1)
+END = datetime(2026, 11, 22)
+EVANSTON = (42.0451, -87.6877)
+
+
+class FakeStore:
+
+  def __init__(self):
+    self.venues = {}    # venue id => row
+    self.events = {}    # event id => row
+    self.regions = {}   # cell => fetched at
+    self.transactions = []
+
+  def perform_action(self, dbConn, sql, parameters=[]):
+    return 0
+
+  def perform_transaction(self, dbConn, actions, batch_size=500):
+    self.transactions.append([sql.split()[0] for sql, _ in actions])
+    for sql, rows in actions:
+      for row in rows:
+        if sql.startswith("DELETE"):
+          ids, (first, last) = set(row[:-2]), row[-2:]
+          self.events = {k: e for k, e in self.events.items()
+                         if not (e[1] in ids and first <= (e[2] or "") <= last)}
+        elif "INTO venues" in sql:
+          self.venues[row[0]] = row
+        elif "INTO venue_events" in sql:
+          self.events[row[0]] = row
+        elif "INTO event_regions" in sql:
+          self.regions[row[0]] = row[1]
+    return 0
+
+  def retrieve_all_rows(self, dbConn, sql, parameters=[]):
+    if "FROM event_regions" in sql:
+      cells, since = set(parameters[:-1]), parameters[-1]
+      return [(cell,) for cell, at in self.regions.items() if cell in cells and at > since]
+    if "SELECT venue_id, geohash" in sql:
+      return [(v[0], v[5]) for v in self.venues.values() if v[6] in parameters]
+    if "venue_events.game" in sql:
+      cells, (first, last) = set(parameters[:-2]), parameters[-2:]
+      return [(v[3], v[4], e[3]) for e in self.events.values() for v in [self.venues[e[1]]]
+              if v[6] in cells and first <= (e[2] or "") <= last]
+    raise AssertionError(sql)
+
+
+@pytest.fixture
+def store(monkeypatch):
+  fake = FakeStore()
+  for name in ("perform_action", "perform_transaction", "retrieve_all_rows"):
+    monkeypatch.setattr(datatier, name, getattr(fake, name))
+  monkeypatch.setattr(venuestore, "_table_ready", False)
+  return fake
+
+
+def upstream(venues, complete=True):
+  """
+  A fetch_region over fixed venues (id => (lat, lon)), one game
+  each, recording the searches made
+  """
+  searches = []
+
+  def fetch_region(lat, lon, miles):
+    searches.append((lat, lon, miles))
+    events, games = [], []
+    for venue_id, (venue_lat, venue_lon) in venues.items():
+      if venuestore.distance_miles(lat, lon, venue_lat, venue_lon) <= miles:
+        events.append({"id": f"game at {venue_id}",
+                       "_embedded": {"venues": [{"id": venue_id, "location": {
+                         "latitude": str(venue_lat), "longitude": str(venue_lon)}}]}})
+        games.append([f"game at {venue_id}", "19:00:00", "7:00 PM", "2026-11-05", "November 05, 2026",
+                      "N/A", "N/A", "N/A", venue_id, "N/A", True])
+    return events, games, complete
+
+  return fetch_region, searches
+
+
+def random_venues(center, miles, n, seed=1):
+  rng = random.Random(seed)
+  venues = {}
+  for k in range(n):
+    bearing, distance = rng.uniform(0, 2 * math.pi), miles * math.sqrt(rng.random())
+    lat = center[0] + math.degrees(distance * math.cos(bearing) / venuestore.EARTH_RADIUS_MILES)
+    lon = center[1] + math.degrees(distance * math.sin(bearing) / venuestore.EARTH_RADIUS_MILES) / math.cos(math.radians(center[0]))
+    venues[f"v{k}"] = (lat, lon)
+  return venues
+
+
+@pytest.mark.parametrize("miles", [5, 25, 150])
+def test_upstream_search_fits_the_query(miles):
+  cells = venuestore.covering_cells(EVANSTON[0], EVANSTON[1], miles)
+  _, _, reach = venuestore.cells_extent(cells)
+  assert len(cells) <= venuestore.MAX_REGION_CELLS
+  assert miles < reach < 1.25 * miles + 5
+
+
+def test_second_query_is_served_from_the_store(store):
+  venues = random_venues(EVANSTON, 40, 60)
+  fetch_region, searches = upstream(venues)
+
+  first = venuestore.nearby_games(None, *EVANSTON, 25, START, END, fetch_region)
+  second = venuestore.nearby_games(None, *EVANSTON, 25, START, END, fetch_region)
+
+  expected = sorted(f"game at {k}" for k, (lat, lon) in venues.items()
+                    if venuestore.distance_miles(*EVANSTON, lat, lon) <= 25)
+  assert sorted(game[0] for game in first) == expected
+  assert first == second
+  assert len(searches) == 1
+
+  # the delete (if any) and the inserts were one transaction:
+  assert len(store.transactions) == 1
+
+
+def test_only_stale_cells_are_searched(store):
+  venues = random_venues(EVANSTON, 60, 100)
+  fetch_region, searches = upstream(venues)
+  venuestore.nearby_games(None, *EVANSTON, 25, START, END, fetch_region)
+
+  # a circle 20 miles east overlaps the first one; only its new
+  # cells go upstream, in a smaller search:
+  east = (EVANSTON[0], EVANSTON[1] + 20 / (69.0 * math.cos(math.radians(EVANSTON[0]))))
+  games = venuestore.nearby_games(None, *east, 25, START, END, fetch_region)
+
+  assert len(searches) == 2
+  assert searches[1][2] < 2 * 25
+  expected = sorted(f"game at {k}" for k, (lat, lon) in venues.items()
+                    if venuestore.distance_miles(*east, lat, lon) <= 25)
+  assert sorted(game[0] for game in games) == expected
+
+
+def test_incomplete_search_leaves_cells_stale(store):
+  fetch_region, searches = upstream(random_venues(EVANSTON, 40, 20), complete=False)
+
+  venuestore.nearby_games(None, *EVANSTON, 25, START, END, fetch_region)
+  venuestore.nearby_games(None, *EVANSTON, 25, START, END, fetch_region)
+
+  assert store.regions == {}
+  assert len(searches) == 2
+
+
+def test_cancelled_games_are_removed_on_refresh(store, monkeypatch):
+  venues = {"v1": EVANSTON}
+  fetch_region, _ = upstream(venues)
+  assert len(venuestore.nearby_games(None, *EVANSTON, 10, START, END, fetch_region)) == 1
+
+  # the cells expire and the game is gone upstream:
+  monkeypatch.setattr(venuestore, "REGION_TTL_SECONDS", -1)
+  fetch_region, _ = upstream({})
+  assert venuestore.nearby_games(None, *EVANSTON, 10, START, END, fetch_region) == []
+  assert list(store.venues) == ["v1"]